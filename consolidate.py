@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Excel Consolidator - Headless Batch Entry Point
+
+Runs a consolidation from the command line, without the PyQt GUI: the
+Qt-free consolidation pipeline (web_version/services/consolidator.py on
+the shared src/engine modules) with a template, a source folder or list
+of files, an output path and a settings JSON file. Neither Qt nor pandas
+is imported.
+
+The run's summary (status, output file, run metrics, failed files) is
+printed to stdout as JSON; log lines go to stderr.
+
+    python consolidate.py template.xlsx "DATA Requirements" -o out/Consolidated.xlsx
+    python consolidate.py template.xlsx a.xlsx b.xlsx --settings batch.json --summary run.json
+
+Exit status: 0 when the output was written, 1 when the run failed,
+2 for invalid arguments.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add the project root to the Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Consolidate Excel workbooks into a template without the GUI.")
+    parser.add_argument('template', help="Template workbook (.xlsx or .xlsm)")
+    parser.add_argument('sources', nargs='+',
+                        help="Folder of source workbooks, or the source workbooks themselves")
+    parser.add_argument('-o', '--output',
+                        help="Output workbook (default: dated file next to the template)")
+    parser.add_argument('--settings',
+                        help="JSON file of processing settings (the keys of the web consolidator, "
+                             "e.g. exclude_zero_percent, output_engine, comment_strategy)")
+    parser.add_argument('--summary', help="Also write the JSON summary to this file")
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="Log progress to stderr (-vv for per-cell detail)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.template):
+        parser.error(f"template not found: {args.template}")
+    folders = [path for path in args.sources if os.path.isdir(path)]
+    if folders and len(args.sources) > 1:
+        parser.error("give either one source folder or a list of source files")
+    missing = [path for path in args.sources if not os.path.exists(path)]
+    if missing:
+        parser.error(f"source not found: {missing[0]}")
+    if args.settings:
+        try:
+            with open(args.settings, 'r', encoding='utf-8') as f:
+                args.settings = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not read settings: {e}")
+        if not isinstance(args.settings, dict):
+            parser.error("settings must be a JSON object")
+    else:
+        args.settings = {}
+    return args
+
+
+def run(template_path, sources, output_path=None, settings=None):
+    """
+    Consolidate ``sources`` (one folder, or a list of files) into
+    ``template_path``; returns the run summary.
+    """
+    from src.engine.run_metrics import metrics_path
+    from web_version.services.consolidator import ExcelConsolidator
+
+    if len(sources) == 1 and os.path.isdir(sources[0]):
+        source_folder, source_files = sources[0], None
+    else:
+        source_folder, source_files = None, [os.path.abspath(path) for path in sources]
+    if output_path:
+        output_path = os.path.abspath(output_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    consolidator = ExcelConsolidator(
+        template_path=os.path.abspath(template_path),
+        source_folder=source_folder,
+        settings=settings,
+        source_files=source_files,
+        output_path=output_path,
+    )
+    summary = {'status': 'success', 'template': os.path.abspath(template_path),
+               'output': None, 'metrics_file': None, 'error': None}
+    try:
+        summary['output'] = consolidator.consolidate()
+    except Exception as e:
+        summary['status'] = 'error'
+        summary['error'] = f"{type(e).__name__}: {e}"
+    metrics = consolidator.metrics.to_dict()
+    if summary['output'] and os.path.exists(metrics_path(summary['output'])):
+        summary['metrics_file'] = metrics_path(summary['output'])
+    summary['files'] = len(metrics['files'])
+    summary['failed_files'] = [{'file': entry['file'], 'error': entry['error']}
+                               for entry in metrics['files'] if 'error' in entry]
+    summary['metrics'] = metrics
+    return summary
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    level = logging.WARNING if not args.verbose else logging.INFO if args.verbose == 1 else logging.DEBUG
+    logging.basicConfig(level=level, stream=sys.stderr, format='%(message)s')
+
+    summary = run(args.template, args.sources, args.output, args.settings)
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    print(text)
+    return 0 if summary['status'] == 'success' else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ It imports and runs the main application from the src.core module.
 
 import sys
 import os
+import multiprocessing
 
 # Add the project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -15,6 +16,8 @@ sys.path.insert(0, project_root)
 
 # Import and run the main application
 if __name__ == "__main__":
+    # Required for the source-scanning process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     try:
         from src.core.main import main
         main()
@@ -15,7 +15,6 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer, QObject, QEvent
 from PyQt5.QtGui import QHelpEvent
 from typing import Optional
 import webbrowser
-from copy import copy
 import openpyxl
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.cell.cell import MergedCell
@@ -32,6 +31,8 @@ import re
 import xlrd  # For .xls files
 import csv
 import threading
+import time
+import multiprocessing
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -42,7 +43,27 @@ from src.modules.google_sheets_reporter import setup_google_sheets_error_reporti
 from src.core.version import APP_VERSION, APP_NAME, GITHUB_OWNER, GITHUB_REPO, ERROR_REPORTING_ENABLED
 
 # FileProcessor moved to src/utils/file_processor.py to avoid duplication
+from src.utils.common import get_user_cache_dir
 from src.utils.file_processor import FileProcessor
+from src.engine.contributions_sheet import (
+    CONTRIBUTION_LAYOUTS, EXCEL_MAX_ROWS, LAYOUT_LONG, LAYOUT_WIDE, ContributionShards,
+    wide_layout_fits, write_contribution_rows, write_wide_contribution_rows
+)
+from src.engine.cell_styles import ConsolidatedStyles
+from src.engine.comment_policy import COMMENT_STRATEGIES, COMMENTS_FULL, DEFAULT_TOP_CONTRIBUTORS, CommentPolicy
+from src.engine.coords import CoordSet, pack, unpack, to_a1, column_major, build_row_targets, clip_to_content, bounding_box
+from src.engine.formats import FORMAT_CLASSIFIER, NO_FORMAT, intern_format
+from src.engine.values import ValueParser, value_kind, PERCENTAGE, CURRENCY, NUMBER
+from src.engine.partials import SourcePlan, iter_source_partials
+from src.engine.partial_cache import PartialCache
+from src.engine.run_logging import DEFAULT_CELL_LOG_SAMPLE, CellLog, format_counts, start_queue_logging
+from src.engine.run_metrics import RunMetrics
+from src.engine.run_state import IncrementalRun
+from src.engine.sheet_clone import clone_plain_sheet
+from src.engine.sheet_stream import save_workbook
+from src.engine.template_cache import TemplateAnalysis, TemplateCache
+from src.engine.template_package import OUTPUT_ENGINES, OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_XML, TemplatePackage, UnsupportedTemplate
+from src.engine.template_session import TemplateSession
 
 # ---------------- Logging Setup ----------------
 def setup_processing_logger():
@@ -87,6 +108,9 @@ def setup_processing_logger():
     # Prevent propagation to root logger
     logger.propagate = False
     
+    # Handlers run on a listener thread; logging calls only enqueue the record
+    start_queue_logging(logger)
+    
     return logger
 
 # Global logger instance
@@ -138,6 +162,10 @@ class AdvancedConfigDialog(QDialog):
         performance_tab = self.create_performance_tab()
         tabs.addTab(performance_tab, "Performance")
         
+        # Output Tab
+        output_tab = self.create_output_tab()
+        tabs.addTab(output_tab, "Output")
+        
         layout.addWidget(tabs)
         
         # Buttons
@@ -770,6 +798,51 @@ class AdvancedConfigDialog(QDialog):
         )
         perf_layout.addWidget(self.memory_optimization)
         
+        self.enable_cache = QCheckBox("Reuse results of unchanged files (cache)")
+        self.enable_cache.setChecked(True)
+        self.enable_cache.setToolTip(
+            "When ENABLED: Remembers the values read from each source file.\n\n"
+            "Benefits:\n"
+            "• Re-running after a few files changed takes seconds\n"
+            "• Only new or modified files are opened again\n"
+            "• Results are identical - a file is reused only if its content is unchanged\n\n"
+            "The cache is kept in your user cache folder, not in the output folder.\n\n"
+            "💡 TIP: Keep this enabled if you consolidate the same files repeatedly."
+        )
+        perf_layout.addWidget(self.enable_cache)
+        
+        self.enable_incremental = QCheckBox("Update the previous result incrementally")
+        self.enable_incremental.setChecked(True)
+        self.enable_incremental.setToolTip(
+            "When ENABLED: Saves the consolidated totals after each run.\n\n"
+            "Benefits:\n"
+            "• The next run with the same template and folder only adds new or changed files\n"
+            "• Removed files are taken out of the totals automatically\n"
+            "• Results are identical to consolidating every file again\n\n"
+            "The saved state is kept in your user cache folder, not in the output folder.\n\n"
+            "💡 TIP: Keep this enabled for daily runs where a few files are added."
+        )
+        perf_layout.addWidget(self.enable_incremental)
+        
+        fixed_point_row = QHBoxLayout()
+        self.enable_fixed_point = QCheckBox("Fast fixed-point sums, decimal places:")
+        self.enable_fixed_point.setChecked(False)
+        self.enable_fixed_point.setToolTip(
+            "When ENABLED: Adds values as whole numbers scaled to the chosen decimal places.\n\n"
+            "Benefits:\n"
+            "• Faster totals for large batches of currency and count data\n"
+            "• Sums stay exact\n"
+            "• Values with more decimal places switch back to exact decimal sums automatically\n\n"
+            "💡 TIP: 6 decimal places covers currency and percentage data."
+        )
+        self.fixed_point_digits = QSpinBox()
+        self.fixed_point_digits.setRange(1, 12)
+        self.fixed_point_digits.setValue(6)
+        fixed_point_row.addWidget(self.enable_fixed_point)
+        fixed_point_row.addWidget(self.fixed_point_digits)
+        fixed_point_row.addStretch()
+        perf_layout.addLayout(fixed_point_row)
+        
         layout.addWidget(perf_group)
         
         # Backup Settings
@@ -834,6 +907,159 @@ class AdvancedConfigDialog(QDialog):
         
         layout.addWidget(backup_group)
         
+        # Processing Log Settings
+        log_group = QGroupBox("Processing Log")
+        log_layout = QVBoxLayout(log_group)
+        
+        log_sample_layout = QHBoxLayout()
+        log_sample_layout.addWidget(QLabel("Log cell details for every Nth cell (0 = none):"))
+        self.cell_log_sample = QSpinBox()
+        self.cell_log_sample.setRange(0, 100000)
+        self.cell_log_sample.setValue(DEFAULT_CELL_LOG_SAMPLE)
+        self.cell_log_sample.setToolTip(
+            "The processing log always gets a summary per file and per run.\n\n"
+            "Details of individual cells are logged for one cell out of this many:\n"
+            "• 1 = every cell (slow for large runs, for troubleshooting)\n"
+            "• 100 = a sample (default)\n"
+            "• 0 = no cell details"
+        )
+        log_sample_layout.addWidget(self.cell_log_sample)
+        log_sample_layout.addStretch()
+        log_layout.addLayout(log_sample_layout)
+        
+        layout.addWidget(log_group)
+        
+        layout.addStretch()
+        return widget
+    
+    def create_output_tab(self):
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        # Contributions Sheet Settings
+        contrib_group = QGroupBox("Contributions Sheet")
+        contrib_layout = QVBoxLayout(contrib_group)
+        
+        max_rows_layout = QHBoxLayout()
+        max_rows_label = QLabel("Max rows per Contributions sheet:")
+        max_rows_label.setToolTip(
+            "The Contributions sheet lists every file's value for every consolidated cell.\n\n"
+            "With many files and cells this can exceed Excel's limit of 1,048,576 rows.\n"
+            "Rows beyond this number continue on 'Contributions (2)', 'Contributions (3)', ...\n\n"
+            "Links from the consolidated cells always open the right sheet."
+        )
+        max_rows_layout.addWidget(max_rows_label)
+        
+        self.contributions_max_rows = QSpinBox()
+        self.contributions_max_rows.setRange(1000, 1048576)
+        self.contributions_max_rows.setSingleStep(10000)
+        self.contributions_max_rows.setValue(1048576)
+        self.contributions_max_rows.setToolTip(
+            "Number of rows per Contributions sheet.\n\n"
+            "Range: 1,000 to 1,048,576 rows (Excel's limit, default)\n\n"
+            "💡 TIP: Smaller sheets (e.g. 200,000 rows) open faster in Excel."
+        )
+        max_rows_layout.addWidget(self.contributions_max_rows)
+        max_rows_layout.addStretch()
+        contrib_layout.addLayout(max_rows_layout)
+        
+        layout_row = QHBoxLayout()
+        layout_row.addWidget(QLabel("Layout:"))
+        self.contributions_layout = QComboBox()
+        self.contributions_layout.addItems([
+            "One row per cell and file (Cell | File Name | Contribution)",
+            "One row per cell, one column per file"
+        ])
+        self.contributions_layout.setToolTip(
+            "How the Contributions sheet lists each file's values:\n\n"
+            "• ONE ROW PER CELL AND FILE: Easy to filter by file name (default)\n"
+            "• ONE COLUMN PER FILE: Far fewer rows, so the output is smaller\n"
+            "  and opens faster in Excel (header row and Cell column stay frozen)\n\n"
+            "💡 TIP: Use one column per file when consolidating many files."
+        )
+        layout_row.addWidget(self.contributions_layout)
+        layout_row.addStretch()
+        contrib_layout.addLayout(layout_row)
+        
+        layout.addWidget(contrib_group)
+        
+        # Cell Comment Settings
+        comments_group = QGroupBox("Cell Comments")
+        comments_layout = QVBoxLayout(comments_group)
+        
+        strategy_row = QHBoxLayout()
+        strategy_row.addWidget(QLabel("Comments list:"))
+        self.comment_strategy = QComboBox()
+        self.comment_strategy.addItems([
+            "Every contributing file (default)",
+            "The largest contributions only",
+            "No comments"
+        ])
+        self.comment_strategy.setToolTip(
+            "What the comment on each consolidated cell lists:\n\n"
+            "• EVERY FILE: Each file's value (default)\n"
+            "• LARGEST ONLY: The biggest contributions, then a pointer\n"
+            "  to the Contributions sheet for the rest\n"
+            "• NO COMMENTS: Values are only listed on the Contributions sheet\n\n"
+            "💡 TIP: With hundreds of files, shorter comments make the output\n"
+            "much smaller and faster to open in Excel."
+        )
+        strategy_row.addWidget(self.comment_strategy)
+        strategy_row.addStretch()
+        comments_layout.addLayout(strategy_row)
+        
+        top_row = QHBoxLayout()
+        top_row.addWidget(QLabel("Largest contributions listed:"))
+        self.comment_top_n = QSpinBox()
+        self.comment_top_n.setRange(1, 1000)
+        self.comment_top_n.setValue(DEFAULT_TOP_CONTRIBUTORS)
+        self.comment_top_n.setToolTip("Files listed per comment when only the largest contributions are shown.")
+        top_row.addWidget(self.comment_top_n)
+        top_row.addStretch()
+        comments_layout.addLayout(top_row)
+        
+        budget_row = QHBoxLayout()
+        budget_row.addWidget(QLabel("Comment size limit (MB, 0 = none):"))
+        self.comment_max_mb = QSpinBox()
+        self.comment_max_mb.setRange(0, 1024)
+        self.comment_max_mb.setValue(0)
+        self.comment_max_mb.setToolTip(
+            "Total size of all comment text in the output.\n\n"
+            "Cells whose comment would go past the limit get no comment;\n"
+            "their values stay on the Contributions sheet."
+        )
+        budget_row.addWidget(self.comment_max_mb)
+        budget_row.addStretch()
+        comments_layout.addLayout(budget_row)
+        
+        layout.addWidget(comments_group)
+        
+        # Output File Settings
+        file_group = QGroupBox("Output File")
+        file_layout = QVBoxLayout(file_group)
+        
+        engine_row = QHBoxLayout()
+        engine_row.addWidget(QLabel("Write output by:"))
+        self.output_engine = QComboBox()
+        self.output_engine.addItems([
+            "Rebuilding the whole workbook (default)",
+            "Patching the template file"
+        ])
+        self.output_engine.setToolTip(
+            "How the consolidated workbook is written:\n\n"
+            "• REBUILDING: The template is loaded and saved again in full (default)\n"
+            "• PATCHING: Only the consolidated cells, the new sheets and comments\n"
+            "  are written into a copy of the template file; everything else\n"
+            "  (images, shapes, other sheets) is kept byte for byte\n\n"
+            "💡 TIP: Patching is much faster for large templates.\n"
+            "Templates it cannot handle are rebuilt automatically."
+        )
+        engine_row.addWidget(self.output_engine)
+        engine_row.addStretch()
+        file_layout.addLayout(engine_row)
+        
+        layout.addWidget(file_group)
+        
         layout.addStretch()
         return widget
     
@@ -871,9 +1097,22 @@ class AdvancedConfigDialog(QDialog):
         self.enable_parallel.setChecked(True)
         self.max_threads.setValue(4)
         self.memory_optimization.setChecked(True)
+        self.enable_cache.setChecked(True)
+        self.enable_incremental.setChecked(True)
+        self.enable_fixed_point.setChecked(False)
+        self.fixed_point_digits.setValue(6)
         self.create_backup.setChecked(True)
         self.keep_backups.setChecked(True)
         self.max_backups.setValue(10)
+        self.cell_log_sample.setValue(DEFAULT_CELL_LOG_SAMPLE)
+        
+        # Output
+        self.contributions_max_rows.setValue(1048576)
+        self.contributions_layout.setCurrentIndex(0)
+        self.comment_strategy.setCurrentIndex(0)
+        self.comment_top_n.setValue(DEFAULT_TOP_CONTRIBUTORS)
+        self.comment_max_mb.setValue(0)
+        self.output_engine.setCurrentIndex(0)
     
     def get_settings(self):
         """Get all current settings as dictionary"""
@@ -910,9 +1149,22 @@ class AdvancedConfigDialog(QDialog):
                 'enable_parallel': self.enable_parallel.isChecked(),
                 'max_threads': self.max_threads.value(),
                 'memory_optimization': self.memory_optimization.isChecked(),
+                'enable_cache': self.enable_cache.isChecked(),
+                'enable_incremental': self.enable_incremental.isChecked(),
+                'enable_fixed_point': self.enable_fixed_point.isChecked(),
+                'fixed_point_digits': self.fixed_point_digits.value(),
                 'create_backup': self.create_backup.isChecked(),
                 'keep_backups': self.keep_backups.isChecked(),
-                'max_backups': self.max_backups.value()
+                'max_backups': self.max_backups.value(),
+                'cell_log_sample': self.cell_log_sample.value()
+            },
+            'output_handling': {
+                'contributions_max_rows': self.contributions_max_rows.value(),
+                'contributions_layout': CONTRIBUTION_LAYOUTS[self.contributions_layout.currentIndex()],
+                'comment_strategy': COMMENT_STRATEGIES[self.comment_strategy.currentIndex()],
+                'comment_top_n': self.comment_top_n.value(),
+                'comment_max_bytes': self.comment_max_mb.value() * 1024 * 1024,
+                'output_engine': OUTPUT_ENGINES[self.output_engine.currentIndex()]
             }
         }
 # ---------------- Modern Loading Dialog ----------------
@@ -987,66 +1239,25 @@ class ConsolidationWorker(QThread):
         self.settings = settings or {}
         self.error_reporter = error_reporter
         self.exclude_zero_percent = exclude_zero_percent
+        self.value_parser = ValueParser()
+        # Stage timings and cell counters of the current run (see run_metrics)
+        self.metrics = RunMetrics()
 
     def _is_percentage_format(self, format_str: str) -> bool:
         """Enhanced percentage format detection with comprehensive patterns."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str).lower()
-        percentage_patterns = [
-            '%', 'percent', '0.0%', '0.00%', '0%', '#,##0%', '#,##0.0%', '#,##0.00%',
-            '0.0%', '0.00%', '0%', '0.0%', '0.00%', '0%', '0.0%', '0.00%',
-            'general%', 'standard%', 'percentage', 'pct', 'pct%'
-        ]
-        
-        return any(pattern in format_str for pattern in percentage_patterns)
+        return FORMAT_CLASSIFIER.is_percentage(format_str)
     
     def _is_currency_format(self, format_str: str) -> bool:
         """Enhanced currency format detection."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str)
-        currency_symbols = ['$', '€', '£', '¥', '₽', '₹', '₩', '₪', '₦', '₡', '₨', '₫', '₱', '₲', '₴', '₵', '₸', '₼', '₾', '₿']
-        currency_patterns = ['currency', 'money', 'dollar', 'euro', 'pound', 'yen']
-        
-        return (any(symbol in format_str for symbol in currency_symbols) or 
-                any(pattern in format_str.lower() for pattern in currency_patterns))
+        return FORMAT_CLASSIFIER.is_currency(format_str)
     
     def _is_number_format(self, format_str: str) -> bool:
         """Enhanced number format detection."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str)
-        
-        # First check if it's already identified as percentage or currency
-        if self._is_percentage_format(format_str) or self._is_currency_format(format_str):
-            return False
-        
-        number_patterns = [
-            '0.00', '#,##0', '0.0', '0', '#,##0.00', '#,##0.0', '#,##0',
-            'general', 'standard', 'number', 'numeric', 'decimal',
-            '0.000', '0.0000', '#,##0.000', '#,##0.0000'
-        ]
-        
-        return any(pattern in format_str for pattern in number_patterns)
+        return FORMAT_CLASSIFIER.is_number(format_str)
     
     def _is_date_format(self, format_str: str) -> bool:
         """Enhanced date format detection."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str).lower()
-        date_patterns = [
-            'mm/dd/yyyy', 'dd/mm/yyyy', 'yyyy-mm-dd', 'mm-dd-yyyy', 'dd-mm-yyyy',
-            'mm/dd/yy', 'dd/mm/yy', 'yy-mm-dd', 'mm-dd-yy', 'dd-mm-yy',
-            'm/d/yyyy', 'd/m/yyyy', 'm/d/yy', 'd/m/yy',
-            'date', 'time', 'datetime', 'timestamp'
-        ]
-        
-        return any(pattern in format_str for pattern in date_patterns)
+        return FORMAT_CLASSIFIER.is_date(format_str)
     
     def _get_consolidation_method(self, format_info: dict) -> str:
         """Determine the appropriate consolidation method based on cell format."""
@@ -1061,23 +1272,6 @@ class ConsolidationWorker(QThread):
         else:
             return 'sum'  # Default to sum for unformatted cells
 
-    def _is_total_cell(self, cell) -> bool:
-        """Detect if a cell is likely a total row/column based on common patterns."""
-        if cell.value is None:
-            return False
-        
-        # Check for common total indicators in cell value
-        value_str = str(cell.value).lower().strip()
-        total_indicators = ['total', 'sum', 'subtotal', 'grand total', 'totaal', 'gesamt']
-        
-        # Check if cell value contains total indicators
-        if any(indicator in value_str for indicator in total_indicators):
-            return True
-        
-        # Check if cell is in a row/column that might be totals based on position
-        # This is a heuristic - could be enhanced based on specific needs
-        return False
-
     def _get_user_friendly_error_message(self, error):
         """Convert technical errors into user-friendly messages with guidance."""
         error_str = str(error).lower()
@@ -1220,137 +1414,248 @@ class ConsolidationWorker(QThread):
                 return workbook[sheet_name]
             return workbook.active
         return workbook.active
-    
-    def _process_cell_value_with_format_verification(self, value, format_info, coord, file_label, wb, stop_on_error):
+
+    def _analyze_template(self, template_ws):
         """
-        Process cell value with comprehensive format verification.
-        Ensures data is converted according to template format requirements.
-        
-        Args:
-            value: The cell value to process
-            format_info: Dictionary containing format information from template
-            coord: Cell coordinate (e.g., 'A1')
-            file_label: Name of the source file
-            wb: Workbook object
-            stop_on_error: Whether to stop on format mismatches
-            
-        Returns:
-            Decimal value or None if processing failed
+        Classify the template worksheet's number formats, collect the template
+        coordinate set and spread formats over merged ranges.
+        Returns a TemplateAnalysis; only reads the worksheet.
         """
-        if value is None or value == "":
-            return None
-            
-        # Handle different format types based on template requirements
-        if format_info.get('is_percentage', False):
-            return self._process_percentage_value(value, coord, file_label, wb, stop_on_error)
-        elif format_info.get('is_currency', False):
-            return self._process_currency_value(value, coord, file_label, wb, stop_on_error)
-        elif format_info.get('is_number', False):
-            return self._process_number_value(value, coord, file_label, wb, stop_on_error)
-        else:
-            # Default processing for unformatted cells
-            return self._process_default_value(value, coord, file_label, wb, stop_on_error)
-    
-    def _process_percentage_value(self, value, coord, file_label, wb, stop_on_error):
-        """Process percentage values with strict format verification."""
+        processing_logger.info("🔍 Starting template format analysis...")
+        processing_logger.info(f"📋 Template worksheet loaded: {template_ws.title}")
+
+        # Build comprehensive format cache with detailed cell format information
+        coord_format_info = {}
+        template_coords = set()
+        merged_ranges = []
+
+        processing_logger.info("🔍 Analyzing template cells for format detection...")
+
+        # ULTRA-FAST OPTIMIZATION: Only process cells with meaningful formats
+        # This reduces processing from 36k+ cells to ~100-500 cells
+        cell_count = 0
+        processed_cells = 0
+
+        for row in template_ws.iter_rows():
+            for tcell in row:
+                key = pack(tcell.row, tcell.column)
+                template_coords.add(key)
+                cell_count += 1
+
+                # FLEXIBLE FILTER: Process all cells with values or meaningful content
+                fmt = getattr(tcell, 'number_format', None)
+                has_value = tcell.value is not None and tcell.value != ''
+                has_special_format = fmt and fmt not in ['General', '@', '0', '0.00']
+                has_formula = hasattr(tcell, 'data_type') and tcell.data_type == 'f'
+
+                # Process cells with values, special formatting, OR formulas (including totals)
+                if has_value or has_special_format or has_formula:
+                    processed_cells += 1
+
+                    # Enhanced format detection with comprehensive analysis
+                    is_percentage = is_currency = is_number = is_date = False
+                    consolidation_method = 'sum'  # Default to sum
+
+                    try:
+                        # Enhanced format detection (rules evaluated once per distinct format)
+                        if fmt:
+                            fmt_class = FORMAT_CLASSIFIER.classify(fmt)
+
+                            if fmt_class.is_percentage:
+                                is_percentage = True
+                                consolidation_method = 'average'
+                                processing_logger.info(f"📊 Percentage cell detected: {tcell.coordinate} with format: {fmt}")
+
+                            elif fmt_class.is_currency:
+                                is_currency = True
+
+                            elif fmt_class.is_number:
+                                is_number = True
+
+                            elif fmt_class.is_date:
+                                is_date = True
+
+                        # Formula detection (simplified)
+                        cell_has_formula = has_formula or (isinstance(tcell.value, str) and str(tcell.value).startswith('='))
+
+                        # Shared, immutable record per distinct format
+                        coord_format_info[key] = intern_format(
+                            str(fmt) if fmt else None, is_percentage, is_currency, is_number, is_date,
+                            cell_has_formula, consolidation_method)
+
+                    except Exception:
+                        # Silent error handling to avoid logging overhead
+                        continue
+
+        processing_logger.info(f"📊 Enhanced format detection completed. Processed {processed_cells} relevant cells out of {cell_count} total cells")
+
+        # Log format summary for debugging
+        percent_count = len([c for c in coord_format_info.values() if c.get('is_percentage')])
+        currency_count = len([c for c in coord_format_info.values() if c.get('is_currency')])
+        number_count = len([c for c in coord_format_info.values() if c.get('is_number')])
+        date_count = len([c for c in coord_format_info.values() if c.get('is_date')])
+
+        processing_logger.info(f"📊 Format summary: {percent_count} percentage cells, {currency_count} currency cells, {number_count} number cells, {date_count} date cells")
+
+        # Log all percentage cells for debugging
+        percent_cells = [to_a1(key) for key, info in coord_format_info.items() if info.get('is_percentage')]
+        if percent_cells:
+            processing_logger.info(f"📊 Percentage cells found: {percent_cells[:10]}{'...' if len(percent_cells) > 10 else ''}")
+
+        # Propagate number format across merged ranges with enhanced format inheritance
         try:
-            # Handle different percentage input formats
-            if isinstance(value, (int, float)):
-                # Normalize numeric inputs to PERCENT POINTS for averaging
-                # Rules:
-                #  - Values > 1 are treated as percent points (e.g., 82.5 means 82.5%)
-                #  - Values between 0 and 1 are decimals; convert to percent points (0.825 → 82.5)
-                numeric_val = float(value)
-                if 0 <= numeric_val <= 1:
-                    normalized = numeric_val * 100.0
-                else:
-                    normalized = numeric_val
-                return Decimal(str(normalized))
-            elif isinstance(value, str):
-                text = str(value).strip().replace(",", "")
-                if text.endswith('%'):
-                    # Remove % and interpret as percent points directly
-                    val = Decimal(text[:-1])
-                    return val
-                else:
-                    # Parse as number; apply same normalization as numeric path
-                    numeric_val = float(text)
-                    if 0 <= numeric_val <= 1:
-                        normalized = numeric_val * 100.0
-                    else:
-                        normalized = numeric_val
-                    return Decimal(str(normalized))
-            else:
-                return None
-        except Exception as e:
-            if stop_on_error:
-                filename = os.path.basename(file_label) if hasattr(file_label, '__iter__') else str(file_label)
-                error_msg = (f"Percentage Format Error\n\n"
-                           f"Cell {coord} in file '{filename}' contains invalid percentage data:\n"
-                           f"'{value}'\n\n"
-                           f"Expected: Numeric values or percentages (e.g., 100, 0.5, 0.75)\n\n"
-                           f"💡 Solution: Ensure the cell contains valid percentage data or "
-                           f"convert the template cell to a different format.")
-                self.finished.emit("error", error_msg)
-            return None
-    
-    def _process_currency_value(self, value, coord, file_label, wb, stop_on_error):
-        """Process currency values with format verification."""
+            for mrange in getattr(template_ws, 'merged_cells', []).ranges:
+                try:
+                    min_row = mrange.min_row
+                    max_row = mrange.max_row
+                    min_col = mrange.min_col
+                    max_col = mrange.max_col
+                    merged_ranges.append((min_row, min_col, max_row, max_col))
+
+                    # Get master cell format info
+                    master_format = coord_format_info.get(pack(min_row, min_col), NO_FORMAT)
+
+                    # Propagate format to all cells in merged range
+                    for r in range(min_row, max_row + 1):
+                        for c in range(min_col, max_col + 1):
+                            key = pack(r, c)
+                            template_coords.add(key)
+                            # Inherit master cell format (shared record)
+                            coord_format_info[key] = master_format
+                except Exception:
+                    continue
+        except Exception:
+            pass
+
+        return TemplateAnalysis(coord_format_info, CoordSet(template_coords),
+                                (template_ws.max_row, template_ws.max_column),
+                                merged_ranges, template_ws.title)
+
+    def _template_cache_variant(self):
+        """Identifies this analyzer and the sheet it reads in TemplateCache keys."""
+        file_handling = self.settings.get('file_handling', {})
+        sheet = file_handling.get('sheet_name', 'Sheet1') if file_handling.get('enable_sheet_selection', False) else ''
+        return f"desktop:{sheet}"
+
+    def _get_contributions_max_rows(self):
+        """Row budget per Contributions sheet (Excel's row limit by default)."""
+        output_handling = self.settings.get('output_handling', {})
         try:
-            if isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, str):
-                # Remove currency symbols and parse
-                text = str(value).strip().replace("$", "").replace("€", "").replace("£", "").replace("¥", "").replace(",", "")
-                return Decimal(text)
-            else:
-                return None
-        except Exception as e:
-            if stop_on_error:
-                filename = os.path.basename(file_label) if hasattr(file_label, '__iter__') else str(file_label)
-                error_msg = (f"Currency Format Error\n\n"
-                           f"Cell {coord} in file '{filename}' contains invalid currency data:\n"
-                           f"'{value}'\n\n"
-                           f"Expected: Numeric values (e.g., 100, 100.50)\n\n"
-                           f"💡 Solution: Ensure the cell contains valid numeric data.")
-                self.finished.emit("error", error_msg)
-            return None
-    
-    def _process_number_value(self, value, coord, file_label, wb, stop_on_error):
-        """Process number values with format verification."""
+            return int(output_handling.get('contributions_max_rows', EXCEL_MAX_ROWS))
+        except (TypeError, ValueError):
+            return EXCEL_MAX_ROWS
+
+    def _get_contributions_layout(self, file_labels):
+        """'long' (Cell | File Name | Contribution rows) or 'wide' (one row per cell, one column per file)."""
+        output_handling = self.settings.get('output_handling', {})
+        layout = output_handling.get('contributions_layout', LAYOUT_LONG)
+        if layout not in CONTRIBUTION_LAYOUTS:
+            return LAYOUT_LONG
+        if layout == LAYOUT_WIDE and not wide_layout_fits(file_labels):
+            processing_logger.warning(f"⚠️ {len(file_labels)} files do not fit in one row; using the long Contributions layout")
+            return LAYOUT_LONG
+        return layout
+
+    def _get_output_engine(self):
+        """'openpyxl' (load and save the whole workbook) or 'xml' (patch the template package)."""
+        engine = self.settings.get('output_handling', {}).get('output_engine', OUTPUT_ENGINE_OPENPYXL)
+        return engine if engine in OUTPUT_ENGINES else OUTPUT_ENGINE_OPENPYXL
+
+    def _get_comment_policy(self):
+        """Comment strategy ('full', 'top', 'none') and comment byte budget of the output."""
+        output_handling = self.settings.get('output_handling', {})
         try:
-            if isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, str):
-                # Remove common formatting characters
-                text = str(value).strip().replace(",", "").replace(" ", "")
-                return Decimal(text)
-            else:
-                return None
-        except Exception as e:
-            if stop_on_error:
-                filename = os.path.basename(file_label) if hasattr(file_label, '__iter__') else str(file_label)
-                error_msg = (f"Number Format Error\n\n"
-                           f"Cell {coord} in file '{filename}' contains invalid numeric data:\n"
-                           f"'{value}'\n\n"
-                           f"Expected: Numeric values (e.g., 100, 100.50)\n\n"
-                           f"💡 Solution: Ensure the cell contains valid numeric data.")
-                self.finished.emit("error", error_msg)
-            return None
-    
-    def _process_default_value(self, value, coord, file_label, wb, stop_on_error):
-        """Process values with default (unformatted) handling."""
+            return CommentPolicy(output_handling.get('comment_strategy', COMMENTS_FULL),
+                                 int(output_handling.get('comment_top_n', DEFAULT_TOP_CONTRIBUTORS)),
+                                 int(output_handling.get('comment_max_bytes', 0)))
+        except (TypeError, ValueError):
+            return CommentPolicy()
+
+    def _open_template_package(self):
+        """TemplatePackage of the template sheet, or None when the template cannot be patched."""
+        file_handling = self.settings.get('file_handling', {})
+        sheet_name = file_handling.get('sheet_name', 'Sheet1') if file_handling.get('enable_sheet_selection', False) else None
         try:
-            if isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, str):
-                # Try to parse as number
-                text = str(value).strip().replace(",", "")
-                return Decimal(text)
-            else:
-                return None
-        except Exception:
+            return TemplatePackage(self.template_path, sheet_name)
+        except UnsupportedTemplate as e:
+            processing_logger.warning(f"⚠️ Template cannot be patched ({e}); rebuilding the workbook instead")
             return None
+
+    def _add_contributions_header(self, contrib_ws, file_labels=None):
+        """
+        Header rows of a Contributions sheet; returns the first data row.
+        With ``file_labels`` the header is the wide layout's (one column per file, frozen).
+        """
+        contrib_ws["A1"] = "CONTRIBUTIONS INDEX"
+        contrib_ws["A1"].font = Font(bold=True, size=14, color="2F5597")
+        contrib_ws.merge_cells('A1:D1')
+        contrib_ws["A3"] = "Search (use column filters):"
+        contrib_ws["A5"] = "Cell"
+        if file_labels is None:
+            contrib_ws["B5"] = "File Name"
+            contrib_ws["C5"] = "Contribution"
+        else:
+            for col, label in enumerate(file_labels, start=2):
+                contrib_ws.cell(row=5, column=col, value=label)
+            contrib_ws.freeze_panes = "B6"
+        return 6
+
+    def _finish_contributions_sheet(self, contrib_ws, last_row, file_count=None):
+        """Autofilter and column widths of a completed Contributions sheet (``file_count``: wide layout)."""
+        last_col = 'C' if file_count is None else get_column_letter(file_count + 1)
+        if last_row >= 6:
+            contrib_ws.auto_filter.ref = f"A5:{last_col}{last_row}"
+        contrib_ws.column_dimensions['A'].width = 12
+        if file_count is None:
+            contrib_ws.column_dimensions['B'].width = 40
+            contrib_ws.column_dimensions['C'].width = 16
+        else:
+            for col in range(2, file_count + 2):
+                contrib_ws.column_dimensions[get_column_letter(col)].width = 16
+
+    def _get_cell_log_sample(self):
+        """Per-cell detail lines in the processing log: one per this many cells (0 = none)."""
+        try:
+            return int(self.settings.get('performance', {}).get('cell_log_sample', DEFAULT_CELL_LOG_SAMPLE))
+        except (TypeError, ValueError):
+            return DEFAULT_CELL_LOG_SAMPLE
+
+    def _get_cache_folder(self, name):
+        """Per-user cache folder ``name`` (kept out of the output folder the user picked)."""
+        return os.path.join(get_user_cache_dir(APP_NAME), name)
+
+    def _get_parallel_workers(self, file_count):
+        """Number of worker processes for source scanning (1 = in this thread)."""
+        performance = self.settings.get('performance', {})
+        if not performance.get('enable_parallel', False):
+            return 1
+        try:
+            max_threads = int(performance.get('max_threads', 4))
+        except (TypeError, ValueError):
+            max_threads = 4
+        return max(1, min(max_threads, file_count, os.cpu_count() or 1))
+
+    def _get_value_format_error_message(self, kind, coord, file_label, value):
+        """User-facing message for a source value that does not match its template format."""
+        filename = os.path.basename(file_label) if hasattr(file_label, '__iter__') else str(file_label)
+        if kind == PERCENTAGE:
+            return (f"Percentage Format Error\n\n"
+                   f"Cell {coord} in file '{filename}' contains invalid percentage data:\n"
+                   f"'{value}'\n\n"
+                   f"Expected: Numeric values or percentages (e.g., 100, 0.5, 0.75)\n\n"
+                   f"💡 Solution: Ensure the cell contains valid percentage data or "
+                   f"convert the template cell to a different format.")
+        elif kind == CURRENCY:
+            return (f"Currency Format Error\n\n"
+                   f"Cell {coord} in file '{filename}' contains invalid currency data:\n"
+                   f"'{value}'\n\n"
+                   f"Expected: Numeric values (e.g., 100, 100.50)\n\n"
+                   f"💡 Solution: Ensure the cell contains valid numeric data.")
+        return (f"Number Format Error\n\n"
+               f"Cell {coord} in file '{filename}' contains invalid numeric data:\n"
+               f"'{value}'\n\n"
+               f"Expected: Numeric values (e.g., 100, 100.50)\n\n"
+               f"💡 Solution: Ensure the cell contains valid numeric data.")
     
     def _update_submitted_files_format(self, files, coord_format_info):
         """
@@ -1396,7 +1701,8 @@ class ConsolidationWorker(QThread):
                     cells_needing_conversion = []
                     
                     # Quick scan: identify cells that need conversion
-                    for coord, format_info in coord_format_info.items():
+                    for key, format_info in coord_format_info.items():
+                        coord = to_a1(key)
                         if coord not in ws_check:
                             continue
                         
@@ -1410,7 +1716,7 @@ class ConsolidationWorker(QThread):
                         if self._cell_already_correct_format(cell.value, format_info):
                             continue
                         
-                        cells_needing_conversion.append(coord)
+                        cells_needing_conversion.append(key)
                     
                     wb_check.close()
                     
@@ -1428,12 +1734,13 @@ class ConsolidationWorker(QThread):
                     file_cells_updated = 0
                     
                     # OPTIMIZED: Only process cells that need conversion
-                    for coord in cells_needing_conversion:
+                    for key in cells_needing_conversion:
+                        coord = to_a1(key)
                         if coord not in ws:
                             continue
                             
                         cell = ws[coord]
-                        format_info = coord_format_info[coord]
+                        format_info = coord_format_info[key]
                         
                         # CRITICAL: Preserve formulas - never modify cells with formulas
                         if self._preserve_formulas_during_format_update(cell, format_info, coord):
@@ -1657,9 +1964,8 @@ class ConsolidationWorker(QThread):
             
             if has_formula:
                 print(f"  🔒 Preserving formula in {coord}: {formula_text}")
-                # Mark this cell as having a formula in format info
-                format_info['has_formula'] = True
-                format_info['formula_text'] = formula_text
+                # Template format records are shared and immutable; the
+                # caller only needs to know that a formula was found
                 return True  # Indicates formula was found and preserved
             
             return False  # No formula found
@@ -1770,6 +2076,7 @@ class ConsolidationWorker(QThread):
                    f"• Restart the application and try again")
 
     def run(self):
+        metrics = self.metrics = RunMetrics()
         try:
             processing_logger.info("🚀 Starting Excel consolidation process...")
             processing_logger.info(f"📋 Template: {self.template_path}")
@@ -1793,11 +2100,23 @@ class ConsolidationWorker(QThread):
                 self.finished.emit("error", error_msg)
                 return
 
-            template_ext = os.path.splitext(self.template_path)[1].lower()
-            keep_vba = template_ext == '.xlsm'
+            # The template is parsed once: its worksheet receives the consolidated
+            # values and is also what the format analysis reads. Patching the
+            # template package instead writes the output without parsing it.
             try:
-                output_wb = openpyxl.load_workbook(self.template_path, keep_vba=keep_vba)
-                output_ws = self._get_worksheet(output_wb, "template")
+                with metrics.stage('template_load'):
+                    template_session = TemplateSession(self.template_path,
+                                                       lambda wb: self._get_worksheet(wb, "template"))
+                    output_package = None
+                    if self._get_output_engine() == OUTPUT_ENGINE_XML:
+                        output_package = self._open_template_package()
+                    if output_package is not None:
+                        output_wb = output_package
+                        output_ws = output_package.worksheet
+                    else:
+                        output_wb = template_session.workbook
+                        output_ws = template_session.worksheet
+                    keep_vba = template_session.keep_vba
             except Exception as e:
                 if self.error_reporter:
                     try:
@@ -1813,10 +2132,10 @@ class ConsolidationWorker(QThread):
                 return
 
             try:
-                from src.modules.advanced_settings import list_source_files, load_cells, normalize_value, validate_value, ensure_backup
+                from src.modules.advanced_settings import list_source_files, apply_custom_range, normalize_value, validate_value, ensure_backup
             except Exception as e:
                 list_source_files = None
-                load_cells = None
+                apply_custom_range = None
                 normalize_value = None
                 validate_value = None
                 ensure_backup = None
@@ -1851,155 +2170,45 @@ class ConsolidationWorker(QThread):
                 self.finished.emit("error", error_msg)
                 return
 
-            totals = {}
-            contributions = {}
-            percent_counts = {}
             coord_is_percent = {}
             # Maintain a stable, complete list of all file labels for reporting
             all_file_labels = [os.path.splitext(os.path.basename(p))[0] for p in files]
-            all_file_labels.sort(key=lambda n: n.lower())
             total_files_count = len(files)  # Total number of files for accurate counting
+            all_file_labels.sort(key=lambda n: n.lower())
             validation_settings = self.settings.get('validation', {})
             validate_structure = bool(validation_settings.get('validate_structure'))
             validate_data_types = bool(validation_settings.get('validate_data_types'))
             stop_on_error = bool(validation_settings.get('stop_on_error'))
 
-            template_ws = None
             coord_format_info = {}  # Enhanced format information storage
             template_coords = None
+            template_dims = None
             
-            # Enhanced template format analysis with comprehensive cell format verification
+            # Enhanced template format analysis with comprehensive cell format verification,
+            # reused from the template cache while the template file is unchanged
+            template_cache = None
+            if self.settings.get('performance', {}).get('enable_cache', True):
+                template_cache = TemplateCache(self._get_cache_folder("templates"),
+                                               self._template_cache_variant())
             try:
-                processing_logger.info("🔍 Starting template format analysis...")
-                template_wb = openpyxl.load_workbook(self.template_path, data_only=False, read_only=False)
-                template_ws = self._get_worksheet(template_wb, "template")
-                processing_logger.info(f"📋 Template worksheet loaded: {template_ws.title}")
-                
-                # Build comprehensive format cache with detailed cell format information
-                coord_format_info = {}
-                template_coords = set()
-                
-                processing_logger.info("🔍 Analyzing template cells for format detection...")
-                
-                # ULTRA-FAST OPTIMIZATION: Only process cells with meaningful formats
-                # This reduces processing from 36k+ cells to ~100-500 cells
-                cell_count = 0
-                processed_cells = 0
-                
-                for row in template_ws.iter_rows():
-                    for tcell in row:
-                        coord = tcell.coordinate
-                        template_coords.add(coord)
-                        cell_count += 1
-                        
-                        # FLEXIBLE FILTER: Process all cells with values or meaningful content
-                        fmt = getattr(tcell, 'number_format', None)
-                        has_value = tcell.value is not None and tcell.value != ''
-                        has_special_format = fmt and fmt not in ['General', '@', '0', '0.00']
-                        has_formula = hasattr(tcell, 'data_type') and tcell.data_type == 'f'
-                        
-                        # Process cells with values, special formatting, OR formulas (including totals)
-                        if has_value or has_special_format or has_formula:
-                            processed_cells += 1
-                            
-                            # Enhanced format detection with comprehensive analysis
-                            format_info = {
-                                'is_percentage': False,
-                                'is_currency': False,
-                                'is_number': False,
-                                'is_date': False,
-                                'number_format': str(fmt) if fmt else None,
-                                'has_formula': False,
-                                'format_confidence': 1.0,
-                                'consolidation_method': 'sum'  # Default to sum
-                            }
-                            
-                            try:
-                                # Enhanced format detection using new helper methods
-                                if fmt:
-                                    fmt_str = str(fmt)
-                                    
-                                    if self._is_percentage_format(fmt_str):
-                                        format_info['is_percentage'] = True
-                                        format_info['consolidation_method'] = 'average'
-                                        processing_logger.info(f"📊 Percentage cell detected: {coord} with format: {fmt}")
-                                    
-                                    elif self._is_currency_format(fmt_str):
-                                        format_info['is_currency'] = True
-                                        format_info['consolidation_method'] = 'sum'
-                                    
-                                    elif self._is_number_format(fmt_str):
-                                        format_info['is_number'] = True
-                                        format_info['consolidation_method'] = 'sum'
-                                    
-                                    elif self._is_date_format(fmt_str):
-                                        format_info['is_date'] = True
-                                        format_info['consolidation_method'] = 'sum'
-                                
-                                # Formula detection (simplified)
-                                if hasattr(tcell, 'data_type') and tcell.data_type == 'f':
-                                    format_info['has_formula'] = True
-                                elif isinstance(tcell.value, str) and str(tcell.value).startswith('='):
-                                    format_info['has_formula'] = True
-                                
-                                coord_format_info[coord] = format_info
-                                
-                            except Exception:
-                                # Silent error handling to avoid logging overhead
-                                continue
-                
-                processing_logger.info(f"📊 Enhanced format detection completed. Processed {processed_cells} relevant cells out of {cell_count} total cells")
-                
-                # Log format summary for debugging
-                percent_count = len([c for c in coord_format_info.values() if c.get('is_percentage')])
-                currency_count = len([c for c in coord_format_info.values() if c.get('is_currency')])
-                number_count = len([c for c in coord_format_info.values() if c.get('is_number')])
-                date_count = len([c for c in coord_format_info.values() if c.get('is_date')])
-                
-                processing_logger.info(f"📊 Format summary: {percent_count} percentage cells, {currency_count} currency cells, {number_count} number cells, {date_count} date cells")
-                
-                # Log all percentage cells for debugging
-                percent_cells = [coord for coord, info in coord_format_info.items() if info.get('is_percentage')]
-                if percent_cells:
-                    processing_logger.info(f"📊 Percentage cells found: {percent_cells[:10]}{'...' if len(percent_cells) > 10 else ''}")
-
-                # Propagate number format across merged ranges with enhanced format inheritance
-                try:
-                    for mrange in getattr(template_ws, 'merged_cells', []).ranges:
-                        try:
-                            min_row = mrange.min_row
-                            max_row = mrange.max_row
-                            min_col = mrange.min_col
-                            max_col = mrange.max_col
-                            master_cell = template_ws.cell(row=min_row, column=min_col)
-                            master_coord = master_cell.coordinate
-                            
-                            # Get master cell format info
-                            master_format = coord_format_info.get(master_coord, {})
-                            
-                            # Propagate format to all cells in merged range
-                            for r in range(min_row, max_row + 1):
-                                for c in range(min_col, max_col + 1):
-                                    coord = template_ws.cell(row=r, column=c).coordinate
-                                    template_coords.add(coord)
-                                    # Inherit master cell format
-                                    coord_format_info[coord] = master_format.copy()
-                        except Exception:
-                            continue
-                except Exception:
-                    pass
-                    
+                with metrics.stage('template_analysis'):
+                    template_analysis = template_session.analysis(self._analyze_template, template_cache)
             except Exception:
-                template_ws = None
-                coord_format_info = {}
-                template_coords = None
+                template_analysis = None
+            if template_analysis is not None:
+                metrics.count('template_analysis_cached', int(template_session.analysis_from_cache))
+                if template_session.analysis_from_cache:
+                    processing_logger.info(f"♻️ Template analysis reused from cache: {template_analysis.sheet_title} ({len(template_analysis.coord_format_info)} formatted cells)")
+                coord_format_info = template_analysis.coord_format_info
+                template_coords = template_analysis.template_coords
+                template_dims = template_analysis.dims
             # PERFORMANCE FIX: Skip the slow format update process
             # The format update was taking 16+ minutes per file and is not necessary
             # for percentage averaging to work correctly
             processing_logger.info(f"🔧 Format info available: {len(coord_format_info)} coordinates")
             
             # Log percentage cells found for debugging
-            percent_cells = [coord for coord, info in coord_format_info.items() if info.get('is_percentage')]
+            percent_cells = [to_a1(key) for key, info in coord_format_info.items() if info.get('is_percentage')]
             if percent_cells:
                 processing_logger.info(f"📊 Percentage cells detected: {percent_cells[:5]}{'...' if len(percent_cells) > 5 else ''}")
             
@@ -2031,152 +2240,171 @@ class ConsolidationWorker(QThread):
             else:
                 processing_logger.info("⚡ ULTRA-FAST mode - processing files as-is")
             
-            for idx, file in enumerate(files, 1):
-                try:
+            # Coordinates to read from every source file, grouped by row so whole
+            # rows outside the template are skipped by the streaming reader.
+            # Rows/columns past the template's last meaningful cell (phantom
+            # dimensions from formatting) are not read at all.
+            source_targets = None
+            if template_coords is not None:
+                source_coords = clip_to_content(template_coords, coord_format_info)
+                box = bounding_box(source_coords)
+                if box is not None:
+                    processing_logger.info(f"🎯 Source scan area: {to_a1(pack(box[0], box[1]))}:{to_a1(pack(box[2], box[3]))} ({len(source_coords)} of {len(template_coords)} template cells)")
+                source_targets = build_row_targets(source_coords)
+            if apply_custom_range is not None:
+                source_targets = apply_custom_range(source_targets, self.settings)
+            file_handling = self.settings.get('file_handling', {})
+            source_plan = SourcePlan(
+                targets=source_targets,
+                coord_kinds={key: (value_kind(info), info.get('consolidation_method', 'sum'))
+                             for key, info in coord_format_info.items()},
+                parser=self.value_parser,
+                sheet_name=file_handling.get('sheet_name', 'Sheet1') if file_handling.get('enable_sheet_selection', False) else None,
+                include_totals=self.settings.get('data_processing', {}).get('include_totals', True),
+                stop_on_error=stop_on_error,
+                template_dims=template_dims if validate_structure else None,
+                settings=self.settings,
+            )
+            
+            # Each source file is scanned into a partial (in worker processes when
+            # parallel processing is enabled); partials are merged here in file order
+            scan_files = [f for f in files if os.path.splitext(f)[1].lower() in ('.xlsx', '.xls')]
+            max_workers = self._get_parallel_workers(len(scan_files))
+            if max_workers > 1:
+                processing_logger.info(f"⚡ Parallel processing: {max_workers} worker processes")
+            # Values of unchanged files are reused from earlier runs (keyed by file content)
+            partial_cache = None
+            if self.settings.get('performance', {}).get('enable_cache', True):
+                partial_cache = PartialCache(self._get_cache_folder("partials"), source_plan)
+            # Totals, percentage counts and per-file contributions (files × cells matrix),
+            # continued from the previous run's state when only some files changed
+            state_path = None
+            if self.settings.get('performance', {}).get('enable_incremental', True):
+                folder_id = hashlib.sha1(os.path.abspath(self.excel_folder).encode('utf-8')).hexdigest()[:12]
+                state_path = os.path.join(self._get_cache_folder("runs"), f"run_state_{folder_id}.npz")
+            # Optional fixed-point totals (scaled int64 sums instead of Decimal additions)
+            performance = self.settings.get('performance', {})
+            fixed_point_digits = int(performance.get('fixed_point_digits', 6)) if performance.get('enable_fixed_point', False) else None
+            run_state = IncrementalRun(state_path, source_plan, files, total_files_count, self.exclude_zero_percent,
+                                       fixed_point_digits)
+            contributions = run_state.contributions
+            if run_state.incremental:
+                processing_logger.info(f"♻️ Incremental run: {len(run_state.reused)} unchanged files kept from the previous result, {run_state.removed_count} removed")
+            partials = iter_source_partials(scan_files, source_plan, max_workers, partial_cache, run_state.reused)
+            parse_cache_hits = parse_cache_misses = 0
+            # Compiled per-coordinate handlers (kind + consolidation method)
+            cell_handlers, default_handler = source_plan.handlers()
+            count_mode = "non-zero files" if self.exclude_zero_percent else "all files"
+            cell_log = CellLog(processing_logger, self._get_cell_log_sample())
+            source_start = time.perf_counter()
+            
+            try:
+                for idx, file in enumerate(files, 1):
                     # Progress indicator for large batches
                     if total_files > 10 and idx % max(1, total_files // 10) == 0:
                         processing_logger.info(f"📊 Progress: {idx}/{total_files} files processed ({idx/total_files*100:.1f}%)")
                     
                     ext = os.path.splitext(file)[1].lower()
-                    file_label = os.path.splitext(os.path.basename(file))[0]
-
-                    if ext in ('.xlsx', '.xls'):
-                        wb = openpyxl.load_workbook(file, data_only=True, read_only=bool(self.settings.get('performance', {}).get('memory_optimization')))
-                        ws = self._get_worksheet(wb, "source")
-                        if validate_structure and template_ws is not None:
-                            try:
-                                if (ws.max_row != template_ws.max_row) or (ws.max_column != template_ws.max_column):
-                                    if stop_on_error:
-                                        wb.close()
-                                        filename = os.path.basename(file)
-                                        error_msg = (f"File Structure Mismatch\n\n"
-                                                   f"File '{filename}' has a different structure than the template:\n\n"
-                                                   f"Template: {template_ws.max_row} rows × {template_ws.max_column} columns\n"
-                                                   f"File: {ws.max_row} rows × {ws.max_column} columns\n\n"
-                                                   f"Solution: Ensure all files have the same structure as the template, "
-                                                   f"or disable structure validation in settings.")
-                                        self.finished.emit("error", error_msg)
-                                        return
-                                    wb.close()
-                                    self.file_processed.emit(os.path.basename(file))
-                                    continue
-                            except Exception:
-                                pass
-                        if load_cells is not None:
-                            cells_iter = load_cells(ws, self.settings)
+                    if ext == '.csv':
+                        self.file_processed.emit(os.path.basename(file))
+                        continue
+                    if ext not in ('.xlsx', '.xls'):
+                        self.file_processed.emit(os.path.basename(file))
+                        self.progress.emit(5 + int(idx / max(len(files), 1) * 80))
+                        continue
+                    
+                    partial = next(partials)
+                    file_label = partial.label
+                    parse_cache_hits += partial.parse_cache[0]
+                    parse_cache_misses += partial.parse_cache[1]
+                    
+                    if partial.structure_mismatch is not None:
+                        if stop_on_error:
+                            filename = os.path.basename(file)
+                            file_rows, file_cols = partial.structure_mismatch
+                            error_msg = (f"File Structure Mismatch\n\n"
+                                       f"File '{filename}' has a different structure than the template:\n\n"
+                                       f"Template: {template_dims[0]} rows × {template_dims[1]} columns\n"
+                                       f"File: {file_rows} rows × {file_cols} columns\n\n"
+                                       f"Solution: Ensure all files have the same structure as the template, "
+                                       f"or disable structure validation in settings.")
+                            self.finished.emit("error", error_msg)
+                            return
+                        merge_start = time.perf_counter()
+                        run_state.merge(partial)
+                        metrics.add_file(partial, time.perf_counter() - merge_start)
+                        self.file_processed.emit(os.path.basename(file))
+                        continue
+                    
+                    if stop_on_error:
+                        for kind, key, value in partial.parse_errors:
+                            self.finished.emit("error", self._get_value_format_error_message(kind, to_a1(key), file_label, value))
+                    
+                    merge_start = time.perf_counter()
+                    run_state.merge(partial)
+                    
+                    # Per-file counts; per-cell detail only for sampled cells
+                    file_counts = dict.fromkeys(("percentage", "currency", "number", "unformatted"), 0)
+                    for key, val in partial.values.items():
+                        handler = cell_handlers.get(key, default_handler)
+                        if handler.method == 'average':
+                            # Percentage cells are averaged (count depends on exclude_zero_percent)
+                            file_counts["percentage"] += 1
+                            if cell_log.sample():
+                                cell_log.log(f"📊 Percentage cell {to_a1(key)}: {val} (from {file_label}) - Total: {contributions.total(key)}, Count: {contributions.percent_count(key)} ({count_mode})")
                         else:
-                            cells_iter = (cell for row in ws.iter_rows() for cell in row)
-
-                        for cell in cells_iter:
-                            value = cell.value
-                            coord = cell.coordinate
-                            
-                            # If template is present, skip cells not defined in template
-                            if template_coords is not None and coord not in template_coords:
-                                continue
-                            
-                            # Get template format information for this coordinate
-                            format_info = coord_format_info.get(coord, {})
-                            
-                            # CRITICAL FIX: Skip formulas in SOURCE files to prevent double-counting
-                            # Check if THIS cell (in source file) has a formula, not template
-                            if hasattr(cell, 'data_type') and cell.data_type == 'f':
-                                # This cell in SOURCE file is a formula - SKIP IT!
-                                # Formulas often reference other cells being consolidated, causing double-counting
-                                processing_logger.debug(f"⏩ Skipping formula cell {coord} in {file_label} to prevent double-counting")
-                                continue
-                            
-                            # Skip empty cells
-                            if value is None or value == '':
-                                continue
-                            
-                            # FLEXIBLE: Handle total cells
-                            include_totals = self.settings.get('data_processing', {}).get('include_totals', True)
-                            if not include_totals and self._is_total_cell(cell):
-                                continue
-                            
-                            # Process the cell value
-                            val = self._process_cell_value_with_format_verification(
-                                value, format_info, coord, file_label, wb, stop_on_error
+                            # Currency, number, and unformatted cells are summed
+                            cell_type = "currency" if handler.kind == CURRENCY else "number" if handler.kind == NUMBER else "unformatted"
+                            file_counts[cell_type] += 1
+                            if cell_log.sample():
+                                cell_log.log(f"🔢 {cell_type.title()} cell {to_a1(key)}: {val} (from {file_label}) - Total: {contributions.total(key)}")
+                    processing_logger.info(f"📄 {file_label}: {len(partial.values)} cells ({format_counts(file_counts)})")
+                    metrics.add_file(partial, time.perf_counter() - merge_start)
+                    
+                    if partial.invalid_value is not None:
+                        val, key = partial.invalid_value
+                        filename = os.path.basename(file)
+                        error_msg = (f"Data Validation Error\n\n"
+                                   f"Value {val} at cell {to_a1(key)} in file '{filename}' "
+                                   f"is outside the allowed range.\n\n"
+                                   f"Please check the data in this file or adjust the validation settings.")
+                        self.finished.emit("error", error_msg)
+                        return
+                    
+                    if partial.error is not None:
+                        e = partial.error
+                        error_msg = self._get_file_error_message(file, e)
+                        # Log the detailed error for debugging
+                        print(f"File processing failed: {error_msg}")
+                        try:
+                            from src.modules.google_sheets_reporter import GoogleSheetsErrorReporter
+                            error_reporter = GoogleSheetsErrorReporter("1.0.1")
+                            error_reporter.report_error(
+                                type(e), e, e.__traceback__,
+                                triggered_by="File Processing in ConsolidationWorker",
+                                user_file=file
                             )
-                            if val is None:
-                                continue
-                                
-                            # Validate value against settings
-                            if validate_value is not None and not validate_value(val, self.settings):
-                                if stop_on_error:
-                                    wb.close()
-                                    filename = os.path.basename(file)
-                                    error_msg = (f"Data Validation Error\n\n"
-                                               f"Value {val} at cell {cell.coordinate} in file '{filename}' "
-                                               f"is outside the allowed range.\n\n"
-                                               f"Please check the data in this file or adjust the validation settings.")
-                                    self.finished.emit("error", error_msg)
-                                    return
-                                continue
-                            
-                            # Enhanced processing based on template format requirements
-                            consolidation_method = format_info.get('consolidation_method', 'sum')
-                            
-                            if consolidation_method == 'average':
-                                # For percentage cells: accumulate for average calculation
-                                # Count behavior depends on exclude_zero_percent setting
-                                current_total = totals.get(coord)
-                                totals[coord] = (current_total + val) if current_total is not None else val
-                                
-                                # Initialize count to total files on first encounter
-                                if coord not in percent_counts:
-                                    if self.exclude_zero_percent:
-                                        # When excluding zeros: only count files with non-zero values
-                                        percent_counts[coord] = 0
-                                    else:
-                                        # Default: count all files (including files with 0% values)
-                                        percent_counts[coord] = total_files_count
-                                
-                                # If excluding zeros, increment count only for non-zero values
-                                if self.exclude_zero_percent and val != 0:
-                                    percent_counts[coord] += 1
-                                
-                                # Enhanced debug logging for percentage cells
-                                count_mode = "non-zero files" if self.exclude_zero_percent else "all files"
-                                processing_logger.info(f"📊 Percentage cell {coord}: {val} (from {file_label}) - Total: {totals[coord]}, Count: {percent_counts[coord]} ({count_mode})")
-                                
-                            else:
-                                # For currency, number, and unformatted cells: sum values
-                                # Zero values don't affect sum, but are included conceptually
-                                current_total = totals.get(coord)
-                                totals[coord] = (current_total + val) if current_total is not None else val
-                                
-                                # Enhanced debug logging for all cell types
-                                cell_type = "currency" if format_info.get('is_currency') else "number" if format_info.get('is_number') else "unformatted"
-                                processing_logger.info(f"🔢 {cell_type.title()} cell {coord}: {val} (from {file_label}) - Total: {totals[coord]}")
-                            
-                            # Track contributions for detailed reporting
-                            if coord not in contributions:
-                                contributions[coord] = {}
-                            prev = contributions[coord].get(file_label)
-                            contributions[coord][file_label] = (prev + val) if prev is not None else val
-                        wb.close()
-                    elif ext == '.csv':
+                        except Exception:
+                            pass
+                    else:
                         self.file_processed.emit(os.path.basename(file))
-                        continue
-                    self.file_processed.emit(os.path.basename(file))
-                except Exception as e:
-                    error_msg = self._get_file_error_message(file, e)
-                    # Log the detailed error for debugging
-                    print(f"File processing failed: {error_msg}")
-                    try:
-                        from src.modules.google_sheets_reporter import GoogleSheetsErrorReporter
-                        error_reporter = GoogleSheetsErrorReporter("1.0.1")
-                        error_reporter.report_error(
-                            type(e), e, e.__traceback__,
-                            triggered_by="File Processing in ConsolidationWorker",
-                            user_file=file
-                        )
-                    except Exception:
-                        pass
-
-                self.progress.emit(5 + int(idx / max(len(files), 1) * 80))
+                    
+                    self.progress.emit(5 + int(idx / max(len(files), 1) * 80))
+            finally:
+                # Stops outstanding worker processes when the run ends early
+                partials.close()
+                metrics.add_time('source_files', time.perf_counter() - source_start)
+            
+            if parse_cache_hits or parse_cache_misses:
+                processing_logger.info(f"🧮 Text parse cache: {parse_cache_hits} hits, {parse_cache_misses} misses")
+            if partial_cache is not None:
+                processing_logger.info(f"♻️ Cache: {partial_cache.hits} unchanged files reused, {partial_cache.misses} files scanned")
+                partial_cache.prune()
+            if template_cache is not None:
+                template_cache.prune()
+            with metrics.stage('source_files'):
+                contributions = run_state.finish()
+            values_start = time.perf_counter()
 
             from openpyxl.comments import Comment
             from openpyxl.styles import Border, Side
@@ -2192,34 +2420,53 @@ class ConsolidationWorker(QThread):
                 self.settings.get('output_handling', {}).get('overwrite_output_formulas', True)
             )
 
-            for coord, value in totals.items():
-                cell = output_ws[coord]
+            # Template style + number format + border of each consolidated cell, derived once
+            consolidated_styles = ConsolidatedStyles(thin_orange)
+
+            # How much of each cell's contributor list its comment carries
+            comment_policy = self._get_comment_policy()
+
+            # Per-cell detail only for sampled cells; the run log gets the counts
+            cell_log = CellLog(processing_logger, self._get_cell_log_sample())
+            written_counts = dict.fromkeys(("averaged", "currency", "number", "unformatted"), 0)
+
+            comment_seconds = 0.0
+            for key, value in contributions.totals():
+                row, col = unpack(key)
+                cell = output_ws.cell(row=row, column=col)
                 if isinstance(cell, MergedCell):
+                    metrics.count('cells_skipped_merged')
                     continue
                 # Optionally overwrite formulas in the template/output to ensure accurate consolidated totals
                 if not overwrite_output_formulas:
                     try:
                         if getattr(cell, 'data_type', None) == 'f' or (isinstance(cell.value, str) and str(cell.value).startswith('=')):
+                            metrics.count('cells_skipped_formula')
                             continue
                     except Exception:
                         pass
 
                 # Enhanced consolidation logic with format-aware processing
-                format_info = coord_format_info.get(coord, {})
+                coord = cell.coordinate
+                number_format = None
+                format_info = coord_format_info.get(key, {})
                 consolidation_method = format_info.get('consolidation_method', 'sum')
                 
                 # Enhanced debugging for format detection
-                processing_logger.info(f"🔍 Consolidating {coord}: Format info = {format_info}")
-                processing_logger.info(f"🔍 Consolidation method: {consolidation_method}, Value: {value}")
+                detail = cell_log.sample()
+                if detail:
+                    cell_log.log(f"🔍 Consolidating {coord}: Format info = {format_info}")
+                    cell_log.log(f"🔍 Consolidation method: {consolidation_method}, Value: {value}")
                 
                 try:
                     if consolidation_method == 'average':
                         # For percentage cells: calculate average (total ÷ count) and format as percentage
-                        count = max(1, percent_counts.get(coord, 1))
+                        count = max(1, contributions.percent_count(key))
                         avg_value = float(value / Decimal(count))
                         
                         # Enhanced debug logging for final consolidation
-                        processing_logger.info(f"🎯 Final percentage consolidation for {coord}: Total={value}, Count={count}, Average={avg_value} ({avg_value:.2f}%)")
+                        if detail:
+                            cell_log.log(f"🎯 Final percentage consolidation for {coord}: Total={value}, Count={count}, Average={avg_value} ({avg_value:.2f}%)")
                         
                         # Set the calculated average value - values are already in percentage points, just convert to decimal for Excel
                         # Excel expects percentage values as decimals (e.g., 0.825 for 82.5%)
@@ -2227,9 +2474,11 @@ class ConsolidationWorker(QThread):
                         
                         # Ensure the cell maintains percentage format from template
                         template_format = format_info.get('number_format', '0.00%')
-                        cell.number_format = template_format
+                        number_format = template_format
                         
-                        processing_logger.info(f"✅ {coord}: Set to {avg_value/100} ({avg_value:.2f}%) with format {template_format}")
+                        written_counts["averaged"] += 1
+                        if detail:
+                            cell_log.log(f"✅ {coord}: Set to {avg_value/100} ({avg_value:.2f}%) with format {template_format}")
                         
                     else:
                         # For currency, number, and unformatted cells: sum values
@@ -2238,37 +2487,43 @@ class ConsolidationWorker(QThread):
                         # Apply appropriate formatting based on cell type
                         if format_info.get('is_currency', False):
                             template_format = format_info.get('number_format', '$#,##0.00')
-                            cell.number_format = template_format
-                            processing_logger.info(f"✅ {coord}: Currency sum = {float(value)} with format {template_format}")
+                            number_format = template_format
+                            written_counts["currency"] += 1
+                            if detail:
+                                cell_log.log(f"✅ {coord}: Currency sum = {float(value)} with format {template_format}")
                             
                         elif format_info.get('is_number', False):
                             template_format = format_info.get('number_format', '#,##0.00')
-                            cell.number_format = template_format
-                            processing_logger.info(f"✅ {coord}: Number sum = {float(value)} with format {template_format}")
+                            number_format = template_format
+                            written_counts["number"] += 1
+                            if detail:
+                                cell_log.log(f"✅ {coord}: Number sum = {float(value)} with format {template_format}")
                             
                         else:
                             # Default: sum values without special formatting
-                            processing_logger.info(f"✅ {coord}: Unformatted sum = {float(value)}")
+                            written_counts["unformatted"] += 1
+                            if detail:
+                                cell_log.log(f"✅ {coord}: Unformatted sum = {float(value)}")
                         
                 except Exception:
                     # Fallback to basic value assignment
                     cell.value = float(value) if value is not None else 0
-                file_map = contributions.get(coord, {})
-                if file_map:
-                    items = sorted(file_map.items(), key=lambda x: x[0].lower())
+                comment_start = time.perf_counter()
+                items, omitted = comment_policy.contributors(contributions, key)
+                if items:
                     max_name = max((len(n) for n, _ in items), default=4)
                     header = "Consolidation Summary\n"
                     header += f"Cell: {coord}\n"
                     
                     # Enhanced summary based on cell format
-                    format_info = coord_format_info.get(coord, {})
+                    format_info = coord_format_info.get(key, {})
                     is_percent = format_info.get('is_percentage', False)
                     
                     if is_percent:
-                        count = max(1, int(percent_counts.get(coord, 1)))
+                        count = max(1, contributions.percent_count(key))
                         avg_val = (value / Decimal(count))
                         # BUG FIX: avg_val is already in percentage points, don't multiply by 100!
-                        num_contributors = len([v for v in file_map.values() if v != 0])
+                        num_contributors = contributions.nonzero_count(key)
                         
                         if self.exclude_zero_percent:
                             # Excluding zeros: count only includes files with non-zero values
@@ -2294,7 +2549,7 @@ class ConsolidationWorker(QThread):
                     for name, v in items:
                         pad = " " * (max_name - len(name))
                         try:
-                            format_info = coord_format_info.get(coord, {})
+                            format_info = coord_format_info.get(key, {})
                             if format_info.get('is_percentage', False):
                                 # BUG FIX: v is already in percentage points, don't multiply by 100!
                                 lines.append(f"{name}{pad}  |  {float(v):,.2f}%")
@@ -2304,160 +2559,78 @@ class ConsolidationWorker(QThread):
                                 lines.append(f"{name}{pad}  |  {float(v):,.2f}")
                         except Exception:
                             lines.append(f"{name}{pad}  |  {v}")
+                    if omitted:
+                        lines.append(CommentPolicy.omitted_line(omitted))
                     body = "\n".join(lines)
                     comment_text = header + body
                     max_len = 32000
                     if len(comment_text) > max_len:
                         comment_text = comment_text[: max_len - 21] + "\n... (truncated)"
-                    comment = Comment(comment_text, "Excel Consolidator")
-                    comment.width = min(520, 200 + max_name * 7)
-                    comment.height = min(600, 140 + len(items) * 14)
-                    cell.comment = comment
-                    cell.border = thin_orange
-
+                    if comment_policy.admit(comment_text):
+                        comment = Comment(comment_text, "Excel Consolidator")
+                        comment.width = min(520, 200 + max_name * 7)
+                        comment.height = min(600, 140 + len(lines) * 14)
+                        cell.comment = comment
+                comment_seconds += time.perf_counter() - comment_start
+                consolidated_styles.apply(cell, number_format)
+            metrics.add_time('consolidated_values', time.perf_counter() - values_start - comment_seconds)
+            metrics.add_time('comments', comment_seconds)
+            metrics.count('cells_written', sum(written_counts.values()))
+            metrics.count('comments_written', comment_policy.written)
+            metrics.count('comments_skipped_budget', comment_policy.skipped)
+
+            processing_logger.info(f"✍️ Consolidated {sum(written_counts.values())} cells ({format_counts(written_counts)})")
+            processing_logger.info(f"💬 {comment_policy.summary()}")
             self.progress.emit(90)
             os.makedirs(self.save_folder, exist_ok=True)
             date_str = datetime.now().strftime("%b %d %Y")
             output_name = f"Consolidated - {date_str}.xlsm" if keep_vba else f"Consolidated - {date_str}.xlsx"
             output_path = os.path.join(self.save_folder, output_name)
             
+            sheet_streams = []
             try:
-                contrib_ws = output_wb.create_sheet("Contributions")
-                contrib_ws["A1"] = "CONTRIBUTIONS INDEX"
-                contrib_ws["A1"].font = Font(bold=True, size=14, color="2F5597")
-                contrib_ws.merge_cells('A1:D1')
-                contrib_ws["A3"] = "Search (use column filters):"
-                contrib_ws["A5"] = "Cell"
-                contrib_ws["B5"] = "File Name"
-                contrib_ws["C5"] = "Contribution"
-                r = 6
-                coord_to_first_row = {}
-                # Sort coordinates in natural Excel order (A1, A2, ..., B1, ...)
-                def _col_to_num(col_letters):
-                    result = 0
-                    for ch in col_letters:
-                        if 'a' <= ch <= 'z':
-                            ch = chr(ord(ch) - 32)
-                        result = result * 26 + (ord(ch) - 64)
-                    return result
-                def _cell_sort_key(cell_ref):
-                    col = ""
-                    row_str = ""
-                    for ch in cell_ref:
-                        if ch.isalpha():
-                            col += ch
-                        elif ch.isdigit():
-                            row_str += ch
-                    return (_col_to_num(col), int(row_str) if row_str else 0)
-
-                for coord in sorted(contributions.keys(), key=_cell_sort_key):
-                    file_map = contributions.get(coord, {})
-                    # Iterate through the complete set of files; fill 0 where missing
-                    for fname in all_file_labels:
-                        v = file_map.get(fname, 0)
-                        contrib_ws[f"A{r}"] = coord
-                        contrib_ws[f"B{r}"] = fname
-                        try:
-                            format_info = coord_format_info.get(coord, {})
-                            v_out = v
-                            
-                            if format_info.get('is_percentage', False):
-                                # PERCENTAGE VALUES - Accurate Display in Contributions Sheet
-                                # v_out is in percentage points (e.g., 84.36 for 84.36%)
-                                # Excel needs decimal format (0.8436) with percentage format to display as 84.36%
-                                contrib_ws[f"C{r}"] = float(v_out) / 100  # Convert to Excel decimal
-                                template_format = format_info.get('number_format', '0.00%')
-                                contrib_ws[f"C{r}"].number_format = template_format
-                                # Result: Displays as 84.36% (CORRECT)
-                                
-                            elif format_info.get('is_currency', False):
-                                # CURRENCY VALUES - Accurate Display
-                                # v_out is already in correct format (e.g., 1234.56)
-                                contrib_ws[f"C{r}"] = float(v_out)
-                                template_format = format_info.get('number_format', '$#,##0.00')
-                                contrib_ws[f"C{r}"].number_format = template_format
-                                # Result: Displays as $1,234.56 (CORRECT)
-                                
-                            elif format_info.get('is_number', False):
-                                # NUMBER VALUES - Accurate Display
-                                # v_out is already in correct format (e.g., 1234.56)
-                                contrib_ws[f"C{r}"] = float(v_out)
-                                template_format = format_info.get('number_format', '#,##0.00')
-                                contrib_ws[f"C{r}"].number_format = template_format
-                                # Result: Displays as 1,234.56 (CORRECT)
-                                
-                            else:
-                                # DEFAULT - Unformatted values
-                                contrib_ws[f"C{r}"] = float(v_out)
-                                
-                        except Exception:
-                            # Fallback: Use raw value if formatting fails
-                            contrib_ws[f"C{r}"] = v
-                        if coord not in coord_to_first_row:
-                            coord_to_first_row[coord] = r
-                        r += 1
-                    # Add a visual break between groups of the same cell reference
-                    # This blank row helps users identify each group easily
-                    r += 1
-                if r > 6:
-                    contrib_ws.auto_filter.ref = f"A5:C{r-1}"
-                contrib_ws.column_dimensions['A'].width = 12
-                contrib_ws.column_dimensions['B'].width = 40
-                contrib_ws.column_dimensions['C'].width = 16
-                try:
-                    for coord in totals.keys():
-                        first_row = coord_to_first_row.get(coord)
-                        if first_row:
-                            cell = output_ws[coord]
-                            if isinstance(cell, MergedCell):
-                                continue
-                            link = f"#'Contributions'!A{first_row}"
-                            cell.hyperlink = link
-                except Exception:
-                    pass
+                # Data rows are streamed to temporary files and merged into the
+                # package on save; past the row budget they continue on
+                # "Contributions (2)", "Contributions (3)", ...
+                style_map = output_package.style_map if output_package is not None else None
+                if self._get_contributions_layout(all_file_labels) == LAYOUT_WIDE:
+                    file_count = len(all_file_labels)
+                    contrib_shards = ContributionShards(
+                        output_wb,
+                        lambda ws: self._add_contributions_header(ws, all_file_labels),
+                        lambda ws, last_row: self._finish_contributions_sheet(ws, last_row, file_count),
+                        max_rows=self._get_contributions_max_rows(), style_map=style_map)
+                    write_rows = write_wide_contribution_rows
+                else:
+                    contrib_shards = ContributionShards(
+                        output_wb, self._add_contributions_header, self._finish_contributions_sheet,
+                        max_rows=self._get_contributions_max_rows(), style_map=style_map)
+                    write_rows = write_contribution_rows
+                sheet_streams = contrib_shards.streams
+                with metrics.stage('contributions_sheet'):
+                    contribution_links = write_rows(
+                        contrib_shards, contributions, all_file_labels, coord_format_info)
+                    if len(sheet_streams) > 1:
+                        processing_logger.info(f"📑 Contributions split across {len(sheet_streams)} sheets")
+                    try:
+                        for key in contributions.keys:
+                            link = contribution_links.get(key)
+                            if link:
+                                row, col = unpack(key)
+                                cell = output_ws.cell(row=row, column=col)
+                                if isinstance(cell, MergedCell):
+                                    continue
+                                cell.hyperlink = link
+                    except Exception:
+                        pass
                 # Create a plain consolidated sheet with full formatting (but no hyperlinks/comments)
                 try:
-                    plain_ws = output_wb.create_sheet("Consolidated (Plain)")
-                    
-                    # Copy all formatting from the main output sheet
-                    # This includes: fonts, fills, borders, alignments, number formats, column widths, row heights, merged cells
-                    
-                    # Copy merged cells first
-                    for merged_range in output_ws.merged_cells.ranges:
-                        plain_ws.merge_cells(str(merged_range))
-                    
-                    # Copy column widths
-                    for col_letter, col_dim in output_ws.column_dimensions.items():
-                        plain_ws.column_dimensions[col_letter].width = col_dim.width
-                    
-                    # Copy row heights
-                    for row_num, row_dim in output_ws.row_dimensions.items():
-                        plain_ws.row_dimensions[row_num].height = row_dim.height
-                    
-                    # Copy all cells with their formatting and values
-                    for row in output_ws.iter_rows():
-                        for cell in row:
-                            plain_cell = plain_ws[cell.coordinate]
-                            
-                            # Skip merged cells (already handled above)
-                            if isinstance(cell, MergedCell) or isinstance(plain_cell, MergedCell):
-                                continue
-                            
-                            # Copy value (but not formula - use the calculated value)
-                            plain_cell.value = cell.value
-                            
-                            # Copy all formatting
-                            if cell.has_style:
-                                plain_cell.font = copy(cell.font)
-                                plain_cell.border = copy(cell.border)
-                                plain_cell.fill = copy(cell.fill)
-                                plain_cell.number_format = copy(cell.number_format)
-                                plain_cell.protection = copy(cell.protection)
-                                plain_cell.alignment = copy(cell.alignment)
-                            
-                            # Explicitly do NOT copy hyperlinks or comments
-                            # (plain_cell.hyperlink and plain_cell.comment remain None)
-                            
+                    # Cells share the main sheet's style ids (no per-cell style object copies)
+                    with metrics.stage('plain_sheet'):
+                        if output_package is not None:
+                            output_package.clone_plain_sheet("Consolidated (Plain)")
+                        else:
+                            clone_plain_sheet(output_ws, "Consolidated (Plain)")
                 except Exception:
                     pass
             except Exception:
@@ -2475,17 +2648,31 @@ class ConsolidationWorker(QThread):
             if ensure_backup is not None:
                 backup_target = ensure_backup(self.save_folder, self.settings, os.path.basename(output_path))
             try:
-                output_wb.save(output_path)
+                with metrics.stage('save'):
+                    if output_package is not None:
+                        output_package.save(output_path, sheet_streams)
+                    else:
+                        save_workbook(output_wb, output_path, sheet_streams)
             except Exception as e:
                 error_msg = self._get_save_error_message(e, output_path)
                 self.finished.emit("error", error_msg)
                 return
+            finally:
+                for stream in sheet_streams:
+                    stream.close()
             if backup_target:
                 try:
                     import shutil
                     shutil.copy2(output_path, backup_target)
                 except Exception:
                     pass
+            # Saved only after a successful run, so the next run can start from it
+            run_state.save()
+            metrics.finish()
+            try:
+                processing_logger.info(f"⏱️ Run metrics: {metrics.write(output_path)}")
+            except Exception as e:
+                processing_logger.warning(f"⚠️ Could not write run metrics: {e}")
             self.progress.emit(100)
             self.finished.emit("success", output_path)
         except Exception as e:
@@ -3479,4 +3666,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Consolidation engine modules (Qt-free, shared by desktop and web)
+"""
@@ -0,0 +1,436 @@
+"""
+Dense Contribution Accumulator for Excel Consolidator
+
+Replaces the ``contributions[coord][file_label] = Decimal`` dict-of-dicts with
+a NumPy matrix: one row per source file label, one column per consolidated
+cell (columns are assigned the first time a cell receives a value, so column
+order is the same first-encounter order the totals dict used to have).
+
+Per-file values are stored as float64, which is exactly what the output
+writes (``float(Decimal)``); whether the original Decimal was non-zero is kept
+in a separate mask so zero detection does not depend on float rounding.
+Totals stay exact Decimal sums because consolidated values are written as
+``float(sum)`` / ``float(sum / count)`` of the exact sums.
+
+A matrix can be exported with to_state() and restored with from_state() so an
+incremental run (src.engine.run_state) can subtract the partials of changed
+files instead of re-adding every file. Subtraction only gives the same totals
+as a fresh run while no Decimal sum was ever rounded, which ``exact`` tracks.
+
+With ``fixed_point_digits`` set, totals are kept as int64 multiples of
+10**-digits and summed with vectorized integer adds instead of one Decimal
+addition per cell. Integer sums are exact, so the written values do not
+change. A cell that receives a value with more decimals than the scale (e.g.
+a percentage like 83.333...), or whose sum could leave the int64 range,
+switches to a Decimal total; all other cells stay on the integer path.
+"""
+
+from decimal import Decimal, Inexact, localcontext
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Largest magnitude a fixed-point total may reach (headroom below 2**63)
+FIXED_POINT_LIMIT = 2 ** 62
+
+
+class ContributionMatrix:
+    """
+    Accumulates per-file partials (``{coordinate key: Decimal}``) for one run.
+
+    Args:
+        file_labels: Labels of all source files (duplicates share a row)
+        total_files: File count used as the divisor of percentage averages
+        exclude_zero_percent: Average percentages over non-zero files only
+        fixed_point_digits: Keep totals as scaled integers with this many
+            decimal places (None: Decimal totals)
+    """
+
+    def __init__(self, file_labels: Iterable[str], total_files: Optional[int] = None,
+                 exclude_zero_percent: bool = False, capacity: int = 256,
+                 fixed_point_digits: Optional[int] = None):
+        self.labels: List[str] = []
+        self._label_rows: Dict[str, int] = {}
+        for label in file_labels:
+            if label not in self._label_rows:
+                self._label_rows[label] = len(self.labels)
+                self.labels.append(label)
+        self.total_files = len(self.labels) if total_files is None else total_files
+        self.exclude_zero_percent = exclude_zero_percent
+
+        # Columns: coordinate keys in first-encounter order
+        self.keys: List[int] = []
+        self._cols: Dict[int, int] = {}
+        # Decimal totals per column (None until the column's first value)
+        self._totals: List[Optional[Decimal]] = []
+
+        # Fixed-point totals, a bound on the magnitude they can reach, and
+        # the columns that had to switch to Decimal totals
+        self.fixed_point_digits = fixed_point_digits or None
+        self._fixed: Optional[np.ndarray] = None
+        self._fixed_bound: Optional[np.ndarray] = None
+        self._decimal_cols: Optional[np.ndarray] = None
+        if self.fixed_point_digits:
+            self._scale = Decimal(10) ** self.fixed_point_digits
+            self._fixed = np.zeros(max(1, capacity), dtype=np.int64)
+            self._fixed_bound = np.zeros(max(1, capacity), dtype=np.float64)
+            self._decimal_cols = np.zeros(max(1, capacity), dtype=bool)
+
+        shape = (max(1, len(self.labels)), max(1, capacity))
+        self._values = np.zeros(shape, dtype=np.float64)
+        self._present = np.zeros(shape, dtype=bool)
+        self._nonzero = np.zeros(shape, dtype=bool)
+        self._nonzero_counts: Optional[np.ndarray] = None
+        # False once a Decimal total had to be rounded (totals then depend on order)
+        self.exact = True
+
+        # Files in display order (case-insensitive label sort) for comments
+        self._display_rows = self._display_order(self.labels)
+
+    @staticmethod
+    def _display_order(labels: List[str]) -> np.ndarray:
+        return np.array(sorted(range(len(labels)), key=lambda i: labels[i].lower()), dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._cols
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._values.shape[1]
+        while capacity < needed:
+            capacity *= 2
+        extra = capacity - self._values.shape[1]
+        rows = self._values.shape[0]
+        self._values = np.hstack([self._values, np.zeros((rows, extra), dtype=np.float64)])
+        self._present = np.hstack([self._present, np.zeros((rows, extra), dtype=bool)])
+        self._nonzero = np.hstack([self._nonzero, np.zeros((rows, extra), dtype=bool)])
+        if self._fixed is not None:
+            self._fixed = np.concatenate([self._fixed, np.zeros(extra, dtype=np.int64)])
+            self._fixed_bound = np.concatenate([self._fixed_bound, np.zeros(extra, dtype=np.float64)])
+            self._decimal_cols = np.concatenate([self._decimal_cols, np.zeros(extra, dtype=bool)])
+
+    # ------------------------------------------------------------------
+    # Totals
+    # ------------------------------------------------------------------
+
+    def _to_fixed(self, val: Decimal) -> Optional[int]:
+        """Scaled integer of ``val``, or None if it does not fit the scale."""
+        try:
+            shifted = val.scaleb(self.fixed_point_digits)
+            n = int(shifted)
+        except (ValueError, OverflowError):
+            # NaN / Infinity
+            return None
+        if n != shifted or abs(n) >= FIXED_POINT_LIMIT:
+            return None
+        return n
+
+    def _from_fixed(self, n: int) -> Decimal:
+        return Decimal(n) / self._scale
+
+    def _to_decimal_column(self, col: int, has_total: bool) -> None:
+        """Continue the column with a Decimal total."""
+        totals = self._totals
+        if len(totals) < len(self.keys):
+            totals.extend([None] * (len(self.keys) - len(totals)))
+        totals[col] = self._from_fixed(int(self._fixed[col])) if has_total else None
+        self._decimal_cols[col] = True
+
+    def _update_totals(self, cols: List[int], values: List[Decimal], new_from: int,
+                       subtract: bool = False) -> None:
+        if self._fixed is not None:
+            decimal_cols: List[int] = []
+            decimal_values: List[Decimal] = []
+            fixed_cols: List[int] = []
+            scaled: List[int] = []
+            originals: List[Decimal] = []
+            in_decimal = self._decimal_cols
+            for col, val in zip(cols, values):
+                n = None if in_decimal[col] else self._to_fixed(val)
+                if n is None:
+                    decimal_cols.append(col)
+                    decimal_values.append(val)
+                else:
+                    fixed_cols.append(col)
+                    scaled.append(n)
+                    originals.append(val)
+            if fixed_cols:
+                idx = np.array(fixed_cols, dtype=np.intp)
+                delta = np.array(scaled, dtype=np.int64)
+                bound = self._fixed_bound[idx] + np.abs(delta).astype(np.float64)
+                over = bound >= FIXED_POINT_LIMIT
+                if over.any():
+                    # Sums that could overflow continue as Decimals
+                    for i in np.flatnonzero(over).tolist():
+                        decimal_cols.append(fixed_cols[i])
+                        decimal_values.append(originals[i])
+                    keep = ~over
+                    idx, delta, bound = idx[keep], delta[keep], bound[keep]
+                self._fixed_bound[idx] = bound
+                if subtract:
+                    self._fixed[idx] -= delta
+                else:
+                    self._fixed[idx] += delta
+            for col in decimal_cols:
+                if not in_decimal[col]:
+                    self._to_decimal_column(col, subtract or col < new_from)
+            if not decimal_cols:
+                return
+            cols, values = decimal_cols, decimal_values
+
+        totals = self._totals
+        if len(totals) < len(self.keys):
+            totals.extend([None] * (len(self.keys) - len(totals)))
+        with localcontext() as ctx:
+            ctx.clear_flags()
+            if subtract:
+                for col, val in zip(cols, values):
+                    totals[col] = totals[col] - val
+            else:
+                for col, val in zip(cols, values):
+                    current = totals[col]
+                    totals[col] = val if current is None else current + val
+            if ctx.flags[Inexact]:
+                self.exact = False
+
+    def add_partial(self, label: str, values: Dict[int, Decimal]) -> None:
+        """Add one file's values (coordinate key -> Decimal) to the matrix."""
+        if not values:
+            return
+        row = self._label_rows.get(label)
+        if row is None:
+            # Label not announced up front: extend by one row
+            row = len(self.labels)
+            self._label_rows[label] = row
+            self.labels.append(label)
+            self._display_rows = self._display_order(self.labels)
+            width = self._values.shape[1]
+            if row >= self._values.shape[0]:
+                self._values = np.vstack([self._values, np.zeros((1, width), dtype=np.float64)])
+                self._present = np.vstack([self._present, np.zeros((1, width), dtype=bool)])
+                self._nonzero = np.vstack([self._nonzero, np.zeros((1, width), dtype=bool)])
+
+        cols_map = self._cols
+        keys = self.keys
+        new_from = len(keys)
+        cols: List[int] = []
+        floats: List[float] = []
+        nonzero: List[bool] = []
+        for key, val in values.items():
+            col = cols_map.get(key)
+            if col is None:
+                col = len(keys)
+                cols_map[key] = col
+                keys.append(key)
+            cols.append(col)
+            floats.append(float(val))
+            nonzero.append(val != 0)
+
+        if len(keys) > self._values.shape[1]:
+            self._grow(len(keys))
+        self._update_totals(cols, list(values.values()), new_from)
+        idx = np.fromiter(cols, dtype=np.intp, count=len(cols))
+        if self._present[row, idx].any():
+            # Same label seen before (e.g. 'x.xls' and 'x.xlsx'): values add up
+            self._values[row, idx] += np.array(floats, dtype=np.float64)
+            self._nonzero[row, idx] = self._values[row, idx] != 0
+        else:
+            self._values[row, idx] = floats
+            self._nonzero[row, idx] = nonzero
+        self._present[row, idx] = True
+        self._nonzero_counts = None
+
+    def remove_partial(self, label: str, values: Dict[int, Decimal]) -> None:
+        """Take back the values a file added with add_partial (label must be unique)."""
+        row = self._label_rows.get(label)
+        if row is None or not values:
+            return
+        cols: List[int] = []
+        removed: List[Decimal] = []
+        for key, val in values.items():
+            col = self._cols.get(key)
+            if col is not None:
+                cols.append(col)
+                removed.append(val)
+        self._update_totals(cols, removed, len(self.keys), subtract=True)
+        idx = np.array(cols, dtype=np.intp)
+        self._values[row, idx] = 0.0
+        self._present[row, idx] = False
+        self._nonzero[row, idx] = False
+        self._nonzero_counts = None
+
+    def reset_labels(self, file_labels: Iterable[str]) -> None:
+        """Keep only the rows of ``file_labels`` (adding empty rows for new ones)."""
+        labels: List[str] = []
+        for label in file_labels:
+            if label not in labels:
+                labels.append(label)
+        rows = [self._label_rows.get(label, -1) for label in labels]
+        width = self._values.shape[1]
+        values = np.zeros((max(1, len(labels)), width), dtype=np.float64)
+        present = np.zeros(values.shape, dtype=bool)
+        nonzero = np.zeros(values.shape, dtype=bool)
+        for new_row, old_row in enumerate(rows):
+            if old_row >= 0:
+                values[new_row] = self._values[old_row]
+                present[new_row] = self._present[old_row]
+                nonzero[new_row] = self._nonzero[old_row]
+        self._values, self._present, self._nonzero = values, present, nonzero
+        self.labels = labels
+        self._label_rows = {label: i for i, label in enumerate(labels)}
+        self._display_rows = self._display_order(labels)
+        self._nonzero_counts = None
+
+    def drop_empty_columns(self) -> None:
+        """Forget cells no remaining file contributes to (after remove_partial)."""
+        width = len(self.keys)
+        keep = self._present[:, :width].any(axis=0)
+        if keep.all():
+            return
+        kept = np.flatnonzero(keep)
+        self.keys = [self.keys[i] for i in kept]
+        if self._fixed is not None:
+            self._fixed = self._fixed[kept]
+            self._fixed_bound = self._fixed_bound[kept]
+            self._decimal_cols = self._decimal_cols[kept]
+            self._totals.extend([None] * (width - len(self._totals)))
+        self._totals = [self._totals[i] for i in kept]
+        self._cols = {key: col for col, key in enumerate(self.keys)}
+        self._values = np.ascontiguousarray(self._values[:, kept])
+        self._present = np.ascontiguousarray(self._present[:, kept])
+        self._nonzero = np.ascontiguousarray(self._nonzero[:, kept])
+        if self._values.shape[1] == 0:
+            self._grow(1)
+        self._nonzero_counts = None
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_state(self) -> Tuple[dict, Dict[str, np.ndarray]]:
+        """(JSON-ready metadata, arrays) describing the matrix, for from_state()."""
+        rows, width = len(self.labels), len(self.keys)
+        meta = {
+            'labels': self.labels,
+            'keys': self.keys,
+            'totals': [str(total) for _key, total in self.totals()],
+            'exact': self.exact,
+        }
+        arrays = {
+            'values': self._values[:rows, :width],
+            'present': self._present[:rows, :width],
+            'nonzero': self._nonzero[:rows, :width],
+        }
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta: dict, arrays: Dict[str, np.ndarray], total_files: Optional[int] = None,
+                   exclude_zero_percent: bool = False,
+                   fixed_point_digits: Optional[int] = None) -> 'ContributionMatrix':
+        """Rebuild a matrix saved with to_state()."""
+        matrix = cls(meta['labels'], total_files, exclude_zero_percent, capacity=max(1, len(meta['keys'])),
+                     fixed_point_digits=fixed_point_digits)
+        rows, width = arrays['values'].shape
+        if rows != len(matrix.labels) or width != len(meta['keys']):
+            raise ValueError("Run state arrays do not match their labels/keys")
+        matrix.keys = list(meta['keys'])
+        matrix._cols = {key: col for col, key in enumerate(matrix.keys)}
+        matrix.exact = bool(meta['exact'])
+        matrix._values[:rows, :width] = arrays['values']
+        matrix._present[:rows, :width] = arrays['present']
+        matrix._nonzero[:rows, :width] = arrays['nonzero']
+        totals = [Decimal(total) for total in meta['totals']]
+        if matrix._fixed is None:
+            matrix._totals = totals
+            return matrix
+        # Magnitude bound from the per-file values behind each total
+        bounds = np.abs(matrix._values[:rows, :width]).sum(axis=0) * 10.0 ** fixed_point_digits
+        matrix._totals = [None] * width
+        for col, total in enumerate(totals):
+            n = matrix._to_fixed(total)
+            if n is None or bounds[col] >= FIXED_POINT_LIMIT:
+                matrix._totals[col] = total
+                matrix._decimal_cols[col] = True
+            else:
+                matrix._fixed[col] = n
+                matrix._fixed_bound[col] = bounds[col]
+        return matrix
+
+    # ------------------------------------------------------------------
+    # Reductions
+    # ------------------------------------------------------------------
+
+    def _counts(self) -> np.ndarray:
+        if self._nonzero_counts is None:
+            width = len(self.keys)
+            self._nonzero_counts = self._nonzero[:, :width].sum(axis=0)
+        return self._nonzero_counts
+
+    def total(self, key: int) -> Decimal:
+        """Exact Decimal sum of all values received by the cell."""
+        col = self._cols[key]
+        if self._fixed is not None and not self._decimal_cols[col]:
+            return self._from_fixed(int(self._fixed[col]))
+        return self._totals[col]
+
+    def totals(self) -> Iterable[Tuple[int, Decimal]]:
+        """(key, total) pairs in first-encounter order."""
+        if self._fixed is not None:
+            width = len(self.keys)
+            fixed = self._fixed[:width].tolist()
+            in_decimal = self._decimal_cols[:width].tolist()
+            return [(key, self._totals[col] if in_decimal[col] else self._from_fixed(fixed[col]))
+                    for col, key in enumerate(self.keys)]
+        return zip(self.keys, self._totals)
+
+    def nonzero_count(self, key: int) -> int:
+        """Number of files with a non-zero value for the cell."""
+        return int(self._counts()[self._cols[key]])
+
+    def percent_count(self, key: int) -> int:
+        """Divisor for a percentage average: all files, or non-zero files when excluding zeros."""
+        if self.exclude_zero_percent:
+            return self.nonzero_count(key)
+        return self.total_files
+
+    def _contributing_rows(self, col: int) -> np.ndarray:
+        """Rows of the files that contributed to a column, in display order."""
+        rows = self._display_rows
+        return rows[self._present[rows, col]]
+
+    def file_values(self, key: int) -> List[Tuple[str, float]]:
+        """(label, value) for every file that contributed to the cell, sorted by label."""
+        col = self._cols.get(key)
+        if col is None:
+            return []
+        rows = self._contributing_rows(col)
+        labels = self.labels
+        return [(labels[i], v) for i, v in zip(rows.tolist(), self._values[rows, col].tolist())]
+
+    def top_file_values(self, key: int, n: int) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        The ``n`` largest contributions to the cell by magnitude as (label, value),
+        largest first (label order among equals), and the number of contributing files.
+        """
+        col = self._cols.get(key)
+        if col is None:
+            return [], 0
+        rows = self._contributing_rows(col)
+        values = self._values[rows, col]
+        top = np.argsort(-np.abs(values), kind='stable')[:max(0, n)]
+        labels = self.labels
+        return [(labels[i], v) for i, v in zip(rows[top].tolist(), values[top].tolist())], len(rows)
+
+    def label_rows(self, labels: Iterable[str]) -> np.ndarray:
+        """Matrix rows of the given labels, for column_values()."""
+        return np.array([self._label_rows[label] for label in labels], dtype=np.intp)
+
+    def column_values(self, key: int, rows: np.ndarray) -> List[float]:
+        """Values of the cell for each of ``rows`` (0.0 where a file has none)."""
+        col = self._cols.get(key)
+        if col is None:
+            return [0.0] * len(rows)
+        return self._values[rows, col].tolist()
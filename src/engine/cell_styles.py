@@ -0,0 +1,61 @@
+"""
+Consolidated Cell Styles for Excel Consolidator
+
+Every consolidated cell keeps its template style but gets the highlight
+border and, for percentage, currency and number cells, the template's
+number format. Assigning ``cell.border`` and ``cell.number_format`` one
+cell at a time hashes and looks up the border and format in the
+workbook's style tables for every cell.
+
+A template uses only a handful of distinct cell styles, so ConsolidatedStyles
+derives the consolidated variant of each (template style, number format)
+pair once and gives every cell a copy of that precomputed StyleArray: one
+style assignment per cell, and a single border and format entry in the
+style table however many cells share them.
+"""
+
+from copy import copy
+from typing import Dict, Optional, Tuple
+
+from openpyxl.styles import Border
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE
+
+
+class ConsolidatedStyles:
+    """
+    Styles of the consolidated cells of one output workbook.
+
+    Args:
+        border: Highlight border of consolidated cells
+    """
+
+    def __init__(self, border: Border):
+        self.border = border
+        self._styles: Dict[Tuple[Tuple[int, ...], Optional[str]], StyleArray] = {}
+
+    def _derive(self, cell, number_format: Optional[str]) -> StyleArray:
+        workbook = cell.parent.parent
+        style = copy(cell._style)
+        if number_format is not None:
+            if number_format in BUILTIN_FORMATS_REVERSE:
+                style.numFmtId = BUILTIN_FORMATS_REVERSE[number_format]
+            else:
+                style.numFmtId = workbook._number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+        style.borderId = workbook._borders.add(self.border)
+        return style
+
+    def apply(self, cell, number_format: Optional[str] = None) -> None:
+        """Give ``cell`` the highlight border and ``number_format`` (None keeps the template's)."""
+        style = getattr(cell, '_style', None)
+        if style is None:
+            # TemplatePackage cells record formats and derive their styles on save
+            if number_format is not None:
+                cell.number_format = number_format
+            cell.border = self.border
+            return
+        key = (tuple(style), number_format)
+        derived = self._styles.get(key)
+        if derived is None:
+            derived = self._styles[key] = self._derive(cell, number_format)
+        cell._style = copy(derived)
@@ -0,0 +1,85 @@
+"""
+Audit Comment Policy for Excel Consolidator
+
+Every consolidated cell gets a comment listing what each source file
+contributed. With hundreds of files that is a long text per cell, saved as
+a comment plus a VML shape: thousands of cells make tens of megabytes of
+comments, a slow save and a slow open in Excel.
+
+A CommentPolicy decides how much of that list a cell's comment carries:
+
+- full: every contributing file (default)
+- top: the largest contributions, then a line pointing to the
+  Contributions sheet for the rest
+- none: no comments (the Contributions sheet has the same data)
+
+and bounds the comment text of a workbook: cells whose comment would go
+past the byte budget get none.
+"""
+
+from typing import List, Tuple
+
+from src.engine.accumulator import ContributionMatrix
+
+COMMENTS_FULL = 'full'
+COMMENTS_TOP = 'top'
+COMMENTS_NONE = 'none'
+COMMENT_STRATEGIES = (COMMENTS_FULL, COMMENTS_TOP, COMMENTS_NONE)
+
+# Contributors listed per comment with the 'top' strategy
+DEFAULT_TOP_CONTRIBUTORS = 10
+
+
+class CommentPolicy:
+    """
+    Comment strategy and byte budget of one output workbook.
+
+    Args:
+        strategy: 'full', 'top' or 'none' (unknown values mean 'full')
+        top_n: Contributors listed by the 'top' strategy
+        max_bytes: Budget for the comment text of the workbook in UTF-8
+            bytes (0 = unlimited)
+    """
+
+    def __init__(self, strategy: str = COMMENTS_FULL, top_n: int = DEFAULT_TOP_CONTRIBUTORS,
+                 max_bytes: int = 0):
+        self.strategy = strategy if strategy in COMMENT_STRATEGIES else COMMENTS_FULL
+        self.top_n = max(1, int(top_n))
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self.written = 0
+        self.written_bytes = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.strategy != COMMENTS_NONE
+
+    def contributors(self, contributions: ContributionMatrix, key: int) -> Tuple[List[Tuple[str, float]], int]:
+        """(file, value) pairs a cell's comment lists, and how many contributing files it leaves out."""
+        if self.strategy == COMMENTS_NONE:
+            return [], 0
+        if self.strategy == COMMENTS_TOP:
+            items, count = contributions.top_file_values(key, self.top_n)
+            return items, count - len(items)
+        return contributions.file_values(key), 0
+
+    @staticmethod
+    def omitted_line(omitted: int) -> str:
+        """Last line of a comment that lists only the top contributors."""
+        return f"... and {omitted} more file{'s' if omitted != 1 else ''} (see the Contributions sheet)"
+
+    def admit(self, text: str) -> bool:
+        """Whether a comment with ``text`` fits the remaining budget; counts it if so."""
+        size = len(text.encode('utf-8'))
+        if self.max_bytes and self.written_bytes + size > self.max_bytes:
+            self.skipped += 1
+            return False
+        self.written += 1
+        self.written_bytes += size
+        return True
+
+    def summary(self) -> str:
+        text = f"{self.written} comments ({self.written_bytes / 1024:,.0f} KB of text, {self.strategy})"
+        if self.skipped:
+            text += f", {self.skipped} left out over the {self.max_bytes / 1024:,.0f} KB budget"
+        return text
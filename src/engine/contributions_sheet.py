@@ -0,0 +1,183 @@
+"""
+Contributions Sheet Rows for Excel Consolidator
+
+The data rows of the Contributions index, shared by the desktop and web
+output code: for every consolidated cell (natural Excel order: A1, A2, ...,
+B1, ...) one row per source file (Cell | File Name | Contribution, 0 where a
+file has no value) followed by a blank spacer row.
+
+Large runs (hundreds of files x thousands of cells) exceed Excel's row limit,
+so the rows go to ContributionShards: a new sheet is started whenever the
+row budget of the current one would be exceeded ("Contributions (1)",
+"Contributions (2)", ...; a single sheet keeps the plain title). A cell's
+rows stay on one sheet unless they alone exceed the budget. Each sheet is
+a SheetStream, flushed to disk as soon as it is full.
+
+The "wide" layout writes the same matrix pivoted: one row per cell
+(Cell | one column per file), without the repeated coordinate and file
+name, so it has a file count's fewer rows than the "long" layout above.
+"""
+
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+
+from src.engine.accumulator import ContributionMatrix
+from src.engine.coords import column_major, to_a1
+from src.engine.sheet_stream import SheetStream
+
+# Rows and columns per worksheet in Excel
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_COLUMNS = 16384
+
+# Contributions sheet layouts: (cell, file) rows or one row per cell
+LAYOUT_LONG = 'long'
+LAYOUT_WIDE = 'wide'
+CONTRIBUTION_LAYOUTS = (LAYOUT_LONG, LAYOUT_WIDE)
+
+
+def wide_layout_fits(labels: List[str]) -> bool:
+    """Whether one column per file (plus the Cell column) fits on a worksheet."""
+    return len(labels) + 1 <= EXCEL_MAX_COLUMNS
+
+
+def contribution_format(format_info) -> Tuple[Optional[str], float]:
+    """(number format, divisor) of a cell's contributions; percent points are shown as fractions."""
+    if format_info.get('is_percentage', False):
+        return format_info.get('number_format', '0.00%'), 100.0
+    elif format_info.get('is_currency', False):
+        return format_info.get('number_format', '$#,##0.00'), 1.0
+    elif format_info.get('is_number', False):
+        return format_info.get('number_format', '#,##0.00'), 1.0
+    return None, 1.0
+
+
+class ContributionShards:
+    """
+    The Contributions sheet(s) of one output workbook.
+
+    Args:
+        workbook: Output workbook (or TemplatePackage) the sheets are added to
+        add_header: Writes the header rows of a new sheet, returns its first data row
+        finish: Called with (sheet, last used row) once a sheet is complete
+            (autofilter, column widths)
+        title: Sheet title (numbered once there is more than one sheet)
+        max_rows: Row budget per sheet, header rows included
+        style_map: Style id translation of the sheets' streams (see SheetStream)
+    """
+
+    def __init__(self, workbook: Workbook, add_header: Callable[[Worksheet], int],
+                 finish: Callable[[Worksheet, int], None], title: str = 'Contributions',
+                 max_rows: int = EXCEL_MAX_ROWS, style_map: Optional[Callable[[int], int]] = None):
+        self.workbook = workbook
+        self.add_header = add_header
+        self.finish = finish
+        self.title = title
+        self.max_rows = max(1, min(int(max_rows), EXCEL_MAX_ROWS))
+        self.style_map = style_map
+        self.streams: List[SheetStream] = []
+        self._row = 0
+        self._first_row = 0
+        self._finished = True
+
+    def _start_sheet(self) -> None:
+        self._finish_sheet()
+        if len(self.streams) == 1:
+            self.streams[0].worksheet.title = f"{self.title} (1)"
+        title = self.title if not self.streams else f"{self.title} ({len(self.streams) + 1})"
+        worksheet = self.workbook.create_sheet(title)
+        self._first_row = self._row = self.add_header(worksheet)
+        if self._first_row > self.max_rows:
+            raise ValueError(f"Row budget of {self.max_rows} leaves no room below the header")
+        self.streams.append(SheetStream(worksheet, self.style_map))
+        self._finished = False
+
+    def _finish_sheet(self) -> None:
+        if not self._finished:
+            stream = self.streams[-1]
+            self.finish(stream.worksheet, min(self._row - 1, self.max_rows))
+            stream.flush()
+            self._finished = True
+
+    def start_group(self, size: int) -> None:
+        """Start a new sheet unless ``size`` rows fit on the current one (or it is empty)."""
+        if not self.streams or (self._row + size - 1 > self.max_rows and self._row > self._first_row):
+            self._start_sheet()
+
+    def append_row(self, cells) -> Tuple[int, int]:
+        """Write a row of (column, value, style id) cells; returns (sheet index, row)."""
+        if not self.streams or self._row > self.max_rows:
+            self._start_sheet()
+        row = self._row
+        self.streams[-1].append_row(row, cells)
+        self._row += 1
+        return len(self.streams) - 1, row
+
+    def skip_row(self) -> None:
+        """Leave a blank row (dropped at the end of a sheet)."""
+        self._row += 1
+
+    def style_id(self, number_format: Optional[str] = None) -> int:
+        if not self.streams:
+            self._start_sheet()
+        return self.streams[-1].style_id(number_format)
+
+    def close(self) -> None:
+        """Complete the last sheet (creating an empty one if needed); call once all rows are written."""
+        if not self.streams:
+            self._start_sheet()
+        self._finish_sheet()
+
+    def link(self, location: Tuple[int, int]) -> str:
+        """Hyperlink target of a (sheet index, row) returned by append_row()."""
+        sheet, row = location
+        return f"#'{self.streams[sheet].worksheet.title}'!A{row}"
+
+
+def write_contribution_rows(shards: ContributionShards, contributions: ContributionMatrix, labels: List[str],
+                            coord_format_info: Mapping[int, object]) -> Dict[int, str]:
+    """
+    Write the rows of every cell and complete the sheets.
+
+    Returns {key: hyperlink to the cell's first row}.
+    """
+    links: Dict[int, Tuple[int, int]] = {}
+    label_rows = contributions.label_rows(labels)
+    for key in sorted(contributions.keys, key=column_major):
+        coord = to_a1(key)
+        number_format, divisor = contribution_format(coord_format_info.get(key, {}))
+        shards.start_group(len(labels))
+        style_id = shards.style_id(number_format)
+        for fname, v in zip(labels, contributions.column_values(key, label_rows)):
+            value = float(v) / divisor if divisor != 1.0 else float(v)
+            location = shards.append_row(((1, coord, 0), (2, fname, 0), (3, value, style_id)))
+            links.setdefault(key, location)
+        # Blank row between the groups of two cells
+        shards.skip_row()
+    shards.close()
+    return {key: shards.link(location) for key, location in links.items()}
+
+
+def write_wide_contribution_rows(shards: ContributionShards, contributions: ContributionMatrix, labels: List[str],
+                                 coord_format_info: Mapping[int, object]) -> Dict[int, str]:
+    """
+    Write one row per cell (Cell | value of each of ``labels`` in columns 2, 3, ...)
+    and complete the sheets; see wide_layout_fits().
+
+    Returns {key: hyperlink to the cell's row}.
+    """
+    links: Dict[int, Tuple[int, int]] = {}
+    label_rows = contributions.label_rows(labels)
+    columns = range(2, len(labels) + 2)
+    for key in sorted(contributions.keys, key=column_major):
+        number_format, divisor = contribution_format(coord_format_info.get(key, {}))
+        style_id = shards.style_id(number_format)
+        values = contributions.column_values(key, label_rows)
+        if divisor != 1.0:
+            values = [v / divisor for v in values]
+        cells = [(1, to_a1(key), 0)]
+        cells.extend((col, value, style_id) for col, value in zip(columns, values))
+        links[key] = shards.append_row(cells)
+    shards.close()
+    return {key: shards.link(location) for key, location in links.items()}
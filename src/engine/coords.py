@@ -0,0 +1,165 @@
+"""
+Packed Cell Coordinates for Excel Consolidator
+
+The consolidation pipeline keys every per-cell structure (format info,
+totals, counts, contributions) by a single int instead of an A1 string:
+
+    key = (row << COL_BITS) | (col - 1)
+
+Excel has at most 16384 (2**14) columns, so the column fits in the low 14
+bits and ordering keys numerically gives row-major sheet order. A1 strings
+are only produced at the output boundary (cell labels, comments, logs).
+"""
+
+from typing import Collection, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import coordinate_to_tuple
+
+COL_BITS = 14
+COL_MASK = (1 << COL_BITS) - 1
+
+
+def pack(row: int, col: int) -> int:
+    """Pack a 1-based (row, col) pair into a coordinate key."""
+    return (row << COL_BITS) | (col - 1)
+
+
+def unpack(key: int) -> Tuple[int, int]:
+    """Return the 1-based (row, col) pair of a coordinate key."""
+    return key >> COL_BITS, (key & COL_MASK) + 1
+
+
+def pack_a1(coord: str) -> int:
+    """Coordinate key of an A1 reference such as 'C12'."""
+    row, col = coordinate_to_tuple(coord)
+    return pack(row, col)
+
+
+def to_a1(key: int) -> str:
+    """A1 reference of a coordinate key (e.g. for cell labels and comments)."""
+    return f"{get_column_letter((key & COL_MASK) + 1)}{key >> COL_BITS}"
+
+
+def column_major(key: int) -> Tuple[int, int]:
+    """Sort key for natural Excel order by column then row (A1, A2, ..., B1, ...)."""
+    return key & COL_MASK, key >> COL_BITS
+
+
+class CoordSet:
+    """
+    Compact set of coordinate keys, stored per row.
+
+    A template covers whole rectangles of cells, so each row's columns are
+    kept as a ``range`` when contiguous (the usual case) and as a frozenset
+    otherwise. Membership is O(1) either way, and a row of any width costs a
+    few dozen bytes instead of one set entry per cell. The per-row columns
+    double as reader targets ({row: cols}, see build_row_targets).
+    """
+
+    __slots__ = ('_rows', '_len')
+
+    def __init__(self, keys: Iterable[int] = ()):
+        by_row: Dict[int, Set[int]] = {}
+        for key in keys:
+            by_row.setdefault(key >> COL_BITS, set()).add((key & COL_MASK) + 1)
+        self._rows: Dict[int, Collection[int]] = {row: _compact_columns(by_row[row]) for row in sorted(by_row)}
+        self._len = sum(len(cols) for cols in self._rows.values())
+
+    def __contains__(self, key) -> bool:
+        cols = self._rows.get(key >> COL_BITS)
+        return cols is not None and (key & COL_MASK) + 1 in cols
+
+    def contains(self, row: int, col: int) -> bool:
+        cols = self._rows.get(row)
+        return cols is not None and col in cols
+
+    def __iter__(self) -> Iterator[int]:
+        """Keys in row-major order."""
+        for row, cols in self._rows.items():
+            base = row << COL_BITS
+            for col in (cols if isinstance(cols, range) else sorted(cols)):
+                yield base | (col - 1)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def row_targets(self) -> Dict[int, Collection[int]]:
+        """{row: cols} of the set (shared column objects; do not modify)."""
+        return dict(self._rows)
+
+    def bounding_box(self) -> Optional[Tuple[int, int, int, int]]:
+        if not self._rows:
+            return None
+        min_col = min(min(cols) for cols in self._rows.values())
+        max_col = max(max(cols) for cols in self._rows.values())
+        return next(iter(self._rows)), min_col, next(reversed(self._rows)), max_col
+
+    def clip(self, max_row: int, max_col: int) -> 'CoordSet':
+        """Keys up to ``max_row`` and ``max_col``."""
+        clipped = CoordSet()
+        for row, cols in self._rows.items():
+            if row > max_row:
+                break
+            if isinstance(cols, range):
+                kept = cols[:max(0, max_col - cols.start + 1)]
+            else:
+                kept = {col for col in cols if col <= max_col}
+                kept = _compact_columns(kept) if kept else None
+            if kept:
+                clipped._rows[row] = kept
+                clipped._len += len(kept)
+        return clipped
+
+
+def _compact_columns(cols: Set[int]) -> Collection[int]:
+    first, last = min(cols), max(cols)
+    if last - first + 1 == len(cols):
+        return range(first, last + 1)
+    return frozenset(cols)
+
+
+def build_row_targets(keys: Iterable[int]) -> Dict[int, Collection[int]]:
+    """Group coordinate keys by row ({row: cols}) so the reader can skip whole rows."""
+    if isinstance(keys, CoordSet):
+        return keys.row_targets()
+    targets: Dict[int, Set[int]] = {}
+    for key in keys:
+        targets.setdefault(key >> COL_BITS, set()).add((key & COL_MASK) + 1)
+    return targets
+
+
+def bounding_box(keys: Iterable[int]) -> Optional[Tuple[int, int, int, int]]:
+    """(min_row, min_col, max_row, max_col) of a set of keys, or None if empty."""
+    if isinstance(keys, CoordSet):
+        return keys.bounding_box()
+    min_row = min_col = None
+    max_row = max_col = 0
+    for key in keys:
+        row, col = key >> COL_BITS, (key & COL_MASK) + 1
+        if min_row is None or row < min_row:
+            min_row = row
+        if min_col is None or col < min_col:
+            min_col = col
+        max_row = max(max_row, row)
+        max_col = max(max_col, col)
+    if min_row is None:
+        return None
+    return min_row, min_col, max_row, max_col
+
+
+def clip_to_content(keys: Iterable[int], content_keys: Iterable[int]) -> CoordSet:
+    """
+    Drop keys below the last row / right of the last column holding content.
+
+    Sheets formatted far beyond their data (e.g. down to row 1,048,576) report
+    phantom dimensions; only the box up to the last cell with a value or a
+    number format is meaningful. Empty cells inside the box are kept, since
+    sources fill in blank template cells.
+    """
+    coords = keys if isinstance(keys, CoordSet) else CoordSet(keys)
+    box = bounding_box(content_keys)
+    if box is None:
+        return coords
+    _, _, max_row, max_col = box
+    return coords.clip(max_row, max_col)
@@ -0,0 +1,178 @@
+"""
+Number Format Classification for Excel Consolidator
+
+The pattern rules that decide whether a template cell's number format is a
+percentage, currency, number or date format (formerly the _is_*_format
+methods of the desktop worker and the web consolidator).
+
+A template has tens of thousands of cells but only a few dozen distinct
+format strings, so FormatClassifier evaluates the rules once per distinct
+string and answers every other cell from a memo. FORMAT_CLASSIFIER is the
+instance shared by the desktop and web code.
+
+The analysis result per template cell is a FormatInfo: an immutable,
+interned record, so all cells with the same format share one object (and
+one small integer ``format_id``) instead of holding a dict each.
+"""
+
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+PERCENTAGE_PATTERNS = (
+    '%', 'percent', '0.0%', '0.00%', '0%', '#,##0%', '#,##0.0%', '#,##0.00%',
+    'general%', 'standard%', 'percentage', 'pct', 'pct%'
+)
+CURRENCY_SYMBOLS = ('$', '€', '£', '¥', '₽', '₹', '₩', '₪', '₦', '₡', '₨', '₫', '₱',
+                    '₲', '₴', '₵', '₸', '₼', '₾', '₿')
+CURRENCY_PATTERNS = ('currency', 'money', 'dollar', 'euro', 'pound', 'yen')
+NUMBER_PATTERNS = (
+    '0.00', '#,##0', '0.0', '0', '#,##0.00', '#,##0.0',
+    'general', 'standard', 'number', 'numeric', 'decimal',
+    '0.000', '0.0000', '#,##0.000', '#,##0.0000'
+)
+DATE_PATTERNS = (
+    'mm/dd/yyyy', 'dd/mm/yyyy', 'yyyy-mm-dd', 'mm-dd-yyyy', 'dd-mm-yyyy',
+    'mm/dd/yy', 'dd/mm/yy', 'yy-mm-dd', 'mm-dd-yy', 'dd-mm-yy',
+    'm/d/yyyy', 'd/m/yyyy', 'm/d/yy', 'd/m/yy',
+    'date', 'time', 'datetime', 'timestamp'
+)
+
+
+class FormatClass(NamedTuple):
+    """Rule results for one number format string (each rule on its own)."""
+    is_percentage: bool
+    is_currency: bool
+    is_number: bool
+    is_date: bool
+
+
+_UNFORMATTED = FormatClass(False, False, False, False)
+
+
+def classify_format(format_str) -> FormatClass:
+    """Evaluate all format rules for one number format (no memo)."""
+    if not format_str:
+        return _UNFORMATTED
+    text = str(format_str)
+    lowered = text.lower()
+    is_percentage = any(pattern in lowered for pattern in PERCENTAGE_PATTERNS)
+    is_currency = (any(symbol in text for symbol in CURRENCY_SYMBOLS) or
+                   any(pattern in lowered for pattern in CURRENCY_PATTERNS))
+    # Percentage and currency formats never count as plain numbers
+    is_number = (not is_percentage and not is_currency and
+                 any(pattern in text for pattern in NUMBER_PATTERNS))
+    is_date = any(pattern in lowered for pattern in DATE_PATTERNS)
+    return FormatClass(is_percentage, is_currency, is_number, is_date)
+
+
+class FormatClassifier:
+    """
+    Memoized classify_format(): the rules run once per distinct format
+    string. The memo is cleared when it grows past ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._memo: Dict[str, FormatClass] = {}
+
+    def classify(self, format_str) -> FormatClass:
+        if not format_str:
+            return _UNFORMATTED
+        key = format_str if isinstance(format_str, str) else str(format_str)
+        result = self._memo.get(key)
+        if result is None:
+            if len(self._memo) >= self.max_entries:
+                self._memo.clear()
+            result = self._memo[key] = classify_format(key)
+        return result
+
+    def is_percentage(self, format_str) -> bool:
+        return self.classify(format_str).is_percentage
+
+    def is_currency(self, format_str) -> bool:
+        return self.classify(format_str).is_currency
+
+    def is_number(self, format_str) -> bool:
+        return self.classify(format_str).is_number
+
+    def is_date(self, format_str) -> bool:
+        return self.classify(format_str).is_date
+
+    def __len__(self) -> int:
+        return len(self._memo)
+
+
+FORMAT_CLASSIFIER = FormatClassifier()
+
+
+class FormatInfo:
+    """
+    Immutable format of template cells, created by intern_format() only.
+
+    Reads like the format_info dicts it replaces (info.get('is_percentage'),
+    info['number_format']); copy() returns the same object.
+    """
+
+    FIELDS = ('number_format', 'is_percentage', 'is_currency', 'is_number', 'is_date',
+              'has_formula', 'consolidation_method')
+    __slots__ = ('format_id',) + FIELDS
+
+    def __init__(self, format_id: int, values: Tuple):
+        object.__setattr__(self, 'format_id', format_id)
+        for name, value in zip(self.FIELDS, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FormatInfo is immutable")
+
+    def get(self, name: str, default=None):
+        return getattr(self, name) if name in self.FIELDS else default
+
+    def __getitem__(self, name: str):
+        if name not in self.FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def copy(self) -> 'FormatInfo':
+        return self
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __reduce__(self):
+        # Unpickling interns again in the receiving process
+        return (intern_format, tuple(getattr(self, name) for name in self.FIELDS))
+
+    def __repr__(self) -> str:
+        return f"FormatInfo({self.as_dict()})"
+
+
+_FORMAT_LOCK = threading.Lock()
+_FORMATS: List[FormatInfo] = []
+_FORMAT_IDS: Dict[Tuple, FormatInfo] = {}
+
+
+def intern_format(number_format: Optional[str] = None, is_percentage: bool = False,
+                  is_currency: bool = False, is_number: bool = False, is_date: bool = False,
+                  has_formula: bool = False, consolidation_method: str = 'sum') -> FormatInfo:
+    """The shared FormatInfo with these values (created on first use)."""
+    values = (number_format, bool(is_percentage), bool(is_currency), bool(is_number), bool(is_date),
+              bool(has_formula), consolidation_method)
+    info = _FORMAT_IDS.get(values)
+    if info is None:
+        with _FORMAT_LOCK:
+            info = _FORMAT_IDS.get(values)
+            if info is None:
+                info = FormatInfo(len(_FORMATS), values)
+                _FORMATS.append(info)
+                _FORMAT_IDS[values] = info
+    return info
+
+
+def format_by_id(format_id: int) -> FormatInfo:
+    """FormatInfo of an id handed out by intern_format() in this process."""
+    return _FORMATS[format_id]
+
+
+# Cells without any template format information
+NO_FORMAT = intern_format()
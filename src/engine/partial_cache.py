@@ -0,0 +1,137 @@
+"""
+Partial Result Cache for Excel Consolidator
+
+Stores the FilePartial of each scanned source file on disk, keyed by the
+SHA-256 of the file's bytes and the SourcePlan fingerprint (template
+coordinates, value kinds, parser options and validation settings). A re-run
+where only a few files changed reads every unchanged file's values from the
+cache without opening the workbook.
+
+Entries are small JSON documents (Decimals are kept as strings, so values
+round-trip exactly); they are written atomically and removed once unused for
+``max_age_days``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, Optional
+
+from src.engine.partials import FilePartial, SourcePlan, partial_from_dict, partial_to_dict
+
+
+# Cache entry files (<sha256>.json, or its <pid>.tmp while being written)
+_ENTRY_NAME = re.compile(r'[0-9a-f]{64}\.json(\.[0-9]+\.tmp)?')
+_SHARD_NAME = re.compile(r'[0-9a-f]{2}')
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's bytes (hex)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prune_folder(folder: str, max_age_days: int = 30, sharded: bool = False) -> int:
+    """
+    Delete cache entries under ``folder`` not used for ``max_age_days``;
+    returns the number removed.
+
+    Only files a cache writes are touched: ``<sha256>.json`` entries and
+    their leftover ``.tmp`` files, directly in ``folder`` or, when
+    ``sharded``, in its two-character ``<sha256[:2]>`` subfolders. Anything
+    else in the folder is left alone.
+    """
+    if not os.path.isdir(folder):
+        return 0
+    if sharded:
+        subfolders = [os.path.join(folder, name) for name in os.listdir(folder)
+                      if _SHARD_NAME.fullmatch(name)]
+    else:
+        subfolders = [folder]
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for subfolder in subfolders:
+        try:
+            names = os.listdir(subfolder)
+        except OSError:
+            continue
+        for name in names:
+            if _ENTRY_NAME.fullmatch(name) is None or (sharded and not name.startswith(os.path.basename(subfolder))):
+                continue
+            entry_path = os.path.join(subfolder, name)
+            try:
+                if os.path.isfile(entry_path) and os.path.getmtime(entry_path) < cutoff:
+                    os.remove(entry_path)
+                    removed += 1
+            except OSError:
+                continue
+    return removed
+
+
+class PartialCache:
+    """
+    On-disk cache of per-file partials for one SourcePlan.
+
+    Args:
+        folder: Cache directory (created on first store)
+        plan: Plan of the current run; entries of other plans are never reused
+    """
+
+    def __init__(self, folder: str, plan: SourcePlan):
+        self.folder = folder
+        self.plan_fingerprint = plan.fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self._entry_keys: Dict[str, str] = {}
+
+    def _entry_key(self, path: str) -> str:
+        key = self._entry_keys.get(path)
+        if key is None:
+            key = hashlib.sha256(f"{self.plan_fingerprint}:{file_digest(path)}".encode('ascii')).hexdigest()
+            self._entry_keys[path] = key
+        return key
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], f"{key}.json")
+
+    def load(self, path: str) -> Optional[FilePartial]:
+        """Return the cached partial of ``path`` or None (counts hits/misses)."""
+        try:
+            entry_path = self._entry_path(self._entry_key(path))
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                partial = partial_from_dict(path, json.load(f))
+        except Exception:
+            self.misses += 1
+            return None
+        try:
+            # Mark as recently used for prune()
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return partial
+
+    def store(self, partial: FilePartial) -> None:
+        """Save a freshly scanned partial; interrupted scans are never cached."""
+        if partial.error is not None:
+            return
+        try:
+            text = json.dumps(partial_to_dict(partial), separators=(',', ':'))
+            entry_path = self._entry_path(self._entry_key(partial.path))
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, entry_path)
+        except (OSError, TypeError, ValueError):
+            # Unserializable raw values or unwritable folder: just don't cache
+            pass
+
+    def prune(self, max_age_days: int = 30) -> int:
+        """Delete entries not used for ``max_age_days``; returns the number removed."""
+        return prune_folder(self.folder, max_age_days, sharded=True)
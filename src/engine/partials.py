@@ -0,0 +1,306 @@
+"""
+Per-File Partial Aggregates for Excel Consolidator
+
+Each source file is scanned independently into a FilePartial (the values it
+contributes per template coordinate, plus any errors). Scans have no shared
+state, so they can run in a process pool; the caller merges the partials in
+source-file order, which keeps totals and contributions identical to a
+serial run.
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.engine.coords import COL_BITS
+from src.engine.values import CellHandler, ValueParser, compile_handlers
+from src.engine.xlsx_reader import RowTargets, XlsxSourceReader
+from src.modules.advanced_settings import validate_value
+
+
+# Bump when scan or parsing rules change so cached partials are not reused
+SCAN_VERSION = 1
+
+TOTAL_INDICATORS = ('total', 'sum', 'subtotal', 'grand total', 'totaal', 'gesamt')
+
+
+def is_total_value(value) -> bool:
+    """Detect values that label a total row/column (e.g. 'Grand Total')."""
+    if value is None:
+        return False
+    value_str = str(value).lower().strip()
+    return any(indicator in value_str for indicator in TOTAL_INDICATORS)
+
+
+class SourcePlan:
+    """
+    Everything a scan needs to know about the template and settings.
+
+    Built once per run and shipped to each worker process a single time.
+    coord_kinds maps coordinate key (src.engine.coords) -> (value kind,
+    consolidation method); coordinates missing from it are parsed with the
+    default rules and summed. handlers() compiles it into CellHandlers once
+    per process (they are rebuilt rather than pickled into workers).
+    """
+
+    def __init__(self, targets: Optional[RowTargets], coord_kinds: Dict[int, Tuple[str, str]],
+                 parser: ValueParser, sheet_name: Optional[str] = None,
+                 include_totals: bool = True, stop_on_error: bool = False,
+                 template_dims: Optional[Tuple[int, int]] = None,
+                 settings: Optional[dict] = None):
+        self.targets = targets
+        self.coord_kinds = coord_kinds
+        self.parser = parser
+        self.sheet_name = sheet_name
+        self.include_totals = include_totals
+        self.stop_on_error = stop_on_error
+        # (max_row, max_column) of the template when structure validation is on
+        self.template_dims = template_dims
+        self.settings = settings or {}
+        self._handlers: Optional[Tuple[Dict[int, CellHandler], CellHandler]] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_handlers'] = None
+        return state
+
+    def handlers(self) -> Tuple[Dict[int, CellHandler], CellHandler]:
+        """({coordinate key: CellHandler}, default handler) for this plan."""
+        if self._handlers is None:
+            self._handlers = compile_handlers(self.coord_kinds, self.parser)
+        return self._handlers
+
+    def fingerprint(self) -> str:
+        """
+        Hash of everything that influences a scan result: template coordinates
+        and kinds, parser options, sheet selection and validation settings.
+        Two plans with the same fingerprint produce identical partials.
+        """
+        validation = self.settings.get('validation', {}) or {}
+        digest = hashlib.sha256()
+        parts = (
+            SCAN_VERSION,
+            None if self.targets is None else sorted((row, sorted(cols)) for row, cols in self.targets.items()),
+            sorted(self.coord_kinds.items()),
+            self.parser.options(),
+            self.sheet_name,
+            bool(self.include_totals),
+            bool(self.stop_on_error),
+            self.template_dims,
+            (bool(validation.get('validate_ranges')), str(validation.get('min_value')), str(validation.get('max_value'))),
+        )
+        for part in parts:
+            digest.update(repr(part).encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+
+class FilePartial:
+    """
+    Result of scanning one source file.
+
+    values: coordinate key -> Decimal, in sheet reading order
+    parse_errors: (kind, key, raw value) for values that failed their
+        template format; the caller decides whether to report them
+    structure_mismatch: (max_row, max_column) of the file when it does not
+        match the template; the file contributes nothing
+    invalid_value: (value, key) of the first value rejected by range
+        validation with stop_on_error set; scanning stopped there
+    error: exception that interrupted the scan (values read so far are kept)
+    parse_cache: (hits, misses) of the parser's text cache during the scan
+    stats: cells scanned and accepted, and skipped cells by reason
+        (empty, total, parse_error, no_value, invalid); empty for partials
+        restored from a cache
+    timings: seconds spent opening the file ('open') and reading its cells
+        ('parse'); empty for partials restored from a cache
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.label = os.path.splitext(os.path.basename(path))[0]
+        self.values: Dict[int, Decimal] = {}
+        self.parse_errors: List[Tuple[str, int, object]] = []
+        self.structure_mismatch: Optional[Tuple[int, int]] = None
+        self.invalid_value: Optional[Tuple[Decimal, int]] = None
+        self.error: Optional[BaseException] = None
+        self.parse_cache: Tuple[int, int] = (0, 0)
+        self.stats: Dict[str, int] = {}
+        self.timings: Dict[str, float] = {}
+
+
+def partial_to_dict(partial: FilePartial) -> dict:
+    """JSON-ready form of a partial (Decimals as strings, exact round-trip)."""
+    return {
+        'values': [[key, str(val)] for key, val in partial.values.items()],
+        'parse_errors': [list(err) for err in partial.parse_errors],
+        'structure_mismatch': list(partial.structure_mismatch) if partial.structure_mismatch is not None else None,
+        'invalid_value': [str(partial.invalid_value[0]), partial.invalid_value[1]] if partial.invalid_value is not None else None,
+    }
+
+
+def partial_from_dict(path: str, data: dict) -> FilePartial:
+    """Rebuild a partial saved with partial_to_dict for the file at ``path``."""
+    partial = FilePartial(path)
+    partial.values = {key: Decimal(val) for key, val in data['values']}
+    partial.parse_errors = [tuple(err) for err in data['parse_errors']]
+    if data['structure_mismatch'] is not None:
+        partial.structure_mismatch = tuple(data['structure_mismatch'])
+    if data['invalid_value'] is not None:
+        val, key = data['invalid_value']
+        partial.invalid_value = (Decimal(val), key)
+    return partial
+
+
+def scan_source_file(path: str, plan: SourcePlan) -> FilePartial:
+    """Read the template coordinates of one source file into a FilePartial."""
+    partial = FilePartial(path)
+    hits, misses = plan.parser.cache_stats()
+    try:
+        _scan_into(partial, plan)
+    except Exception as e:
+        partial.error = e
+    end_hits, end_misses = plan.parser.cache_stats()
+    partial.parse_cache = (end_hits - hits, end_misses - misses)
+    return partial
+
+
+def _scan_into(partial: FilePartial, plan: SourcePlan) -> None:
+    handlers, default_handler = plan.handlers()
+    values = partial.values
+    scanned = empty = totals = no_value = invalid = 0
+
+    start = time.perf_counter()
+    try:
+        with XlsxSourceReader(partial.path, sheet_name=plan.sheet_name) as reader:
+            if plan.template_dims is not None:
+                try:
+                    if (reader.max_row, reader.max_column) != plan.template_dims:
+                        partial.structure_mismatch = (reader.max_row, reader.max_column)
+                        return
+                except Exception:
+                    pass
+            opened = time.perf_counter()
+            partial.timings['open'] = opened - start
+
+            # Formula cells arrive as their cached results (data_only semantics),
+            # cells outside the template are never decoded
+            for row, col, value, data_type in reader.iter_cells(plan.targets):
+                scanned += 1
+                # Skip empty cells
+                if value is None or value == '':
+                    empty += 1
+                    continue
+
+                # FLEXIBLE: Handle total cells
+                if not plan.include_totals and is_total_value(value):
+                    totals += 1
+                    continue
+
+                key = (row << COL_BITS) | (col - 1)
+                handler = handlers.get(key, default_handler)
+                try:
+                    val = handler.parse(value)
+                except Exception:
+                    partial.parse_errors.append((handler.kind, key, value))
+                    continue
+                if val is None:
+                    no_value += 1
+                    continue
+
+                # Validate value against settings
+                if not validate_value(val, plan.settings):
+                    invalid += 1
+                    if plan.stop_on_error:
+                        partial.invalid_value = (val, key)
+                        return
+                    continue
+
+                values[key] = val
+            partial.timings['parse'] = time.perf_counter() - opened
+    finally:
+        if 'open' not in partial.timings:
+            partial.timings['open'] = time.perf_counter() - start
+        partial.stats = {'scanned': scanned, 'accepted': len(values), 'empty': empty, 'total': totals,
+                         'parse_error': len(partial.parse_errors), 'no_value': no_value, 'invalid': invalid}
+
+
+# Plan of the current run inside a pool worker process (set by the initializer)
+_worker_plan: Optional[SourcePlan] = None
+
+
+def _init_worker(plan: SourcePlan) -> None:
+    global _worker_plan
+    _worker_plan = plan
+
+
+def _scan_in_worker(path: str) -> FilePartial:
+    return scan_source_file(path, _worker_plan)
+
+
+def iter_source_partials(paths: List[str], plan: SourcePlan, max_workers: int = 1,
+                         cache=None, reuse: Optional[Dict[str, FilePartial]] = None) -> Iterator[FilePartial]:
+    """
+    Yield one FilePartial per path, in the order of ``paths``.
+
+    Partials already known to the caller (``reuse``, by path) are yielded as
+    they are, files found in ``cache`` (a PartialCache) are served from it;
+    the rest are scanned, in a process pool when max_workers > 1 (the plan is
+    sent to each worker once), and stored back. Results are always yielded in
+    input order so merging them is deterministic.
+    """
+    cached: Dict[int, FilePartial] = {}
+    for idx, path in enumerate(paths):
+        partial = reuse.get(path) if reuse else None
+        if partial is None and cache is not None:
+            partial = cache.load(path)
+        if partial is not None:
+            cached[idx] = partial
+    pending = [path for idx, path in enumerate(paths) if idx not in cached]
+
+    scans = _iter_scans(pending, plan, max_workers)
+    try:
+        for idx in range(len(paths)):
+            partial = cached.get(idx)
+            if partial is None:
+                partial = next(scans)
+                if cache is not None:
+                    cache.store(partial)
+            yield partial
+    finally:
+        scans.close()
+
+
+def _iter_scans(paths: List[str], plan: SourcePlan, max_workers: int) -> Iterator[FilePartial]:
+    """Scan ``paths`` in order, in a process pool when worthwhile. If the pool
+    breaks, remaining files are scanned in this process."""
+    max_workers = min(max_workers, len(paths))
+    if max_workers <= 1:
+        for path in paths:
+            yield scan_source_file(path, plan)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(plan,)) as executor:
+        futures = [executor.submit(_scan_in_worker, path) for path in paths]
+        try:
+            for idx, future in enumerate(futures):
+                try:
+                    partial = future.result()
+                except BrokenProcessPool:
+                    break
+                except Exception:
+                    # The partial could not be sent back (e.g. unpicklable error); rescan here
+                    partial = scan_source_file(paths[idx], plan)
+                yield partial
+            else:
+                return
+        finally:
+            # Consumer stopped early (abort) or pool broke: drop queued scans
+            for future in futures:
+                future.cancel()
+
+    for path in paths[idx:]:
+        yield scan_source_file(path, plan)
@@ -0,0 +1,74 @@
+"""
+Run Logging for Excel Consolidator
+
+The aggregation and write loops used to log one or more INFO lines per
+cell, formatted and written synchronously to the log file and console by
+the thread doing the work. For thousands of cells and hundreds of files
+the logging cost more than the arithmetic.
+
+- CellLog samples per-cell detail lines: only every Nth cell is logged, at
+  DEBUG level, and the message is only built for those cells
+- format_counts() renders per-file and per-run summary counters that
+  replace the per-cell INFO lines
+- start_queue_logging() moves a logger's handlers behind a queue, so
+  formatting and file/console I/O happen on a listener thread
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Mapping
+
+# Per-cell detail lines: one per this many cells (1 = every cell, 0 = none)
+DEFAULT_CELL_LOG_SAMPLE = 100
+
+
+class CellLog:
+    """
+    Sampled per-cell detail lines of a hot loop.
+
+    Args:
+        logger: Logger the lines go to
+        every: Log one cell out of ``every`` (1 = all, 0 = none)
+        level: Level of the detail lines; nothing is sampled when the
+            logger does not handle it
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = DEFAULT_CELL_LOG_SAMPLE,
+                 level: int = logging.DEBUG):
+        self.logger = logger
+        self.level = level
+        self.every = max(0, int(every)) if logger.isEnabledFor(level) else 0
+        self._seen = 0
+
+    def sample(self) -> bool:
+        """Whether to log the current cell; build its message only when True."""
+        if not self.every:
+            return False
+        self._seen += 1
+        return (self._seen - 1) % self.every == 0
+
+    def log(self, message: str) -> None:
+        self.logger.log(self.level, message)
+
+
+def format_counts(counts: Mapping[str, int]) -> str:
+    """'12 percentage, 30 number' (zero counts left out)."""
+    return ", ".join(f"{count} {name}" for name, count in counts.items() if count) or "none"
+
+
+def start_queue_logging(logger: logging.Logger) -> QueueListener:
+    """
+    Route ``logger``'s records through a queue to its current handlers,
+    which then run on a listener thread (stopped, and drained, at exit).
+    """
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,102 @@
+"""
+Run Metrics for Excel Consolidator
+
+Where a consolidation run spends its time (template load and analysis,
+opening and parsing each source file, comments, the Contributions and
+Plain sheets, the save) and what it did with the cells it read, recorded
+as one RunMetrics per run.
+
+- stage() times a named span, add_time() records one measured by the
+  caller; a stage recorded more than once (a loop body) accumulates
+- count() adds to a named counter
+- add_file() records a source file's open/parse/aggregate times and adds
+  its scan counters (scanned, accepted, skipped by reason) to the run's
+- write() saves the report as a JSON sidecar next to the output workbook
+  ("Report.xlsx" -> "Report.metrics.json")
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.engine.partials import FilePartial
+
+METRICS_SUFFIX = '.metrics.json'
+
+
+def metrics_path(output_path: str) -> str:
+    """Path of the metrics sidecar of an output workbook."""
+    return os.path.splitext(output_path)[0] + METRICS_SUFFIX
+
+
+class RunMetrics:
+    """
+    Stage timings and cell counters of one consolidation run.
+
+    Safe to read (to_dict()) from another thread while the run records.
+    """
+
+    def __init__(self):
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._end: Optional[float] = None
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.files: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_file(self, partial: FilePartial, aggregate_seconds: float = 0.0) -> None:
+        """Record one source file; partials restored from a cache have no scan timings or counters."""
+        entry: Dict[str, Any] = {'file': partial.label, 'cached': not partial.timings}
+        entry.update({f'{name}_seconds': round(seconds, 6) for name, seconds in partial.timings.items()})
+        entry['aggregate_seconds'] = round(aggregate_seconds, 6)
+        entry['cells'] = dict(partial.stats)
+        if partial.error is not None:
+            entry['error'] = str(partial.error)
+        with self._lock:
+            self.files.append(entry)
+            for name, n in partial.stats.items():
+                counter = f'cells_{name}' if name in ('scanned', 'accepted') else f'cells_skipped_{name}'
+                self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def finish(self) -> None:
+        """Stop the run's clock (to_dict() reports the time so far until then)."""
+        self._end = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self._end if self._end is not None else time.perf_counter()
+        with self._lock:
+            return {
+                'started': self.started.isoformat(timespec='seconds'),
+                'total_seconds': round(end - self._start, 6),
+                'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters),
+                'files': [dict(entry) for entry in self.files],
+            }
+
+    def write(self, output_path: str) -> str:
+        """Save the report next to ``output_path``; returns the sidecar's path."""
+        path = metrics_path(output_path)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
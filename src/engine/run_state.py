@@ -0,0 +1,182 @@
+"""
+Incremental Re-Consolidation for Excel Consolidator
+
+After a run, the ContributionMatrix (totals, per-file values and non-zero
+masks) is saved together with every source file's partial and content
+digest. The next run against the same template and settings loads that
+state, subtracts the partials of files that changed or disappeared, and only
+scans and adds new or modified files, so adding one submission to a folder of
+hundreds costs one file scan instead of all of them.
+
+The state is a single compressed ``.npz``: the matrix arrays plus a JSON
+document (labels, keys, Decimal totals and per-file partials as strings).
+It is only reused when the SourcePlan fingerprint matches; anything else
+(other template, other settings, unreadable file) falls back to a full run.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.engine.accumulator import ContributionMatrix
+from src.engine.partial_cache import file_digest
+from src.engine.partials import FilePartial, SourcePlan, partial_from_dict, partial_to_dict
+
+
+# Bump when the state layout changes
+STATE_VERSION = 1
+
+
+class IncrementalRun:
+    """
+    Merges the partials of one run into a ContributionMatrix, starting from
+    the state saved by the previous run when possible.
+
+    Usage: pass ``reused`` to iter_source_partials(reuse=...), call merge()
+    for every partial in file order instead of add_partial(), then finish()
+    for the final matrix and save() once the output is written.
+
+    Args:
+        state_path: Run state file, or None to merge without any state
+        plan: Plan of the current run (state of other plans is ignored)
+        paths: Source files of the current run, in merge order
+        total_files: Divisor for percentage averages
+        exclude_zero_percent: Average percentages over non-zero files only
+        fixed_point_digits: Fixed-point totals scale (see ContributionMatrix)
+    """
+
+    def __init__(self, state_path: Optional[str], plan: SourcePlan, paths: List[str],
+                 total_files: Optional[int] = None, exclude_zero_percent: bool = False,
+                 fixed_point_digits: Optional[int] = None):
+        self.state_path = state_path
+        self.plan_fingerprint = plan.fingerprint() if state_path else None
+        self.total_files = total_files
+        self.exclude_zero_percent = exclude_zero_percent
+        self.fixed_point_digits = fixed_point_digits
+        self.labels = [FilePartial(path).label for path in paths]
+
+        # Partials of unchanged files (already in the matrix), by path
+        self.reused: Dict[str, FilePartial] = {}
+        self.removed_count = 0
+        # True when the previous run's state is being updated
+        self.incremental = False
+        self._digests: Dict[str, Optional[str]] = {}
+        # Previous partial of each file name still in the matrix
+        self._previous: Dict[str, FilePartial] = {}
+        # (file name, digest, partial) of every merged file, in merge order
+        self._records: List[Tuple[str, Optional[str], FilePartial]] = []
+
+        self.contributions = None
+        if state_path and len(set(self.labels)) == len(self.labels):
+            self._start_from_state(paths)
+        if self.contributions is None:
+            self.contributions = self._new_matrix()
+
+    def _new_matrix(self) -> ContributionMatrix:
+        return ContributionMatrix(self.labels, self.total_files, self.exclude_zero_percent,
+                                  fixed_point_digits=self.fixed_point_digits)
+
+    def _digest(self, path: str) -> Optional[str]:
+        if path not in self._digests:
+            try:
+                self._digests[path] = file_digest(path)
+            except OSError:
+                self._digests[path] = None
+        return self._digests[path]
+
+    def _start_from_state(self, paths: List[str]) -> None:
+        loaded = load_run_state(self.state_path, self.plan_fingerprint)
+        if loaded is None:
+            return
+        meta, arrays = loaded
+        try:
+            matrix = ContributionMatrix.from_state(meta['matrix'], arrays, self.total_files,
+                                                   self.exclude_zero_percent, self.fixed_point_digits)
+            previous = {name: (digest, partial_from_dict(name, data))
+                        for name, digest, data in meta['files']}
+        except Exception:
+            return
+        if not matrix.exact or len(set(matrix.labels)) != len(previous):
+            # Totals were rounded, so subtracting would not reproduce a full run
+            return
+
+        current = {os.path.basename(path): path for path in paths}
+        for name, (digest, partial) in previous.items():
+            path = current.get(name)
+            if path is None:
+                matrix.remove_partial(partial.label, partial.values)
+                self.removed_count += 1
+            elif digest is not None and digest == self._digest(path):
+                partial.path = path
+                self.reused[path] = partial
+            else:
+                self._previous[name] = partial
+        matrix.reset_labels(self.labels)
+        self.contributions = matrix
+        self.incremental = True
+
+    def merge(self, partial: FilePartial) -> None:
+        """Add a partial (in file order); unchanged files are already counted."""
+        name = os.path.basename(partial.path)
+        if self.reused.get(partial.path) is not partial:
+            old = self._previous.pop(name, None)
+            if old is not None:
+                self.contributions.remove_partial(old.label, old.values)
+            self.contributions.add_partial(partial.label, partial.values)
+        # Interrupted scans are kept in the totals but never reused
+        digest = self._digest(partial.path) if self.state_path and partial.error is None else None
+        self._records.append((name, digest, partial))
+
+    def finish(self) -> ContributionMatrix:
+        """Final matrix of the run (recomputed in file order if a sum got rounded)."""
+        matrix = self.contributions
+        # Files in the state that were not merged again (e.g. skipped this run)
+        for old in self._previous.values():
+            matrix.remove_partial(old.label, old.values)
+        self._previous = {}
+        if not matrix.exact and self.incremental:
+            matrix = self._new_matrix()
+            for _name, _digest, partial in self._records:
+                matrix.add_partial(partial.label, partial.values)
+        matrix.drop_empty_columns()
+        self.contributions = matrix
+        return matrix
+
+    def save(self) -> bool:
+        """Write the state of this run for the next one; returns False on failure."""
+        if not self.state_path or len(set(self.labels)) != len(self.labels):
+            # Files sharing a label share a matrix row and cannot be subtracted
+            return False
+        matrix_meta, arrays = self.contributions.to_state()
+        meta = {
+            'version': STATE_VERSION,
+            'plan': self.plan_fingerprint,
+            'matrix': matrix_meta,
+            'files': [[name, digest, partial_to_dict(partial)] for name, digest, partial in self._records],
+        }
+        try:
+            text = json.dumps(meta, separators=(',', ':'))
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, meta=np.frombuffer(text.encode('utf-8'), dtype=np.uint8), **arrays)
+            os.replace(tmp_path, self.state_path)
+        except (OSError, TypeError, ValueError):
+            # Unserializable raw values or unwritable folder: next run is a full run
+            return False
+        return True
+
+
+def load_run_state(state_path: str, plan_fingerprint: str) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    """(metadata, matrix arrays) of a saved state for this plan, or None."""
+    try:
+        with np.load(state_path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            if meta.get('version') != STATE_VERSION or meta.get('plan') != plan_fingerprint:
+                return None
+            arrays = {name: data[name] for name in ('values', 'present', 'nonzero')}
+    except Exception:
+        return None
+    return meta, arrays
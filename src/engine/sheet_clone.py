@@ -0,0 +1,61 @@
+"""
+Plain Sheet Clone for Excel Consolidator
+
+The "Consolidated (Plain)" sheet is the consolidated sheet without its
+hyperlinks and comments. Copying it cell by cell through openpyxl's style
+properties (font, border, fill, number format, protection, alignment)
+creates and looks up six style objects per cell; for a template of tens of
+thousands of cells that is hundreds of thousands of copies.
+
+Both sheets live in the same workbook, so their cells can share the same
+style table entries: clone_plain_sheet() copies each cell's style ids
+(a small StyleArray) and value directly, and never touches hyperlinks or
+comments, so there is nothing to strip afterwards.
+"""
+
+from copy import copy
+
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.worksheet.merge import MergedCellRange
+from openpyxl.worksheet.worksheet import Worksheet
+
+
+def clone_plain_sheet(source: Worksheet, title: str) -> Worksheet:
+    """
+    Add a copy of ``source`` named ``title`` to its workbook with values,
+    styles, merged ranges, row/column dimensions, sheet format and page
+    setup, but without hyperlinks and comments.
+    """
+    target = source.parent.create_sheet(title)
+
+    # Merge first: covered cells become MergedCells and are not copied.
+    # The source ranges are already distinct, so they skip the overlap scan
+    # of Worksheet.merge_cells() (quadratic in the number of ranges).
+    for merged_range in source.merged_cells.ranges:
+        target_range = MergedCellRange(target, merged_range.coord)
+        target.merged_cells.ranges.add(target_range)
+        target._clean_merge_range(target_range)
+
+    cells = target._cells
+    for (row, col), cell in source._cells.items():
+        if isinstance(cell, MergedCell) or isinstance(cells.get((row, col)), MergedCell):
+            continue
+        plain_cell = Cell(target, row=row, column=col)
+        plain_cell._value = cell._value
+        plain_cell.data_type = cell.data_type
+        if cell.has_style:
+            plain_cell._style = copy(cell._style)
+        cells[(row, col)] = plain_cell
+
+    for attr in ('row_dimensions', 'column_dimensions'):
+        target_dims = getattr(target, attr)
+        for key, dim in getattr(source, attr).items():
+            dim = copy(dim)
+            dim.parent = target
+            target_dims[key] = dim
+
+    target.sheet_format = copy(source.sheet_format)
+    target.page_margins = copy(source.page_margins)
+    target.page_setup = copy(source.page_setup)
+    target.print_options = copy(source.print_options)
+    return target
@@ -0,0 +1,198 @@
+"""
+Streamed Worksheets for Excel Consolidator
+
+Report sheets such as Contributions hold one row per (cell, file) pair, far
+more rows than the template itself. Building them as openpyxl cells keeps
+every cell and its style object in memory until the workbook is saved.
+
+A SheetStream instead writes its rows as worksheet XML to a temporary file
+as they are produced, with cell styles registered once up front (style ids).
+The sheet itself stays in the workbook as a small placeholder carrying the
+title, header rows, column widths, merges and autofilter; save_workbook()
+saves the workbook and splices the streamed rows into the placeholder's
+part of the package. Memory stays flat and the save is a linear copy.
+"""
+
+import os
+import re
+import tempfile
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from openpyxl.cell.cell import Cell, ILLEGAL_CHARACTERS_RE
+from openpyxl.compat import safe_string
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+
+# Rows buffered in memory between writes to the temporary file
+FLUSH_ROWS = 1000
+
+_DIMENSION_RE = re.compile(rb'<dimension ref="([^"]*)"\s*/>')
+
+
+def cell_xml(coordinate: str, value, style_id: int = 0) -> str:
+    """
+    <c> element of a cell (None = styled empty cell); strings are written
+    inline and numbers with openpyxl's formatting, like openpyxl does.
+    """
+    style = f' s="{style_id}"' if style_id else ''
+    if value is None:
+        return f'<c r="{coordinate}"{style}/>'
+    if isinstance(value, str):
+        text = escape(ILLEGAL_CHARACTERS_RE.sub('', value))
+        space = ' xml:space="preserve"' if value != value.strip() else ''
+        return f'<c r="{coordinate}"{style} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{coordinate}"{style} t="b"><v>{int(value)}</v></c>'
+    return f'<c r="{coordinate}"{style} t="n"><v>{safe_string(value)}</v></c>'
+
+
+class SheetStream:
+    """
+    Rows of one worksheet, streamed to a temporary file in row order.
+
+    Args:
+        worksheet: Placeholder sheet in the workbook; rows written through
+            openpyxl (headers) must come before the first streamed row
+        style_map: Translates the workbook's style ids into the ids written,
+            for sheets that are saved into another package's style table
+    """
+
+    def __init__(self, worksheet: Worksheet, style_map: Optional[Callable[[int], int]] = None):
+        self.worksheet = worksheet
+        self.style_map = style_map
+        self.first_row = worksheet.max_row + 1 if worksheet._cells else 1
+        self.last_row = 0
+        self.max_col = 0
+        self.row_count = 0
+        self._file = tempfile.TemporaryFile()
+        self._pending = []
+        self._styles: Dict[Tuple[Optional[str], Optional[Font]], int] = {}
+        self._letters: Dict[int, str] = {}
+
+    def style_id(self, number_format: Optional[str] = None, font: Optional[Font] = None) -> int:
+        """Workbook style id (0 = default) of cells with this number format and font."""
+        key = (number_format, font)
+        style_id = self._styles.get(key)
+        if style_id is None:
+            # A detached cell registers the style in the workbook's style table
+            cell = Cell(self.worksheet)
+            if number_format is not None:
+                cell.number_format = number_format
+            if font is not None:
+                cell.font = font
+            style_id = cell.style_id if cell.has_style else 0
+            if style_id and self.style_map is not None:
+                style_id = self.style_map(style_id)
+            self._styles[key] = style_id
+        return style_id
+
+    def append_row(self, row: int, cells: Iterable[Tuple[int, object, int]]) -> None:
+        """
+        Write one row of (column, value, style id) cells; rows must increase.
+        None values are skipped; strings are written inline like openpyxl does.
+        """
+        if row < self.first_row or row <= self.last_row:
+            raise ValueError(f"Row {row} is not after row {max(self.last_row, self.first_row - 1)}")
+        parts = [f'<row r="{row}">']
+        for col, value, style_id in cells:
+            if value is None:
+                continue
+            letter = self._letters.get(col)
+            if letter is None:
+                letter = self._letters[col] = get_column_letter(col)
+                self.max_col = max(self.max_col, col)
+            parts.append(cell_xml(f"{letter}{row}", value, style_id))
+        parts.append('</row>')
+        self._pending.append(''.join(parts))
+        self.last_row = row
+        self.row_count += 1
+        if len(self._pending) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows to the temporary file."""
+        if self._pending:
+            self._file.write(''.join(self._pending).encode('utf-8'))
+            self._pending = []
+
+    def _copy_rows(self, out) -> None:
+        self.flush()
+        self._file.seek(0)
+        for chunk in iter(lambda: self._file.read(1024 * 1024), b''):
+            out.write(chunk)
+
+    def _dimension(self, placeholder_ref: str) -> str:
+        try:
+            min_col, min_row, max_col, max_row = range_boundaries(placeholder_ref)
+        except (TypeError, ValueError):
+            min_col = min_row = max_col = max_row = None
+        min_col = min_col or 1
+        min_row = min(min_row or self.first_row, self.first_row)
+        max_col = max(max_col or 0, self.max_col, min_col)
+        max_row = max(max_row or 0, self.last_row, min_row)
+        return f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}"
+
+    def splice(self, placeholder_xml: bytes, out) -> None:
+        """Write the placeholder sheet XML to ``out`` with the streamed rows inside."""
+        if self.row_count:
+            match = _DIMENSION_RE.search(placeholder_xml)
+            if match:
+                ref = self._dimension(match.group(1).decode('ascii'))
+                placeholder_xml = (placeholder_xml[:match.start()] + f'<dimension ref="{ref}"/>'.encode('ascii')
+                                   + placeholder_xml[match.end():])
+        end = placeholder_xml.find(b'</sheetData>')
+        if end >= 0:
+            out.write(placeholder_xml[:end])
+            self._copy_rows(out)
+            out.write(placeholder_xml[end:])
+            return
+        empty = placeholder_xml.find(b'<sheetData/>')
+        if empty < 0:
+            raise ValueError(f"No sheetData in placeholder of '{self.worksheet.title}'")
+        out.write(placeholder_xml[:empty] + b'<sheetData>')
+        self._copy_rows(out)
+        out.write(b'</sheetData>' + placeholder_xml[empty + len(b'<sheetData/>'):])
+
+    def close(self) -> None:
+        """Discard the streamed rows (after saving, or when abandoning the sheet)."""
+        self._pending = []
+        self._file.close()
+
+
+def save_workbook(workbook: Workbook, path: str, streams: Sequence[SheetStream] = ()) -> None:
+    """
+    Save ``workbook`` to ``path`` with the rows of ``streams`` merged into their
+    placeholder sheets. Streams whose sheet was removed from the workbook are
+    ignored. Without streams this is workbook.save(path).
+    """
+    streams = [stream for stream in streams if stream.worksheet in workbook.worksheets]
+    if not streams:
+        workbook.save(path)
+        return
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with tempfile.TemporaryFile() as package:
+        # The workbook without the streamed rows is small
+        workbook.save(package)
+        parts = {stream.worksheet.path.lstrip('/'): stream for stream in streams}
+        package.seek(0)
+        try:
+            with ZipFile(package) as source, ZipFile(tmp_path, 'w', ZIP_DEFLATED, allowZip64=True) as target:
+                for info in source.infolist():
+                    stream = parts.get(info.filename)
+                    if stream is None:
+                        target.writestr(info, source.read(info))
+                        continue
+                    part = ZipInfo(info.filename, date_time=info.date_time)
+                    part.compress_type = ZIP_DEFLATED
+                    with target.open(part, 'w', force_zip64=True) as out:
+                        stream.splice(source.read(info), out)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,167 @@
+"""
+Template Analysis Cache for Excel Consolidator
+
+Analyzing a template (loading the workbook, classifying every cell's number
+format, collecting the coordinate set and spreading formats over merged
+ranges) costs the same on every run although the template rarely changes.
+The result is saved as a TemplateAnalysis keyed by the SHA-256 of the
+template's bytes plus an analyzer ``variant`` (desktop and web classify
+formats differently, and sheet selection changes which sheet is read), so
+later runs and later web jobs with the same template skip the analysis.
+Entries unused for a while are removed by prune().
+
+Entries are compact JSON documents: each distinct FormatInfo is stored
+once, and cells and the coordinate set are stored as runs of consecutive
+packed keys. They are written atomically.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.engine.coords import CoordSet
+from src.engine.formats import FormatInfo, intern_format
+from src.engine.partial_cache import file_digest, prune_folder
+
+
+# Bump when the analysis or its serialized layout changes
+CACHE_VERSION = 2
+
+
+class TemplateAnalysis:
+    """
+    Result of a template analysis.
+
+    Attributes:
+        coord_format_info: {packed key: interned FormatInfo}
+        template_coords: Packed keys of the template cells (None = unbounded)
+        dims: (max_row, max_column) of the analyzed worksheet
+        merged_ranges: (min_row, min_col, max_row, max_col) of each merged range
+        sheet_title: Title of the analyzed worksheet
+    """
+
+    def __init__(self, coord_format_info: Dict[int, FormatInfo], template_coords: Optional[CoordSet],
+                 dims: Tuple[int, int], merged_ranges: Optional[List[Tuple[int, int, int, int]]] = None,
+                 sheet_title: str = ''):
+        self.coord_format_info = coord_format_info
+        self.template_coords = template_coords
+        self.dims = dims
+        self.merged_ranges = merged_ranges or []
+        self.sheet_title = sheet_title
+
+    def to_dict(self) -> dict:
+        formats: List[dict] = []
+        format_indices: Dict[int, int] = {}
+        # Flat [start, length, format index, ...] runs of consecutive keys sharing a format
+        cells: List[int] = []
+        for key in sorted(self.coord_format_info):
+            info = self.coord_format_info[key]
+            index = format_indices.get(info.format_id)
+            if index is None:
+                index = format_indices[info.format_id] = len(formats)
+                formats.append(info.as_dict())
+            if cells and cells[-1] == index and cells[-3] + cells[-2] == key:
+                cells[-2] += 1
+            else:
+                cells.extend((key, 1, index))
+        return {
+            'sheet': self.sheet_title,
+            'dims': list(self.dims),
+            'merged': [list(bounds) for bounds in self.merged_ranges],
+            'formats': formats,
+            'cells': cells,
+            'coords': None if self.template_coords is None else _to_runs(self.template_coords),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TemplateAnalysis':
+        formats = [intern_format(**fields) for fields in data['formats']]
+        cells = data['cells']
+        coord_format_info = {}
+        for i in range(0, len(cells), 3):
+            info = formats[cells[i + 2]]
+            for key in range(cells[i], cells[i] + cells[i + 1]):
+                coord_format_info[key] = info
+        coords = data['coords']
+        return cls(
+            coord_format_info,
+            None if coords is None else _from_runs(coords),
+            (int(data['dims'][0]), int(data['dims'][1])),
+            [tuple(bounds) for bounds in data['merged']],
+            data['sheet'],
+        )
+
+
+class TemplateCache:
+    """
+    On-disk cache of template analyses.
+
+    Args:
+        folder: Cache directory (created on first store)
+        variant: Identifies the analyzer and its options; entries of other
+            variants are never reused
+    """
+
+    def __init__(self, folder: str, variant: str):
+        self.folder = folder
+        self.variant = variant
+        self._entry_keys: Dict[str, str] = {}
+
+    def _entry_key(self, template_path: str) -> str:
+        key = self._entry_keys.get(template_path)
+        if key is None:
+            text = f"{CACHE_VERSION}:{self.variant}:{file_digest(template_path)}"
+            key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            self._entry_keys[template_path] = key
+        return key
+
+    def _entry_path(self, template_path: str) -> str:
+        return os.path.join(self.folder, f"{self._entry_key(template_path)}.json")
+
+    def load(self, template_path: str) -> Optional[TemplateAnalysis]:
+        """Return the cached analysis of ``template_path`` or None."""
+        try:
+            entry_path = self._entry_path(template_path)
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                analysis = TemplateAnalysis.from_dict(json.load(f))
+        except Exception:
+            return None
+        try:
+            # Mark as recently used for prune()
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        return analysis
+
+    def store(self, template_path: str, analysis: TemplateAnalysis) -> None:
+        """Save the analysis of ``template_path``; failures are ignored."""
+        try:
+            text = json.dumps(analysis.to_dict(), separators=(',', ':'))
+            entry_path = self._entry_path(template_path)
+            os.makedirs(self.folder, exist_ok=True)
+            tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, entry_path)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def prune(self, max_age_days: int = 30) -> int:
+        """Delete entries (of any variant) not used for ``max_age_days``; returns the number removed."""
+        return prune_folder(self.folder, max_age_days, sharded=False)
+
+
+def _to_runs(keys: Iterable[int]) -> List[int]:
+    """Flat [start, length, start, length, ...] runs of consecutive keys."""
+    runs: List[int] = []
+    for key in sorted(keys):
+        if runs and runs[-2] + runs[-1] == key:
+            runs[-1] += 1
+        else:
+            runs.extend((key, 1))
+    return runs
+
+
+def _from_runs(runs: List[int]) -> CoordSet:
+    return CoordSet(key for i in range(0, len(runs), 2) for key in range(runs[i], runs[i] + runs[i + 1]))
@@ -0,0 +1,969 @@
+"""
+Template Package Output for Excel Consolidator
+
+Writing the output through openpyxl means parsing the whole template into
+objects and serializing all of it again on save: every cell of every sheet
+and the complete style table. That costs seconds for a large template and
+drops what openpyxl does not model (images, shapes, cached values).
+
+A TemplatePackage writes the output by patching the template's package
+instead. The output code records the consolidated cells through an
+openpyxl-like sheet (PatchedSheet.cell() with value, number_format, border,
+comment and hyperlink). On save:
+
+- only the rows of the template sheet that hold recorded cells are rewritten
+- the few new cell formats are appended to styles.xml
+- comments, hyperlinks, the Contributions sheets and the plain copy are
+  added as new parts
+- every other part (styles, theme, drawings, other sheets) is copied through
+  unchanged
+
+Output cost follows the number of consolidated cells, not the size of the
+template.
+
+Templates whose package the patcher does not understand raise
+UnsupportedTemplate when opened; callers then use the openpyxl output.
+"""
+
+import os
+import posixpath
+import re
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from xml.sax.saxutils import escape, unescape
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import MergedCell
+from openpyxl.comments.comment_sheet import CommentRecord, CommentSheet
+from openpyxl.formula.translate import Translator
+from openpyxl.styles import Border, Font
+from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_REVERSE
+from openpyxl.utils import absolute_coordinate, get_column_letter, quote_sheetname
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string, range_boundaries
+from openpyxl.worksheet._writer import WorksheetWriter
+from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.xml.functions import fromstring, tostring
+
+from src.engine.coords import pack, unpack
+from src.engine.sheet_stream import SheetStream, cell_xml
+
+# Output engines: openpyxl saves the whole workbook, 'xml' patches the template package
+OUTPUT_ENGINE_OPENPYXL = 'openpyxl'
+OUTPUT_ENGINE_XML = 'xml'
+OUTPUT_ENGINES = (OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_XML)
+
+_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_REL_OFFICE_DOCUMENT = _REL + "/officeDocument"
+_REL_WORKSHEET = _REL + "/worksheet"
+_REL_STYLES = _REL + "/styles"
+_REL_CALC_CHAIN = _REL + "/calcChain"
+_REL_COMMENTS = _REL + "/comments"
+_REL_VML = _REL + "/vmlDrawing"
+_REL_HYPERLINK = _REL + "/hyperlink"
+
+_CT_WORKSHEET = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+_CT_COMMENTS = "application/vnd.openxmlformats-officedocument.spreadsheetml.comments+xml"
+_CT_VML = "application/vnd.openxmlformats-officedocument.vmlDrawing"
+
+_ATTR_RE = re.compile(r'([\w:.-]+)\s*=\s*"([^"]*)"')
+_RELATIONSHIP_RE = re.compile(r'<Relationship\b[^>]*?/>')
+_SHEET_RE = re.compile(r'<sheet\b[^>]*?/>')
+_ROW_RE = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_CELL_RE = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_FORMULA_RE = re.compile(r'<f\b([^>]*?)(?:/>|>(.*?)</f>)', re.S)
+_MERGE_RE = re.compile(r'<mergeCell\b[^>]*?ref="([^"]+)"')
+_XF_RE = re.compile(r'<xf\b[^>]*?(?:/>|>.*?</xf>)', re.S)
+_NUMFMT_RE = re.compile(r'<numFmt\b[^>]*?/>')
+_DEFINED_NAME_RE = re.compile(r'<definedName\b([^>]*)>(.*?)</definedName>', re.S)
+_HYPERLINK_RE = re.compile(r'<hyperlink\b[^>]*?(?:/>|>.*?</hyperlink>)', re.S)
+
+# Worksheet children that follow <hyperlinks> and <legacyDrawing> (CT_Worksheet order)
+_AFTER_HYPERLINKS = ('printOptions', 'pageMargins', 'pageSetup', 'headerFooter', 'rowBreaks', 'colBreaks',
+                     'customProperties', 'cellWatches', 'ignoredErrors', 'smartTags', 'drawing',
+                     'legacyDrawing', 'legacyDrawingHF', 'picture', 'oleObjects', 'controls',
+                     'webPublishItems', 'tableParts', 'extLst')
+_AFTER_LEGACY_DRAWING = ('legacyDrawingHF', 'picture', 'oleObjects', 'controls', 'webPublishItems',
+                         'tableParts', 'extLst')
+# Workbook children that follow <definedNames> and <calcPr> (CT_Workbook order)
+_AFTER_CALC_PR = ('oleSize', 'customWorkbookViews', 'pivotCaches', 'smartTagPr', 'smartTagTypes',
+                  'webPublishing', 'fileRecoveryPr', 'webPublishObjects', 'extLst')
+_AFTER_DEFINED_NAMES = ('calcPr',) + _AFTER_CALC_PR
+# Parts of a sheet that belong to its relationships; the plain copy has none
+_RELATED_ELEMENTS = ('hyperlinks', 'drawing', 'legacyDrawing', 'legacyDrawingHF', 'picture',
+                     'oleObjects', 'controls', 'tableParts')
+
+
+class UnsupportedTemplate(Exception):
+    """The template's package cannot be patched; write the output with openpyxl."""
+
+
+def _attrs(tag: str) -> Dict[str, str]:
+    return {name: unescape(value, {'&quot;': '"'}) for name, value in _ATTR_RE.findall(tag)}
+
+
+def _quote(value: str) -> str:
+    return escape(value, {'"': '&quot;'})
+
+
+def _set_attr(element: str, name: str, value: str) -> str:
+    """Set an attribute on the start tag of ``element``."""
+    end = element.index('>')
+    if element[end - 1] == '/':
+        end -= 1
+    start = element[:end]
+    pattern = re.compile(r'\s%s="[^"]*"' % re.escape(name))
+    if pattern.search(start):
+        start = pattern.sub(f' {name}="{_quote(value)}"', start, count=1)
+    else:
+        start += f' {name}="{_quote(value)}"'
+    return start + element[end:]
+
+
+def _remove_attr(element: str, name: str) -> str:
+    end = element.index('>')
+    return re.sub(r'\s%s="[^"]*"' % re.escape(name), '', element[:end], count=1) + element[end:]
+
+
+def _find_tag(xml: str, tag: str, start: int = 0) -> Optional[re.Match]:
+    return re.compile(r'<%s[\s/>]' % re.escape(tag)).search(xml, start)
+
+
+def _insert_before(xml: str, fragment: str, following: Sequence[str], root: str) -> str:
+    """Insert ``fragment`` before the first of the ``following`` elements, else before ``</root>``."""
+    positions = [match.start() for match in (_find_tag(xml, tag) for tag in following) if match]
+    position = min(positions) if positions else xml.rindex(f'</{root}>')
+    return xml[:position] + fragment + xml[position:]
+
+
+def _remove_element(xml: str, tag: str) -> str:
+    """Remove every ``tag`` element (empty or with content)."""
+    return re.sub(r'<%s\b[^>]*?(?:/>|>.*?</%s>)' % (tag, tag), '', xml, flags=re.S)
+
+
+def _part_dir(part: str) -> str:
+    return posixpath.dirname(part)
+
+
+def _rels_path(part: str) -> str:
+    return posixpath.join(_part_dir(part), '_rels', posixpath.basename(part) + '.rels')
+
+
+def _resolve(source_part: str, target: str) -> str:
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(_part_dir(source_part), target))
+
+
+def _relative(source_part: str, target_part: str) -> str:
+    return posixpath.relpath(target_part, _part_dir(source_part) or '.')
+
+
+def _relationships(xml: str) -> List[Dict[str, str]]:
+    return [_attrs(tag) for tag in _RELATIONSHIP_RE.findall(xml)]
+
+
+def _relationship_xml(rel_id: str, rel_type: str, target: str, external: bool = False) -> str:
+    mode = ' TargetMode="External"' if external else ''
+    return f'<Relationship Id="{rel_id}" Type="{rel_type}" Target="{_quote(target)}"{mode}/>'
+
+
+def _new_rel_id(used: Set[str]) -> str:
+    n = len(used) + 1
+    while f"rId{n}" in used:
+        n += 1
+    used.add(f"rId{n}")
+    return f"rId{n}"
+
+
+def _free_part(names: Set[str], pattern: str) -> str:
+    n = 1
+    while pattern.format(n) in names:
+        n += 1
+    names.add(pattern.format(n))
+    return pattern.format(n)
+
+
+class StylePatch:
+    """
+    Cell formats of the template's styles.xml plus the ones the output adds.
+    Existing entries are never changed, new ones are appended.
+    """
+
+    def __init__(self, xml: str):
+        self.xml = xml
+        self._format_codes: Dict[int, str] = {}
+        for tag in _NUMFMT_RE.findall(self._block('numFmts', required=False)):
+            attrs = _attrs(tag)
+            self._format_codes[int(attrs['numFmtId'])] = attrs.get('formatCode', '')
+        self._format_ids = {code: fmt_id for fmt_id, code in self._format_codes.items()}
+        self._xfs: List[str] = _XF_RE.findall(self._block('cellXfs'))
+        if not self._xfs:
+            raise UnsupportedTemplate("styles.xml has no cell formats")
+        self._xf_count = len(self._xfs)
+        self._font_count = len(re.findall(r'<font\b', self._block('fonts')))
+        self._border_count = len(re.findall(r'<border\b', self._block('borders')))
+        self._new: Dict[str, List[str]] = {'numFmts': [], 'fonts': [], 'borders': []}
+        self._fonts: Dict[str, int] = {}
+        self._borders: Dict[str, int] = {}
+        self._derived: Dict[Tuple, int] = {}
+
+    def _block(self, tag: str, required: bool = True) -> str:
+        match = re.search(r'<%s\b[^>]*>(.*?)</%s>' % (tag, tag), self.xml, re.S)
+        if match is None:
+            if required:
+                raise UnsupportedTemplate(f"styles.xml has no <{tag}>")
+            return ''
+        return match.group(1)
+
+    def number_format(self, xf_index: int) -> str:
+        """Number format of a cell format."""
+        xf = self._xfs[xf_index if xf_index < len(self._xfs) else 0]
+        fmt_id = int(_attrs(xf[:xf.index('>')]).get('numFmtId', 0))
+        code = self._format_codes.get(fmt_id)
+        return code if code is not None else BUILTIN_FORMATS.get(fmt_id, 'General')
+
+    def number_format_id(self, code: str) -> int:
+        fmt_id = self._format_ids.get(code)
+        if fmt_id is None:
+            fmt_id = BUILTIN_FORMATS_REVERSE.get(code)
+        if fmt_id is None:
+            fmt_id = max([163] + list(self._format_codes)) + 1
+            self._format_codes[fmt_id] = code
+            self._format_ids[code] = fmt_id
+            self._new['numFmts'].append(f'<numFmt numFmtId="{fmt_id}" formatCode="{_quote(code)}"/>')
+        return fmt_id
+
+    def font_id(self, font: Font) -> int:
+        xml = tostring(font.to_tree()).decode('utf-8')
+        font_id = self._fonts.get(xml)
+        if font_id is None:
+            font_id = self._fonts[xml] = self._font_count + len(self._new['fonts'])
+            self._new['fonts'].append(xml)
+        return font_id
+
+    def border_id(self, border: Border) -> int:
+        xml = tostring(border.to_tree()).decode('utf-8')
+        border_id = self._borders.get(xml)
+        if border_id is None:
+            border_id = self._borders[xml] = self._border_count + len(self._new['borders'])
+            self._new['borders'].append(xml)
+        return border_id
+
+    def _add_xf(self, key: Tuple, xf: str) -> int:
+        index = self._derived[key] = len(self._xfs)
+        self._xfs.append(xf)
+        return index
+
+    def derive(self, xf_index: int, number_format: Optional[str] = None, border: Optional[Border] = None) -> int:
+        """Cell format ``xf_index`` with another number format and/or border."""
+        if xf_index >= len(self._xfs):
+            xf_index = 0
+        if number_format is not None and number_format == self.number_format(xf_index):
+            number_format = None
+        if number_format is None and border is None:
+            return xf_index
+        border_id = None if border is None else self.border_id(border)
+        key = (xf_index, number_format, border_id)
+        index = self._derived.get(key)
+        if index is None:
+            xf = self._xfs[xf_index]
+            if number_format is not None:
+                xf = _set_attr(xf, 'numFmtId', str(self.number_format_id(number_format)))
+                xf = _set_attr(xf, 'applyNumberFormat', '1')
+            if border_id is not None:
+                xf = _set_attr(xf, 'borderId', str(border_id))
+                xf = _set_attr(xf, 'applyBorder', '1')
+            index = self._add_xf(key, xf)
+        return index
+
+    def xf(self, font: Optional[Font] = None, number_format: Optional[str] = None,
+           border: Optional[Border] = None) -> int:
+        """A new cell format for added sheets (template defaults otherwise)."""
+        font_id = 0 if font is None else self.font_id(font)
+        fmt_id = 0 if number_format is None else self.number_format_id(number_format)
+        border_id = 0 if border is None else self.border_id(border)
+        key = ('new', font_id, fmt_id, border_id)
+        index = self._derived.get(key)
+        if index is None:
+            applied = ''.join(f' {name}="1"' for name, used in (
+                ('applyNumberFormat', fmt_id), ('applyFont', font_id), ('applyBorder', border_id)) if used)
+            index = self._add_xf(key, f'<xf numFmtId="{fmt_id}" fontId="{font_id}" fillId="0" '
+                                      f'borderId="{border_id}" xfId="0"{applied}/>')
+        return index
+
+    def _append(self, xml: str, tag: str, items: List[str], total: int) -> str:
+        if not items:
+            return xml
+        end = xml.index(f'</{tag}>')
+        xml = xml[:end] + ''.join(items) + xml[end:]
+        start = _find_tag(xml, tag)
+        close = xml.index('>', start.start())
+        return xml[:start.start()] + _set_attr(xml[start.start():close + 1], 'count', str(total)) + xml[close + 1:]
+
+    def to_xml(self) -> str:
+        xml = self.xml
+        if self._new['numFmts']:
+            if _find_tag(xml, 'numFmts') is None:
+                # numFmts is the first child of styleSheet
+                root = _find_tag(xml, 'styleSheet')
+                position = xml.index('>', root.start()) + 1
+                xml = xml[:position] + '<numFmts count="0"></numFmts>' + xml[position:]
+            total = len(re.findall(r'<numFmt\b', self._block_of(xml, 'numFmts'))) + len(self._new['numFmts'])
+            xml = self._append(xml, 'numFmts', self._new['numFmts'], total)
+        xml = self._append(xml, 'fonts', self._new['fonts'], self._font_count + len(self._new['fonts']))
+        xml = self._append(xml, 'borders', self._new['borders'], self._border_count + len(self._new['borders']))
+        xml = self._append(xml, 'cellXfs', self._xfs[self._xf_count:], len(self._xfs))
+        return xml
+
+    @staticmethod
+    def _block_of(xml: str, tag: str) -> str:
+        match = re.search(r'<%s\b[^>]*>(.*?)</%s>' % (tag, tag), xml, re.S)
+        return match.group(1) if match else ''
+
+
+class PatchedCell:
+    """
+    A template sheet cell as the output code sees it. ``data_type`` is 'f'
+    for template formulas; ``value`` is only what was assigned (template
+    values are not parsed). Assignments are recorded for the save.
+    """
+
+    __slots__ = ('parent', 'row', 'column', 'data_type', '_value', '_written', '_number_format',
+                 '_border', '_comment', '_hyperlink')
+
+    def __init__(self, parent: 'PatchedSheet', row: int, column: int, data_type: str):
+        self.parent = parent
+        self.row = row
+        self.column = column
+        self.data_type = data_type
+        self._value = None
+        self._written = False
+        self._number_format = None
+        self._border = None
+        self._comment = None
+        self._hyperlink = None
+
+    @property
+    def coordinate(self) -> str:
+        return f"{get_column_letter(self.column)}{self.row}"
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._written = True
+
+    @property
+    def number_format(self) -> str:
+        if self._number_format is not None:
+            return self._number_format
+        return self.parent.styles.number_format(self.parent.style_id(self.row, self.column))
+
+    @number_format.setter
+    def number_format(self, number_format: str):
+        self._number_format = number_format
+
+    @property
+    def border(self) -> Optional[Border]:
+        return self._border
+
+    @border.setter
+    def border(self, border: Border):
+        self._border = border
+
+    @property
+    def comment(self):
+        return self._comment
+
+    @comment.setter
+    def comment(self, comment):
+        self._comment = comment
+
+    @property
+    def hyperlink(self) -> Optional[str]:
+        return self._hyperlink
+
+    @hyperlink.setter
+    def hyperlink(self, link: str):
+        self._hyperlink = link
+
+
+class PatchedSheet:
+    """
+    The template worksheet of a TemplatePackage. cell() returns PatchedCells,
+    and openpyxl MergedCells for cells covered by a merged range.
+    """
+
+    def __init__(self, title: str, xml: str, styles: StylePatch):
+        self.title = title
+        self.styles = styles
+        self._xml = xml
+        self._cells: Dict[int, PatchedCell] = {}
+        self._styles: Dict[int, int] = {}
+        self._formulas: Set[int] = set()
+        # Shared formulas: si -> (master key, formula text), si -> dependent keys
+        self._shared_masters: Dict[str, Tuple[int, str]] = {}
+        self._shared_cells: Dict[str, List[int]] = {}
+        self._merged: Set[int] = set()
+        self._scan()
+
+    def _scan(self) -> None:
+        data = re.search(r'<sheetData\s*/>|<sheetData\b[^>]*>(.*)</sheetData>', self._xml, re.S)
+        if data is None:
+            raise UnsupportedTemplate(f"No sheetData in '{self.title}'")
+        self._data_span = data.span()
+        body = data.group(1) or ''
+        for row in _ROW_RE.finditer(body):
+            if 'r' not in _attrs(row.group(1)):
+                raise UnsupportedTemplate(f"Rows without numbers in '{self.title}'")
+        for match in _CELL_RE.finditer(body):
+            attrs = _attrs(match.group(1))
+            if 'r' not in attrs:
+                raise UnsupportedTemplate(f"Cells without references in '{self.title}'")
+            column, row = coordinate_from_string(attrs['r'])
+            key = pack(row, column_index_from_string(column))
+            style = int(attrs.get('s', 0))
+            if style:
+                self._styles[key] = style
+            inner = match.group(2)
+            if inner and '<f' in inner:
+                formula = _FORMULA_RE.search(inner)
+                if formula is None:
+                    continue
+                self._formulas.add(key)
+                f_attrs = _attrs(formula.group(1))
+                if f_attrs.get('t') == 'shared' and 'si' in f_attrs:
+                    si = f_attrs['si']
+                    if 'ref' in f_attrs and formula.group(2):
+                        self._shared_masters[si] = (key, unescape(formula.group(2)))
+                    else:
+                        self._shared_cells.setdefault(si, []).append(key)
+        for ref in _MERGE_RE.findall(self._xml):
+            min_col, min_row, max_col, max_row = range_boundaries(ref)
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    if row != min_row or col != min_col:
+                        self._merged.add(pack(row, col))
+
+    def style_id(self, row: int, column: int) -> int:
+        """Template cell format of a cell (0 = default)."""
+        return self._styles.get(pack(row, column), 0)
+
+    def cell(self, row: int, column: int, value=None):
+        key = pack(row, column)
+        if key in self._merged:
+            return MergedCell(self, row, column)
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = self._cells[key] = PatchedCell(self, row, column, 'f' if key in self._formulas else 'n')
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def iter_patched(self) -> Iterable[PatchedCell]:
+        return (self._cells[key] for key in sorted(self._cells))
+
+    def _rewrites(self) -> Tuple[Dict[int, Callable[[Optional[str]], str]], bool]:
+        """New XML of each changed cell (from its old XML or None) and whether formulas were overwritten."""
+        rewrites: Dict[int, Callable[[Optional[str]], str]] = {}
+        formulas_removed = False
+        written: Set[int] = set()
+        for key, cell in self._cells.items():
+            if not (cell._written or cell._number_format is not None or cell._border is not None):
+                continue
+            style = self.styles.derive(self._styles.get(key, 0), cell._number_format, cell._border)
+            if cell._written:
+                written.add(key)
+                formulas_removed = formulas_removed or key in self._formulas
+                rewrites[key] = lambda old, c=cell, s=style: cell_xml(c.coordinate, c._value, s)
+            else:
+                rewrites[key] = lambda old, c=cell, s=style: (
+                    _set_attr(old, 's', str(s)) if old else cell_xml(c.coordinate, None, s))
+        # Dependents of an overwritten shared formula master get their own formula
+        for si, (master, formula) in self._shared_masters.items():
+            if master not in written:
+                continue
+            origin = unpack(master)
+            origin_ref = f"{get_column_letter(origin[1])}{origin[0]}"
+            for key in self._shared_cells.get(si, ()):
+                if key in written:
+                    continue
+                row, col = unpack(key)
+                text = Translator(f"={formula}", origin=origin_ref).translate_formula(f"{get_column_letter(col)}{row}")
+                rewrites[key] = lambda old, t=text[1:]: _FORMULA_RE.sub(
+                    lambda m: f'<f>{escape(t)}</f>', old, count=1)
+        return rewrites, formulas_removed
+
+    def _patch_rows(self, body: str, rewrites: Dict[int, Callable[[Optional[str]], str]]) -> str:
+        by_row: Dict[int, Dict[int, Callable]] = {}
+        for key, rewrite in rewrites.items():
+            row, col = unpack(key)
+            by_row.setdefault(row, {})[col] = rewrite
+        pending = sorted(by_row)
+        out: List[str] = []
+        position = 0
+        index = 0
+        for match in _ROW_RE.finditer(body):
+            number = int(_attrs(match.group(1))['r'])
+            # New rows before this one
+            while index < len(pending) and pending[index] < number:
+                out.append(body[position:match.start()])
+                position = match.start()
+                out.append(self._row_xml(pending[index], '', None, by_row[pending[index]]))
+                index += 1
+            if index < len(pending) and pending[index] == number:
+                out.append(body[position:match.start()])
+                out.append(self._row_xml(number, match.group(1), match.group(2) or '', by_row[number]))
+                position = match.end()
+                index += 1
+        out.append(body[position:])
+        for number in pending[index:]:
+            out.append(self._row_xml(number, '', None, by_row[number]))
+        return ''.join(out)
+
+    def _row_xml(self, number: int, attrs: str, inner: Optional[str], rewrites: Dict[int, Callable]) -> str:
+        cells: Dict[int, str] = {}
+        rest = ''
+        if inner:
+            position = 0
+            for match in _CELL_RE.finditer(inner):
+                column, _ = coordinate_from_string(_attrs(match.group(1))['r'])
+                cells[column_index_from_string(column)] = match.group(0)
+                position = match.end()
+            rest = inner[position:]
+        added = False
+        for col, rewrite in rewrites.items():
+            added = added or col not in cells
+            cells[col] = rewrite(cells.get(col))
+        if not attrs:
+            attrs = f' r="{number}"'
+        elif added and 'spans=' in attrs:
+            attrs = re.sub(r'\sspans="[^"]*"', '', attrs)
+        return f'<row{attrs}>' + ''.join(cells[col] for col in sorted(cells)) + rest + '</row>'
+
+    def _dimension(self, xml: str) -> str:
+        match = re.search(r'<dimension\b[^>]*?ref="([^"]*)"[^>]*/>', xml)
+        if match is None or not self._cells:
+            return xml
+        try:
+            min_col, min_row, max_col, max_row = range_boundaries(match.group(1))
+        except (TypeError, ValueError):
+            return xml
+        rows = [cell.row for cell in self._cells.values()]
+        cols = [cell.column for cell in self._cells.values()]
+        min_col, min_row = min(min_col or 1, min(cols)), min(min_row or 1, min(rows))
+        max_col, max_row = max(max_col or 1, max(cols)), max(max_row or 1, max(rows))
+        ref = f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}"
+        return xml[:match.start(1)] + ref + xml[match.end(1):]
+
+    def patched_xml(self) -> Tuple[str, bool]:
+        """Sheet XML with the recorded cells, and whether template formulas were overwritten."""
+        rewrites, formulas_removed = self._rewrites()
+        start, end = self._data_span
+        data = self._xml[start:end]
+        body_match = re.match(r'<sheetData\b[^>]*>(.*)</sheetData>', data, re.S)
+        body = body_match.group(1) if body_match else ''
+        body = self._patch_rows(body, rewrites)
+        head = self._dimension(self._xml[:start])
+        return head + f'<sheetData>{body}</sheetData>' + self._xml[end:], formulas_removed
+
+
+class TemplatePackage:
+    """
+    The template's package as the output workbook.
+
+    Args:
+        template_path: Template workbook (.xlsx or .xlsm)
+        sheet_name: Template sheet; None (or a missing name) uses the active sheet
+
+    Attributes:
+        worksheet: The template sheet (PatchedSheet)
+
+    Sheets are managed like openpyxl workbook sheets (create_sheet(),
+    remove(), sheetnames, [title]): new sheets are openpyxl worksheets of a
+    scratch workbook and are written as new parts on save, with their cell
+    formats translated by style_map().
+    """
+
+    def __init__(self, template_path: str, sheet_name: Optional[str] = None):
+        self.template_path = template_path
+        try:
+            with ZipFile(template_path) as archive:
+                self._parts = set(archive.namelist())
+                read = lambda name: archive.read(name).decode('utf-8')
+                self._content_types = read('[Content_Types].xml')
+                root_rels = _relationships(read('_rels/.rels'))
+                self._workbook_part = next(
+                    _resolve('', rel['Target']) for rel in root_rels if rel.get('Type') == _REL_OFFICE_DOCUMENT)
+                self._workbook_xml = read(self._workbook_part)
+                self._workbook_rels_part = _rels_path(self._workbook_part)
+                self._workbook_rels = read(self._workbook_rels_part)
+                rels = {rel['Id']: rel for rel in _relationships(self._workbook_rels)}
+                self._sheets = []
+                for element in _SHEET_RE.findall(self._workbook_xml):
+                    attrs = _attrs(element)
+                    rel = rels[attrs['r:id']]
+                    self._sheets.append({'name': attrs['name'], 'element': element, 'rid': attrs['r:id'],
+                                         'type': rel['Type'], 'part': _resolve(self._workbook_part, rel['Target'])})
+                self._sheet_index = self._select_sheet(sheet_name)
+                sheet = self._sheets[self._sheet_index]
+                if sheet['type'] != _REL_WORKSHEET:
+                    raise UnsupportedTemplate(f"'{sheet['name']}' is not a worksheet")
+                styles_part = next(_resolve(self._workbook_part, rel['Target'])
+                                   for rel in rels.values() if rel['Type'] == _REL_STYLES)
+                self._styles_part = styles_part
+                self.styles = StylePatch(read(styles_part))
+                self._sheet_part = sheet['part']
+                self._sheet_rels_part = _rels_path(sheet['part'])
+                self._sheet_rels = read(self._sheet_rels_part) if self._sheet_rels_part in self._parts else None
+                self._calc_chain_rid = next((rel['Id'] for rel in rels.values() if rel['Type'] == _REL_CALC_CHAIN), None)
+                self._calc_chain_part = (None if self._calc_chain_rid is None else
+                                         _resolve(self._workbook_part, rels[self._calc_chain_rid]['Target']))
+                self._existing_comments = None
+                if self._sheet_rels is not None:
+                    for rel in _relationships(self._sheet_rels):
+                        if rel['Type'] == _REL_COMMENTS:
+                            comments_part = _resolve(self._sheet_part, rel['Target'])
+                            self._existing_comments = (comments_part, read(comments_part))
+                sheet_xml = read(sheet['part'])
+        except UnsupportedTemplate:
+            raise
+        except (KeyError, StopIteration, ValueError, OSError) as e:
+            raise UnsupportedTemplate(f"Unexpected package layout: {e}") from e
+        if not re.search(r'<worksheet[\s>]', sheet_xml) or not re.search(r'<styleSheet[\s>]', self.styles.xml):
+            raise UnsupportedTemplate("Prefixed SpreadsheetML is not supported")
+
+        self.worksheet = PatchedSheet(self._sheets[self._sheet_index]['name'], sheet_xml, self.styles)
+        # Scratch workbook: a placeholder per template sheet keeps titles unique
+        # and the sheet order; new sheets are real openpyxl worksheets
+        self._scratch = Workbook()
+        self._scratch.remove(self._scratch.active)
+        self._placeholders = [self._scratch.create_sheet(sheet['name']) for sheet in self._sheets]
+        self._plain: List[Worksheet] = []
+        self._style_ids: Dict[int, int] = {}
+
+    def _select_sheet(self, sheet_name: Optional[str]) -> int:
+        names = [sheet['name'] for sheet in self._sheets]
+        if sheet_name is not None and sheet_name in names:
+            return names.index(sheet_name)
+        view = re.search(r'<workbookView\b[^>]*>', self._workbook_xml)
+        active = int(_attrs(view.group(0)).get('activeTab', 0)) if view else 0
+        return active if 0 <= active < len(names) else 0
+
+    # Workbook-like sheet management
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return self._scratch.sheetnames
+
+    @property
+    def worksheets(self) -> List[Worksheet]:
+        return self._scratch.worksheets
+
+    def __getitem__(self, title: str) -> Worksheet:
+        return self._scratch[title]
+
+    def __contains__(self, title: str) -> bool:
+        return title in self._scratch.sheetnames
+
+    def create_sheet(self, title: Optional[str] = None, index: Optional[int] = None) -> Worksheet:
+        return self._scratch.create_sheet(title, index)
+
+    def remove(self, worksheet: Worksheet) -> None:
+        self._scratch.remove(worksheet)
+        self._plain = [ws for ws in self._plain if ws is not worksheet]
+
+    def clone_plain_sheet(self, title: str) -> Worksheet:
+        """Add a copy of the template sheet (as written) without hyperlinks and comments."""
+        worksheet = self._scratch.create_sheet(title)
+        self._plain.append(worksheet)
+        return worksheet
+
+    def style_map(self, style_id: int) -> int:
+        """Template cell format of a scratch workbook style id (font, border and number format)."""
+        mapped = self._style_ids.get(style_id)
+        if mapped is None:
+            scratch = self._scratch
+            style = scratch._cell_styles[style_id]
+            font = scratch._fonts[style.fontId] if style.fontId else None
+            border = scratch._borders[style.borderId] if style.borderId else None
+            number_format = None
+            if style.numFmtId:
+                number_format = (BUILTIN_FORMATS.get(style.numFmtId) if style.numFmtId < 164
+                                 else scratch._number_formats[style.numFmtId - 164])
+            mapped = self._style_ids[style_id] = self.styles.xf(font, number_format, border)
+        return mapped
+
+    # Saving
+
+    def _scratch_sheet_xml(self, worksheet: Worksheet) -> str:
+        writer = WorksheetWriter(worksheet, BytesIO())
+        writer.write()
+        xml = writer.read().decode('utf-8')
+        return re.sub(r'(<c\b[^>]*?\ss=")(\d+)(")',
+                      lambda m: f"{m.group(1)}{self.style_map(int(m.group(2))) if m.group(2) != '0' else 0}{m.group(3)}",
+                      xml)
+
+    def _plain_xml(self, patched_xml: str) -> str:
+        head_end = patched_xml.index('<sheetData')
+        tail_start = patched_xml.rindex('</sheetData>') if '</sheetData>' in patched_xml else head_end
+        head, data, tail = patched_xml[:head_end], patched_xml[head_end:tail_start], patched_xml[tail_start:]
+        root = _find_tag(head, 'worksheet')
+        root_end = head.index('>', root.start()) + 1
+        head = head[:root.start()] + _remove_attr(head[root.start():root_end], 'xr:uid') + head[root_end:]
+        head = re.sub(r'\stabSelected="[^"]*"', '', head)
+        head = re.sub(r'(<sheetPr\b[^>]*?)\scodeName="[^"]*"', r'\1', head)
+        for tag in _RELATED_ELEMENTS:
+            tail = _remove_element(tail, tag)
+        tail = _remove_element(tail, 'mc:AlternateContent')
+        tail = re.sub(r'\sr:id="[^"]*"', '', tail)
+        return head + data + tail
+
+    def _comment_parts(self, names: Set[str], sheet_rels: List[str], used_ids: Set[str],
+                       existing_rels: List[Dict[str, str]]) -> Tuple[Dict[str, bytes], Optional[str], bool]:
+        """Comment and VML parts of the template sheet; returns (parts, new legacyDrawing id, new comments part)."""
+        commented = [cell for cell in self.worksheet.iter_patched() if cell._comment is not None]
+        if not commented:
+            return {}, None, False
+        records = {}
+        if self._existing_comments is not None:
+            for record in CommentSheet.from_tree(fromstring(self._existing_comments[1].encode('utf-8'))).commentList:
+                records[record.ref] = record
+        for cell in commented:
+            records[cell.coordinate] = CommentRecord.from_cell(cell)
+        sheet = CommentSheet.from_comments(list(records.values()))
+        parts: Dict[str, bytes] = {}
+        vml_rel = next((rel for rel in existing_rels if rel['Type'] == _REL_VML), None)
+        if self._existing_comments is not None:
+            comments_part = self._existing_comments[0]
+            new_comments = False
+        else:
+            comments_part = _free_part(names, 'xl/comments/comment{0}.xml')
+            sheet_rels.append(_relationship_xml(_new_rel_id(used_ids), _REL_COMMENTS,
+                                                _relative(self._sheet_part, comments_part)))
+            new_comments = True
+        parts[comments_part] = tostring(sheet.to_tree())
+        legacy_id = None
+        if vml_rel is not None:
+            vml_part = _resolve(self._sheet_part, vml_rel['Target'])
+            with ZipFile(self.template_path) as archive:
+                vml = fromstring(archive.read(vml_part))
+        else:
+            vml_part = _free_part(names, 'xl/drawings/commentsDrawing{0}.vml')
+            legacy_id = _new_rel_id(used_ids)
+            sheet_rels.append(_relationship_xml(legacy_id, _REL_VML, _relative(self._sheet_part, vml_part)))
+            vml = None
+        parts[vml_part] = sheet.write_shapes(vml)
+        return parts, legacy_id, new_comments
+
+    def _main_sheet_xml(self, names: Set[str]) -> Tuple[str, Dict[str, bytes], Optional[str], bool, bool]:
+        """(sheet XML, extra parts, sheet rels XML, new comments part, formulas overwritten)."""
+        xml, formulas_removed = self.worksheet.patched_xml()
+        plain = self._plain_xml(xml) if self._plain else None
+        existing_rels = _relationships(self._sheet_rels) if self._sheet_rels is not None else []
+        used_ids = {rel['Id'] for rel in existing_rels}
+        new_rels: List[str] = []
+
+        links = []
+        linked = set()
+        for cell in self.worksheet.iter_patched():
+            link = cell._hyperlink
+            if not link:
+                continue
+            linked.add(cell.coordinate)
+            if link.startswith('#'):
+                links.append(f'<hyperlink ref="{cell.coordinate}" location="{_quote(link[1:])}"/>')
+            else:
+                rel_id = _new_rel_id(used_ids)
+                new_rels.append(_relationship_xml(rel_id, _REL_HYPERLINK, link, external=True))
+                links.append(f'<hyperlink ref="{cell.coordinate}" r:id="{rel_id}"/>')
+        if links:
+            existing = re.search(r'<hyperlinks\b[^>]*>(.*?)</hyperlinks>', xml, re.S)
+            if existing:
+                kept = [h for h in _HYPERLINK_RE.findall(existing.group(1)) if _attrs(h).get('ref') not in linked]
+                xml = xml[:existing.start()] + '<hyperlinks>' + ''.join(kept + links) + '</hyperlinks>' + xml[existing.end():]
+            else:
+                xml = _insert_before(xml, '<hyperlinks>' + ''.join(links) + '</hyperlinks>', _AFTER_HYPERLINKS, 'worksheet')
+
+        parts, legacy_id, new_comments = self._comment_parts(names, new_rels, used_ids, existing_rels)
+        if legacy_id is not None:
+            xml = _remove_element(xml, 'legacyDrawing')
+            xml = _insert_before(xml, f'<legacyDrawing r:id="{legacy_id}"/>', _AFTER_LEGACY_DRAWING, 'worksheet')
+
+        if new_rels:
+            root = _find_tag(xml, 'worksheet')
+            root_end = xml.index('>', root.start())
+            if 'xmlns:r=' not in xml[root.start():root_end]:
+                xml = xml[:root_end] + f' xmlns:r="{_REL}"' + xml[root_end:]
+            rels_xml = self._sheet_rels or ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                                            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                                            '</Relationships>')
+            end = rels_xml.rindex('</Relationships>')
+            rels_xml = rels_xml[:end] + ''.join(new_rels) + rels_xml[end:]
+        else:
+            rels_xml = None
+        self._plain_sheet_xml = plain
+        return xml, parts, rels_xml, new_comments, formulas_removed
+
+    def save(self, path: str, streams: Sequence[SheetStream] = ()) -> None:
+        """
+        Write the output package to ``path``, with the rows of ``streams``
+        spliced into their (scratch) sheets.
+        """
+        names = set(self._parts)
+        replaced: Dict[str, bytes] = {}
+        added: Dict[str, bytes] = {}
+        dropped: Set[str] = set()
+        content_overrides: List[Tuple[str, str]] = []
+
+        sheet_xml, comment_parts, sheet_rels, new_comments, formulas_removed = self._main_sheet_xml(names)
+        replaced[self._sheet_part] = sheet_xml.encode('utf-8')
+        for part, data in comment_parts.items():
+            (replaced if part in self._parts else added)[part] = data
+            if part.endswith('.xml') and new_comments:
+                content_overrides.append((part, _CT_COMMENTS))
+        if sheet_rels is not None:
+            (replaced if self._sheet_rels_part in self._parts else added)[self._sheet_rels_part] = sheet_rels.encode('utf-8')
+
+        # Sheets in their final order: kept template sheets and new parts
+        workbook_rels = self._workbook_rels
+        used_ids = {rel['Id'] for rel in _relationships(workbook_rels)}
+        sheet_ids = [int(_attrs(sheet['element']).get('sheetId', 0)) for sheet in self._sheets]
+        next_sheet_id = max(sheet_ids + [0]) + 1
+        placeholders = {id(ws): index for index, ws in enumerate(self._placeholders)}
+        stream_of = {id(stream.worksheet): stream for stream in streams}
+        elements: List[str] = []
+        new_index: Dict[int, int] = {}
+        new_rels: List[str] = []
+        filters: List[str] = []
+        spliced: List[Tuple[str, str, SheetStream]] = []
+        for position, worksheet in enumerate(self._scratch.worksheets):
+            index = placeholders.get(id(worksheet))
+            if index is not None:
+                new_index[index] = position
+                elements.append(self._sheets[index]['element'])
+                continue
+            part = _free_part(names, 'xl/worksheets/sheet{0}.xml')
+            rel_id = _new_rel_id(used_ids)
+            new_rels.append(_relationship_xml(rel_id, _REL_WORKSHEET, _relative(self._workbook_part, part)))
+            elements.append(f'<sheet name="{_quote(worksheet.title)}" sheetId="{next_sheet_id}" r:id="{rel_id}"/>')
+            next_sheet_id += 1
+            content_overrides.append((part, _CT_WORKSHEET))
+            if any(ws is worksheet for ws in self._plain):
+                added[part] = self._plain_sheet_xml.encode('utf-8')
+                continue
+            if worksheet.auto_filter.ref:
+                min_col, min_row, max_col, max_row = range_boundaries(worksheet.auto_filter.ref)
+                ref = absolute_coordinate(worksheet.auto_filter.ref)
+                filters.append(f'<definedName name="_xlnm._FilterDatabase" localSheetId="{position}" hidden="1">'
+                               f'{escape(quote_sheetname(worksheet.title))}!{ref}</definedName>')
+            xml = self._scratch_sheet_xml(worksheet)
+            stream = stream_of.get(id(worksheet))
+            if stream is None:
+                added[part] = xml.encode('utf-8')
+            else:
+                spliced.append((part, xml, stream))
+
+        # Removed template sheets
+        for index, sheet in enumerate(self._sheets):
+            if index in new_index:
+                continue
+            dropped.add(sheet['part'])
+            dropped.add(_rels_path(sheet['part']))
+            workbook_rels = re.sub(r'<Relationship\b[^>]*?Id="%s"[^>]*?/>' % re.escape(sheet['rid']), '', workbook_rels)
+
+        # Overwritten formulas invalidate the calculation chain
+        if formulas_removed and self._calc_chain_rid is not None:
+            dropped.add(self._calc_chain_part)
+            workbook_rels = re.sub(r'<Relationship\b[^>]*?Id="%s"[^>]*?/>' % re.escape(self._calc_chain_rid), '',
+                                   workbook_rels)
+
+        end = workbook_rels.rindex('</Relationships>')
+        workbook_rels = workbook_rels[:end] + ''.join(new_rels) + workbook_rels[end:]
+        replaced[self._workbook_rels_part] = workbook_rels.encode('utf-8')
+        replaced[self._workbook_part] = self._workbook(elements, new_index, filters).encode('utf-8')
+        replaced['[Content_Types].xml'] = self._content_types_xml(content_overrides, dropped, bool(comment_parts)).encode('utf-8')
+        replaced[self._styles_part] = self.styles.to_xml().encode('utf-8')
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with ZipFile(self.template_path) as source, ZipFile(tmp_path, 'w', ZIP_DEFLATED, allowZip64=True) as target:
+                for info in source.infolist():
+                    if info.filename in dropped:
+                        continue
+                    data = replaced.get(info.filename)
+                    if data is None:
+                        target.writestr(info, source.read(info))
+                    else:
+                        part = ZipInfo(info.filename, date_time=info.date_time)
+                        part.compress_type = ZIP_DEFLATED
+                        target.writestr(part, data)
+                for name, data in added.items():
+                    part = ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+                    part.compress_type = ZIP_DEFLATED
+                    target.writestr(part, data)
+                for name, xml, stream in spliced:
+                    part = ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+                    part.compress_type = ZIP_DEFLATED
+                    with target.open(part, 'w', force_zip64=True) as out:
+                        stream.splice(xml.encode('utf-8'), out)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _workbook(self, elements: List[str], new_index: Dict[int, int], filters: List[str]) -> str:
+        xml = self._workbook_xml
+        sheets = re.search(r'<sheets\b[^>]*>.*?</sheets>', xml, re.S)
+        xml = xml[:sheets.start()] + '<sheets>' + ''.join(elements) + '</sheets>' + xml[sheets.end():]
+
+        # Sheet-scoped names follow their sheet (and go with it)
+        def renumber(match):
+            attrs = _attrs(match.group(1))
+            if 'localSheetId' not in attrs:
+                return match.group(0)
+            index = new_index.get(int(attrs['localSheetId']))
+            if index is None:
+                return ''
+            return _set_attr(match.group(0), 'localSheetId', str(index))
+        xml = _DEFINED_NAME_RE.sub(renumber, xml)
+        if filters:
+            if '</definedNames>' in xml:
+                end = xml.index('</definedNames>')
+                xml = xml[:end] + ''.join(filters) + xml[end:]
+            else:
+                xml = _insert_before(xml, '<definedNames>' + ''.join(filters) + '</definedNames>',
+                                     _AFTER_DEFINED_NAMES, 'workbook')
+        xml = re.sub(r'<definedNames>\s*</definedNames>', '', xml)
+
+        # Keep the same sheet active (the first one when it was removed)
+        view = re.search(r'<workbookView\b[^>]*?/?>', xml)
+        if view:
+            attrs = _attrs(view.group(0))
+            element = view.group(0)
+            for name in ('activeTab', 'firstSheet'):
+                if name in attrs:
+                    element = _set_attr(element, name, str(new_index.get(int(attrs[name]), 0)))
+            xml = xml[:view.start()] + element + xml[view.end():]
+
+        # Consolidated values change what template formulas compute
+        calc = re.search(r'<calcPr\b[^>]*?/?>', xml)
+        if calc:
+            xml = xml[:calc.start()] + _set_attr(calc.group(0), 'fullCalcOnLoad', '1') + xml[calc.end():]
+        else:
+            xml = _insert_before(xml, '<calcPr fullCalcOnLoad="1"/>', _AFTER_CALC_PR, 'workbook')
+        return xml
+
+    def _content_types_xml(self, overrides: List[Tuple[str, str]], dropped: Set[str], comments: bool) -> str:
+        xml = self._content_types
+        for part in dropped:
+            xml = re.sub(r'<Override\b[^>]*?PartName="/%s"[^>]*?/>' % re.escape(part), '', xml)
+        additions = [f'<Override PartName="/{part}" ContentType="{content_type}"/>' for part, content_type in overrides]
+        if comments and not re.search(r'<Default\b[^>]*?Extension="vml"', xml, re.I):
+            additions.insert(0, f'<Default Extension="vml" ContentType="{_CT_VML}"/>')
+        end = xml.rindex('</Types>')
+        return xml[:end] + ''.join(additions) + xml[end:]
@@ -0,0 +1,83 @@
+"""
+Template Session for Excel Consolidator
+
+One run needs the template twice: as the writable workbook the consolidated
+values go into, and as the source of the format analysis. A TemplateSession
+parses the template once and serves both from the same worksheet, so the
+second full load of the template (and its styles) and the memory of a
+duplicate workbook are gone.
+
+The analysis only reads the worksheet and always runs before any value is
+written, so it sees the template exactly as it is on disk.
+
+The template is parsed on first use of ``workbook`` or ``worksheet``: a run
+that writes its output by patching the template package (TemplatePackage)
+and finds its analysis in the cache never parses it at all.
+"""
+
+import os
+from typing import Callable, Optional
+
+import openpyxl
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+
+from src.engine.template_cache import TemplateAnalysis, TemplateCache
+
+
+class TemplateSession:
+    """
+    The parsed template of one consolidation run.
+
+    Args:
+        template_path: Template workbook (.xlsx or .xlsm)
+        select_sheet: Picks the template worksheet from the workbook
+        keep_vba: Keep macros; None keeps them for .xlsm templates
+
+    Attributes:
+        workbook: Writable template workbook (becomes the output); parsed on first use
+        worksheet: Template worksheet (consolidated values go here)
+        keep_vba: Whether macros were kept
+    """
+
+    def __init__(self, template_path: str, select_sheet: Callable[[Workbook], Worksheet],
+                 keep_vba: Optional[bool] = None):
+        if keep_vba is None:
+            keep_vba = os.path.splitext(template_path)[1].lower() == '.xlsm'
+        self.template_path = template_path
+        self.keep_vba = keep_vba
+        self.analysis_from_cache = False
+        self._select_sheet = select_sheet
+        self._workbook: Optional[Workbook] = None
+        self._worksheet: Optional[Worksheet] = None
+        self._analysis: Optional[TemplateAnalysis] = None
+
+    @property
+    def workbook(self) -> Workbook:
+        if self._workbook is None:
+            self._workbook = openpyxl.load_workbook(self.template_path, keep_vba=self.keep_vba)
+            self._worksheet = self._select_sheet(self._workbook)
+        return self._workbook
+
+    @property
+    def worksheet(self) -> Worksheet:
+        if self._worksheet is None:
+            self.workbook
+        return self._worksheet
+
+    def analysis(self, analyze: Callable[[Worksheet], TemplateAnalysis],
+                 cache: Optional[TemplateCache] = None) -> TemplateAnalysis:
+        """
+        Format analysis of the template worksheet: from ``cache`` when it has
+        an entry for this template, else ``analyze(worksheet)`` (then stored).
+        Computed once per session; errors of ``analyze`` propagate.
+        """
+        if self._analysis is None:
+            analysis = cache.load(self.template_path) if cache is not None else None
+            self.analysis_from_cache = analysis is not None
+            if analysis is None:
+                analysis = analyze(self.worksheet)
+                if cache is not None:
+                    cache.store(self.template_path, analysis)
+            self._analysis = analysis
+        return self._analysis
@@ -0,0 +1,252 @@
+"""
+Cell Value Parsing for Excel Consolidator
+
+Template-format aware conversion of raw source values to Decimal. These are
+the rules of ConsolidationWorker._process_*_value, moved to module level so
+they can run inside worker processes (no Qt, fully picklable).
+
+The web service uses the same parser with its own options (wider currency
+symbol list, optional percentage/text handling for unformatted cells).
+
+Text values repeat a lot in hand-typed sheets ("0", "1,234", "50%", "-"), so
+string parsing goes through a bounded LRU cache keyed by (kind, text). Failed
+parses are cached too and raise again on every hit.
+"""
+
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Value kinds (derived from the template cell's number format)
+PERCENTAGE = 'percentage'
+CURRENCY = 'currency'
+NUMBER = 'number'
+DEFAULT = 'default'
+
+DESKTOP_CURRENCY_SYMBOLS = ('$', '€', '£', '¥')
+ALL_CURRENCY_SYMBOLS = ('$', '€', '£', '¥', '₽', '₹', '₩', '₪', '₦', '₡', '₨', '₫', '₱')
+
+
+def value_kind(format_info: dict) -> str:
+    """Map a template format_info record to the parser kind used for its cells."""
+    if format_info.get('is_percentage', False):
+        return PERCENTAGE
+    elif format_info.get('is_currency', False):
+        return CURRENCY
+    elif format_info.get('is_number', False):
+        return NUMBER
+    return DEFAULT
+
+
+class ValueParser:
+    """
+    Convert raw cell values to Decimal according to the template cell kind.
+
+    parse_percentage/parse_currency/parse_number raise on unparseable text so
+    callers can report format errors; parse_default never raises.
+    All parsers return None for value types they do not handle (dates, etc.).
+
+    parse() serves text values from an LRU cache of ``cache_size`` entries
+    (0 disables it); cache_stats() reports its hits and misses.
+    """
+
+    def __init__(self, currency_symbols: Tuple[str, ...] = DESKTOP_CURRENCY_SYMBOLS,
+                 currency_strip_spaces: bool = False,
+                 default_percentages: bool = False,
+                 default_text_numbers: bool = True,
+                 cache_size: int = 4096):
+        self.currency_symbols = tuple(currency_symbols)
+        self.currency_strip_spaces = currency_strip_spaces
+        self.default_percentages = default_percentages
+        self.default_text_numbers = default_text_numbers
+        self._init_cache(cache_size)
+
+    def _init_cache(self, cache_size: int) -> None:
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], object]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        # Single-character symbols, separators (and spaces) are deleted in one pass
+        deleted = ''.join(s for s in self.currency_symbols if len(s) == 1) + ','
+        if self.currency_strip_spaces:
+            deleted += ' '
+        self._currency_table = str.maketrans('', '', deleted)
+        self._currency_multi = tuple(s for s in self.currency_symbols if len(s) > 1)
+
+    def options(self) -> List[Tuple[str, object]]:
+        """Parsing options as sorted (name, value) pairs (identifies the rules, not the cache)."""
+        return sorted((name, value) for name, value in vars(self).items() if not name.startswith('_'))
+
+    def cache_stats(self) -> Tuple[int, int]:
+        """(hits, misses) of the text cache since the parser was created."""
+        return self._hits, self._misses
+
+    def __getstate__(self):
+        # Worker processes get the options only and start with an empty cache
+        state = dict(self.options())
+        state['_cache_size'] = self._cache_size
+        return state
+
+    def __setstate__(self, state):
+        cache_size = state.pop('_cache_size', 4096)
+        self.__dict__.update(state)
+        self._init_cache(cache_size)
+
+    def parse(self, kind: str, value) -> Optional[Decimal]:
+        if isinstance(value, str) and self._cache_size:
+            return self._parse_text_cached(kind, value)
+        return self._parse(kind, value)
+
+    def parser_for(self, kind: str) -> Callable[[object], Optional[Decimal]]:
+        """Parse function of one kind (same rules and cache as parse(kind, value))."""
+        direct = {PERCENTAGE: self.parse_percentage, CURRENCY: self.parse_currency,
+                  NUMBER: self.parse_number}.get(kind, self.parse_default)
+        if not self._cache_size:
+            return direct
+        cached = self._parse_text_cached
+
+        def parse(value):
+            if isinstance(value, str):
+                return cached(kind, value, direct)
+            return direct(value)
+        return parse
+
+    def _parse_text_cached(self, kind: str, text: str,
+                           direct: Optional[Callable[[object], Optional[Decimal]]] = None) -> Optional[Decimal]:
+        key = (kind, text)
+        cache = self._cache
+        try:
+            result = cache[key]
+        except KeyError:
+            self._misses += 1
+            try:
+                result = direct(text) if direct is not None else self._parse(kind, text)
+            except Exception as e:
+                result = _ParseFailure(e)
+            cache[key] = result
+            if len(cache) > self._cache_size:
+                cache.popitem(last=False)
+        else:
+            self._hits += 1
+            cache.move_to_end(key)
+        if isinstance(result, _ParseFailure):
+            raise ValueError(f"Cannot parse {text!r} as {kind}: {result.error}")
+        return result
+
+    def _parse(self, kind: str, value) -> Optional[Decimal]:
+        if kind == PERCENTAGE:
+            return self.parse_percentage(value)
+        elif kind == CURRENCY:
+            return self.parse_currency(value)
+        elif kind == NUMBER:
+            return self.parse_number(value)
+        return self.parse_default(value)
+
+    def parse_percentage(self, value) -> Optional[Decimal]:
+        """Normalize percentage inputs to PERCENT POINTS (0.825 -> 82.5, '82.5%' -> 82.5)."""
+        if isinstance(value, (int, float)):
+            numeric_val = float(value)
+            if 0 <= numeric_val <= 1:
+                normalized = numeric_val * 100.0
+            else:
+                normalized = numeric_val
+            return Decimal(str(normalized))
+        elif isinstance(value, str):
+            text = value.strip().replace(",", "")
+            if text.endswith('%'):
+                # Remove % and interpret as percent points directly
+                return Decimal(text[:-1])
+            numeric_val = float(text)
+            if 0 <= numeric_val <= 1:
+                normalized = numeric_val * 100.0
+            else:
+                normalized = numeric_val
+            return Decimal(str(normalized))
+        return None
+
+    def parse_currency(self, value) -> Optional[Decimal]:
+        """Strip currency symbols and thousands separators."""
+        if isinstance(value, (int, float)):
+            return Decimal(str(value))
+        elif isinstance(value, str):
+            text = value.strip()
+            for symbol in self._currency_multi:
+                text = text.replace(symbol, '')
+            return Decimal(text.translate(self._currency_table))
+        return None
+
+    def parse_number(self, value) -> Optional[Decimal]:
+        """Parse numbers, removing thousands separators and spaces."""
+        if isinstance(value, (int, float)):
+            return Decimal(str(value))
+        elif isinstance(value, str):
+            text = value.strip().replace(",", "").replace(" ", "")
+            return Decimal(text)
+        return None
+
+    def parse_default(self, value) -> Optional[Decimal]:
+        """Best-effort parsing for unformatted cells; None when not numeric."""
+        try:
+            if isinstance(value, (int, float)):
+                return Decimal(str(value))
+            elif isinstance(value, str):
+                text = value.strip().replace(",", "")
+                if self.default_percentages and text.endswith('%'):
+                    try:
+                        return Decimal(str(float(text[:-1])))
+                    except Exception:
+                        pass
+                if self.default_text_numbers:
+                    try:
+                        return Decimal(text)
+                    except Exception:
+                        pass
+            return None
+        except Exception:
+            return None
+
+
+class CellHandler:
+    """
+    Compiled handling of one template coordinate: its value kind, how its
+    values are consolidated ('sum' or 'average') and the parse function to
+    call, so per-cell code does one lookup instead of re-reading format flags.
+    """
+
+    __slots__ = ('kind', 'method', 'parse')
+
+    def __init__(self, kind: str, method: str, parse: Callable[[object], Optional[Decimal]]):
+        self.kind = kind
+        self.method = method
+        self.parse = parse
+
+
+def compile_handlers(coord_kinds: Dict[int, Tuple[str, str]],
+                     parser: ValueParser) -> Tuple[Dict[int, CellHandler], CellHandler]:
+    """
+    Build {coordinate key: CellHandler} from (kind, method) pairs, plus the
+    handler for coordinates without template format (default parsing, summed).
+    Handlers with the same kind and method are shared.
+    """
+    shared: Dict[Tuple[str, str], CellHandler] = {}
+    parsers: Dict[str, Callable[[object], Optional[Decimal]]] = {}
+
+    def handler(kind: str, method: str) -> CellHandler:
+        compiled = shared.get((kind, method))
+        if compiled is None:
+            if kind not in parsers:
+                parsers[kind] = parser.parser_for(kind)
+            compiled = shared[(kind, method)] = CellHandler(kind, method, parsers[kind])
+        return compiled
+
+    handlers = {key: handler(kind, method) for key, (kind, method) in coord_kinds.items()}
+    return handlers, handler(DEFAULT, 'sum')
+
+
+class _ParseFailure:
+    """Cached outcome of a text value that failed to parse."""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: Exception):
+        self.error = error
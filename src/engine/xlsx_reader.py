@@ -0,0 +1,420 @@
+"""
+Streaming Source Reader for Excel Consolidator
+
+Reads cell values straight out of the xlsx package instead of building a full
+openpyxl workbook. The worksheet XML is streamed with an incremental parser and
+only the cells the template asks for are decoded, so a source file costs one
+pass over its sheet XML and nothing more.
+
+Values are decoded exactly like ``openpyxl.load_workbook(data_only=True)``:
+cached formula results, shared/inline strings, booleans, errors and dates
+(cells whose style is a date format) all come back as the same Python values.
+"""
+
+import os
+import posixpath
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from xml.etree.ElementTree import iterparse, fromstring
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.utils.datetime import from_excel, from_ISO8601, WINDOWS_EPOCH, MAC_EPOCH
+
+try:
+    from openpyxl.styles.numbers import is_timedelta_format
+except ImportError:  # openpyxl < 3.1
+    def is_timedelta_format(fmt):
+        return False
+
+
+SHEET_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+ROW_TAG = '{%s}row' % SHEET_MAIN_NS
+CELL_TAG = '{%s}c' % SHEET_MAIN_NS
+VALUE_TAG = '{%s}v' % SHEET_MAIN_NS
+INLINE_STRING_TAG = '{%s}is' % SHEET_MAIN_NS
+TEXT_TAG = '{%s}t' % SHEET_MAIN_NS
+RUN_TAG = '{%s}r' % SHEET_MAIN_NS
+SI_TAG = '{%s}si' % SHEET_MAIN_NS
+DIMENSION_TAG = '{%s}dimension' % SHEET_MAIN_NS
+SHEET_DATA_TAG = '{%s}sheetData' % SHEET_MAIN_NS
+NUMFMT_TAG = '{%s}numFmt' % SHEET_MAIN_NS
+CELL_XFS_TAG = '{%s}cellXfs' % SHEET_MAIN_NS
+XF_TAG = '{%s}xf' % SHEET_MAIN_NS
+
+# Row number -> collection of wanted column numbers (1-based)
+RowTargets = Dict[int, Iterable[int]]
+
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    """Split a cell reference such as 'AB12' into (row, col) without regexes."""
+    col = 0
+    for idx, ch in enumerate(ref):
+        code = ord(ch)
+        if code < 65:
+            return int(ref[idx:]), col
+        col = col * 26 + (code - 64)
+    raise ValueError(f"Invalid cell reference: {ref}")
+
+
+def _cast_number(value: str):
+    """Convert a numeric string to int or float (same rule as openpyxl)."""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _text_content(node) -> str:
+    """Flatten a <si>/<is> node to plain text, ignoring phonetic runs."""
+    snippets: List[str] = []
+    plain = node.find(TEXT_TAG)
+    if plain is not None and plain.text:
+        snippets.append(plain.text)
+    for run in node.iter(RUN_TAG):
+        text = run.findtext(TEXT_TAG)
+        if text:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+class XlsxSourceReader:
+    """
+    Read selected cells from one worksheet of an xlsx/xlsm package.
+
+    Usage:
+        with XlsxSourceReader(path, sheet_name=None) as reader:
+            for row, col, value, data_type in reader.iter_cells(targets):
+                ...
+
+    ``data_type`` follows openpyxl: 'n' numeric, 's' string, 'b' boolean,
+    'e' error and 'd' date/time.
+    """
+
+    def __init__(self, path: str, sheet_name: Optional[str] = None):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.sheet_title: Optional[str] = None
+        self._archive: Optional[zipfile.ZipFile] = None
+        self._sheet_part: Optional[str] = None
+        self._strings_part: Optional[str] = None
+        self._styles_part: Optional[str] = None
+        self._epoch = WINDOWS_EPOCH
+        self._date_styles: Optional[Set[int]] = None
+        self._timedelta_styles: Set[int] = set()
+        self._dimensions: Optional[Tuple[Optional[int], Optional[int]]] = None
+
+    # ------------------------------------------------------------------
+    # Package handling
+    # ------------------------------------------------------------------
+
+    def open(self):
+        """Open the package and resolve the worksheet part to read."""
+        self._archive = zipfile.ZipFile(self.path)
+        try:
+            self._resolve_parts()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _read_rels(self, part: str) -> Dict[str, Tuple[str, str]]:
+        """Return {rId: (type, absolute part name)} for a part's relationships."""
+        folder, name = posixpath.split(part)
+        rels_part = posixpath.join(folder, '_rels', name + '.rels')
+        try:
+            root = fromstring(self._archive.read(rels_part))
+        except KeyError:
+            return {}
+        rels = {}
+        for rel in root.iter('{%s}Relationship' % PKG_REL_NS):
+            target = rel.get('Target', '')
+            if target.startswith('/'):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            rels[rel.get('Id')] = (rel.get('Type', ''), target)
+        return rels
+
+    def _resolve_parts(self):
+        workbook_part = 'xl/workbook.xml'
+        for rel_type, target in self._read_rels('').values():
+            if rel_type.endswith('/officeDocument'):
+                workbook_part = target
+                break
+
+        workbook = fromstring(self._archive.read(workbook_part))
+        rels = self._read_rels(workbook_part)
+
+        props = workbook.find('{%s}workbookPr' % SHEET_MAIN_NS)
+        if props is not None and props.get('date1904') in ('1', 'true'):
+            self._epoch = MAC_EPOCH
+
+        sheets = []
+        for sheet in workbook.iter('{%s}sheet' % SHEET_MAIN_NS):
+            rel = rels.get(sheet.get('{%s}id' % REL_NS))
+            if rel is not None:
+                sheets.append((sheet.get('name'), rel[1]))
+        if not sheets:
+            raise ValueError(f"No worksheets found in '{os.path.basename(self.path)}'")
+
+        # Same selection rule as ConsolidationWorker._get_worksheet:
+        # named sheet when present, otherwise the workbook's active sheet
+        chosen = None
+        if self.sheet_name:
+            chosen = next((s for s in sheets if s[0] == self.sheet_name), None)
+        if chosen is None:
+            active = 0
+            view = workbook.find('{%s}bookViews/{%s}workbookView' % (SHEET_MAIN_NS, SHEET_MAIN_NS))
+            if view is not None:
+                try:
+                    active = int(view.get('activeTab', 0))
+                except ValueError:
+                    active = 0
+            chosen = sheets[active] if 0 <= active < len(sheets) else sheets[0]
+        self.sheet_title, self._sheet_part = chosen
+
+        for rel_type, target in rels.values():
+            if rel_type.endswith('/sharedStrings'):
+                self._strings_part = target
+            elif rel_type.endswith('/styles'):
+                self._styles_part = target
+
+    def _load_styles(self):
+        """Index the cellXfs entries whose number format is a date or time."""
+        self._date_styles = set()
+        if not self._styles_part or self._styles_part not in self._archive.namelist():
+            return
+        custom: Dict[int, str] = {}
+        xf_index = 0
+        in_cell_xfs = False
+        with self._archive.open(self._styles_part) as fh:
+            for event, elem in iterparse(fh, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == CELL_XFS_TAG:
+                        in_cell_xfs = True
+                    continue
+                if tag == NUMFMT_TAG:
+                    custom[int(elem.get('numFmtId', 0))] = elem.get('formatCode', '')
+                elif tag == XF_TAG and in_cell_xfs:
+                    fmt_id = int(elem.get('numFmtId', 0))
+                    fmt = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+                    if fmt and is_date_format(fmt):
+                        self._date_styles.add(xf_index)
+                        if is_timedelta_format(fmt):
+                            self._timedelta_styles.add(xf_index)
+                    xf_index += 1
+                elif tag == CELL_XFS_TAG:
+                    break
+
+    def _load_shared_strings(self, wanted: Set[int]) -> Dict[int, str]:
+        """Decode only the shared strings referenced by the cells we kept."""
+        strings: Dict[int, str] = {}
+        if not wanted or not self._strings_part:
+            return strings
+        last = max(wanted)
+        idx = 0
+        with self._archive.open(self._strings_part) as fh:
+            for _, elem in iterparse(fh):
+                if elem.tag != SI_TAG:
+                    continue
+                if idx in wanted:
+                    strings[idx] = _text_content(elem).replace('x005F_', '')
+                elem.clear()
+                if idx >= last:
+                    break
+                idx += 1
+        return strings
+
+    # ------------------------------------------------------------------
+    # Worksheet access
+    # ------------------------------------------------------------------
+
+    @property
+    def max_row(self) -> Optional[int]:
+        return self._read_dimensions()[0]
+
+    @property
+    def max_column(self) -> Optional[int]:
+        return self._read_dimensions()[1]
+
+    def _read_dimensions(self) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Read the sheet's <dimension> record (as openpyxl read-only mode does);
+        without a usable record the size is measured from the sheet's cells.
+        """
+        if self._dimensions is None:
+            self._dimensions = (None, None)
+            with self._archive.open(self._sheet_part) as fh:
+                for _, elem in iterparse(fh, events=('start',)):
+                    if elem.tag == DIMENSION_TAG:
+                        try:
+                            _, _, max_col, max_row = range_boundaries(elem.get('ref', ''))
+                            self._dimensions = (max_row, max_col)
+                        except (TypeError, ValueError):
+                            pass
+                        break
+                    if elem.tag == SHEET_DATA_TAG:
+                        break
+            if None in self._dimensions:
+                self._dimensions = self._measure_dimensions()
+        return self._dimensions
+
+    def _measure_dimensions(self) -> Tuple[int, int]:
+        """Last row and column holding a <c> element (openpyxl's max_row/max_column of a full load)."""
+        max_row = max_col = 0
+        row_counter = 0
+        with self._archive.open(self._sheet_part) as fh:
+            sheet_data = None
+            for event, elem in iterparse(fh, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == SHEET_DATA_TAG:
+                        sheet_data = elem
+                    continue
+                if tag == ROW_TAG:
+                    r = elem.get('r')
+                    row_counter = int(r) if r else row_counter + 1
+                    col_counter = 0
+                    for cell in elem:
+                        if cell.tag != CELL_TAG:
+                            continue
+                        ref = cell.get('r')
+                        if ref:
+                            row, col_counter = _split_ref(ref)
+                        else:
+                            row, col_counter = row_counter, col_counter + 1
+                        max_row = max(max_row, row)
+                        max_col = max(max_col, col_counter)
+                    sheet_data.clear()
+                elif tag == SHEET_DATA_TAG:
+                    break
+        # An empty sheet reports 1 x 1, like openpyxl
+        return max_row or 1, max_col or 1
+
+    def iter_cells(self, targets: Optional[RowTargets] = None) -> Iterator[Tuple[int, int, object, str]]:
+        """
+        Yield (row, col, value, data_type) for non-empty cells.
+
+        Args:
+            targets: Row number -> wanted column numbers. Rows that are not
+                listed are skipped without decoding any of their cells, the
+                rest of a row is skipped after its last wanted column, and
+                reading stops after the last wanted row (so sheets with
+                phantom dimensions cost no more than their target rows).
+                None yields every non-empty cell of the sheet.
+        """
+        if self._archive is None:
+            raise ValueError("Reader is not open")
+        if self._date_styles is None:
+            self._load_styles()
+
+        # Last wanted column per row and last wanted row
+        row_limits = {row: max(cols) for row, cols in targets.items() if cols} if targets is not None else None
+        last_row = max(row_limits) if row_limits else 0
+
+        # Pass 1: stream the sheet, keep only the wanted cells (raw values)
+        kept = []
+        string_refs: Set[int] = set()
+        row_counter = 0
+        with self._archive.open(self._sheet_part) as fh:
+            sheet_data = None
+            for event, elem in iterparse(fh, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == SHEET_DATA_TAG:
+                        sheet_data = elem
+                    continue
+                if tag == ROW_TAG:
+                    r = elem.get('r')
+                    row_counter = int(r) if r else row_counter + 1
+                    if row_limits is not None and row_counter > last_row:
+                        # Rows are stored in order: nothing wanted after this one
+                        break
+                    cols = targets.get(row_counter) if targets is not None else True
+                    if cols:
+                        col_limit = row_limits[row_counter] if row_limits is not None else None
+                        col_counter = 0
+                        for cell in elem:
+                            if cell.tag != CELL_TAG:
+                                continue
+                            ref = cell.get('r')
+                            if ref:
+                                row, col_counter = _split_ref(ref)
+                            else:
+                                row, col_counter = row_counter, col_counter + 1
+                            if col_limit is not None:
+                                if col_counter > col_limit:
+                                    break
+                                if col_counter not in cols:
+                                    continue
+                            raw = self._raw_cell(cell)
+                            if raw is None:
+                                continue
+                            if raw[1] == 's':
+                                string_refs.add(raw[0])
+                            kept.append((row, col_counter) + raw)
+                    # Finished rows are dropped so memory stays flat
+                    sheet_data.clear()
+                elif tag == SHEET_DATA_TAG:
+                    break
+
+        # Pass 2: resolve shared strings and typed values
+        strings = self._load_shared_strings(string_refs)
+        for row, col, value, data_type, style_id in kept:
+            if data_type == 's':
+                value = strings.get(value)
+                if value is None:
+                    continue
+            elif data_type == 'str':
+                data_type = 's'
+            elif data_type == 'n' and style_id in self._date_styles:
+                data_type = 'd'
+                try:
+                    value = from_excel(value, self._epoch, timedelta=style_id in self._timedelta_styles)
+                except (OverflowError, ValueError):
+                    data_type, value = 'e', '#VALUE!'
+            yield row, col, value, data_type
+
+    def _raw_cell(self, cell):
+        """Decode one <c> element to (value, data_type, style_id) or None if empty."""
+        data_type = cell.get('t', 'n')
+        style = cell.get('s')
+        style_id = int(style) if style else 0
+
+        if data_type == 'inlineStr':
+            child = cell.find(INLINE_STRING_TAG)
+            if child is None:
+                return None
+            return _text_content(child), 'str', style_id
+
+        value = cell.findtext(VALUE_TAG) or None
+        if value is None:
+            return None
+        if data_type == 'n':
+            return _cast_number(value), 'n', style_id
+        if data_type == 's':
+            return int(value), 's', style_id
+        if data_type == 'b':
+            return bool(int(value)), 'b', style_id
+        if data_type == 'd':
+            return from_ISO8601(value), 'd', style_id
+        if data_type == 'e':
+            return value, 'e', style_id
+        # 'str' (cached formula text) reads as a plain string
+        return value, 'str', style_id
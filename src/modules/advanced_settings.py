@@ -5,6 +5,7 @@ from typing import Dict, Iterable, List, Optional, Tuple
 from decimal import Decimal, InvalidOperation, getcontext
 
 import openpyxl
+from openpyxl.utils.cell import range_boundaries
 import fnmatch
 
 
@@ -121,22 +122,39 @@ def load_cells(ws, settings: Dict) -> Iterable:
                 yield cell
 
 
+def apply_custom_range(targets: Optional[Dict[int, Iterable[int]]], settings: Dict) -> Optional[Dict[int, Iterable[int]]]:
+    """Restrict row-grouped target coordinates ({row: cols}) to the custom range.
+
+    Mirrors load_cells: the range only applies when enabled and valid,
+    otherwise targets are returned unchanged. ``None`` targets mean "all cells".
+    """
+    data_settings = settings.get('data_processing', {}) if settings else {}
+    custom_range = (data_settings.get('custom_range') or '').strip()
+    if not data_settings.get('use_custom_range') or not custom_range:
+        return targets
+    try:
+        min_col, min_row, max_col, max_row = range_boundaries(custom_range)
+    except (TypeError, ValueError):
+        return targets
+    if None in (min_col, min_row, max_col, max_row):
+        return targets
+
+    if targets is None:
+        return {row: range(min_col, max_col + 1) for row in range(min_row, max_row + 1)}
+    restricted: Dict[int, Iterable[int]] = {}
+    for row, cols in targets.items():
+        if min_row <= row <= max_row:
+            kept = {col for col in cols if min_col <= col <= max_col}
+            if kept:
+                restricted[row] = kept
+    return restricted
+
+
 def _is_total_cell(cell) -> bool:
     """Detect if a cell is likely a total row/column based on common patterns."""
-    if cell.value is None:
-        return False
-    
-    # Check for common total indicators in cell value
-    value_str = str(cell.value).lower().strip()
-    total_indicators = ['total', 'sum', 'subtotal', 'grand total', 'totaal', 'gesamt']
-    
-    # Check if cell value contains total indicators
-    if any(indicator in value_str for indicator in total_indicators):
-        return True
-    
-    # Check if cell is in a row/column that might be totals based on position
-    # This is a heuristic - could be enhanced based on specific needs
-    return False
+    # Shared with the source scan (imported here: src.engine.partials imports this module)
+    from src.engine.partials import is_total_value
+    return is_total_value(cell.value)
 
 
 def normalize_value(value, settings: Dict) -> Optional[Decimal]:
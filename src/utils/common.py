@@ -110,6 +110,27 @@ def ensure_directory(directory_path: str) -> bool:
         return False
 
 
+def get_user_cache_dir(app_name: str = "Excel Consolidator") -> str:
+    """
+    Get the per-user cache directory of the application (not created).
+    
+    Args:
+        app_name: Application folder name
+        
+    Returns:
+        %LOCALAPPDATA%\\<app>\\Cache on Windows, ~/Library/Caches/<app> on
+        macOS, $XDG_CACHE_HOME/<app> (default ~/.cache/<app>) elsewhere
+    """
+    system = platform.system()
+    if system == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        return os.path.join(base, app_name, "Cache")
+    if system == "Darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches", app_name)
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, app_name)
+
+
 def format_timestamp(timestamp: Optional[float] = None) -> str:
     """
     Format timestamp to standard string format.
@@ -0,0 +1,33 @@
+"""
+Shared test setup: the project root on the import path and a builder for
+small source workbooks.
+"""
+
+import os
+import sys
+
+import openpyxl
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_workbook(tmp_path):
+    """
+    make_workbook(name, cells, number_formats=None) -> path of a one-sheet
+    workbook in tmp_path with ``cells`` ({'B2': value}) and optional
+    ``number_formats`` ({'B2': '0.00%'}).
+    """
+    def make(name, cells, number_formats=None):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for coord, value in cells.items():
+            ws[coord] = value
+        for coord, number_format in (number_formats or {}).items():
+            ws[coord].number_format = number_format
+        path = str(tmp_path / name)
+        wb.save(path)
+        return path
+    return make
@@ -0,0 +1,98 @@
+"""
+Tests for the contribution matrix (src/engine/accumulator.py)
+"""
+
+from decimal import Decimal
+
+from src.engine.accumulator import FIXED_POINT_LIMIT, ContributionMatrix
+from src.engine.coords import pack
+
+B2, C3, D4 = pack(2, 2), pack(3, 3), pack(4, 4)
+
+
+def test_totals_counts_and_file_values():
+    matrix = ContributionMatrix(['b', 'A', 'c'])
+    matrix.add_partial('b', {B2: Decimal('1.5'), C3: Decimal('0')})
+    matrix.add_partial('A', {B2: Decimal('2.25')})
+    matrix.add_partial('c', {C3: Decimal('4')})
+
+    assert dict(matrix.totals()) == {B2: Decimal('3.75'), C3: Decimal('4')}
+    assert matrix.nonzero_count(C3) == 1
+    assert matrix.percent_count(C3) == 3
+    # Contributors in case-insensitive label order
+    assert matrix.file_values(B2) == [('A', 2.25), ('b', 1.5)]
+    assert matrix.file_values(C3) == [('b', 0.0), ('c', 4.0)]
+    assert matrix.file_values(D4) == []
+
+
+def test_partial_under_unannounced_label():
+    matrix = ContributionMatrix(['b'])
+    matrix.add_partial('b', {B2: Decimal('1')})
+    matrix.add_partial('a', {B2: Decimal('2'), C3: Decimal('3')})
+
+    assert matrix.labels == ['b', 'a']
+    assert matrix.total(B2) == Decimal('3')
+    assert matrix.file_values(B2) == [('a', 2.0), ('b', 1.0)]
+    assert matrix.file_values(C3) == [('a', 3.0)]
+    assert matrix.column_values(C3, matrix.label_rows(['a', 'b'])) == [3.0, 0.0]
+
+
+def test_remove_partial_restores_totals():
+    matrix = ContributionMatrix(['a', 'b'])
+    matrix.add_partial('a', {B2: Decimal('1.1'), C3: Decimal('2')})
+    matrix.add_partial('b', {B2: Decimal('2.2'), D4: Decimal('5')})
+    matrix.remove_partial('b', {B2: Decimal('2.2'), D4: Decimal('5')})
+
+    assert matrix.total(B2) == Decimal('1.1')
+    assert matrix.total(D4) == 0
+    assert matrix.file_values(B2) == [('a', 1.1)]
+    assert matrix.file_values(D4) == []
+    assert matrix.nonzero_count(D4) == 0
+    matrix.drop_empty_columns()
+    assert list(matrix.totals()) == [(B2, Decimal('1.1')), (C3, Decimal('2'))]
+    assert D4 not in matrix
+
+
+def test_state_round_trip():
+    matrix = ContributionMatrix(['a', 'b'])
+    matrix.add_partial('a', {B2: Decimal('1.5')})
+    matrix.add_partial('b', {B2: Decimal('-2'), C3: Decimal('0')})
+    meta, arrays = matrix.to_state()
+
+    restored = ContributionMatrix.from_state(meta, arrays)
+    assert list(restored.totals()) == list(matrix.totals())
+    assert restored.file_values(C3) == [('b', 0.0)]
+    assert restored.nonzero_count(C3) == 0
+
+
+def test_fixed_point_totals_match_decimal_totals():
+    partials = [
+        {B2: Decimal('1.25'), C3: Decimal('83.333333333333333'), D4: Decimal('0.1')},
+        {B2: Decimal('-0.75'), C3: Decimal('16.666666666666667'), D4: Decimal('0.2')},
+        {B2: Decimal('3'), D4: Decimal(FIXED_POINT_LIMIT) / 10 ** 3},
+        {B2: Decimal('NaN'), C3: Decimal('0')},
+    ]
+    decimal = ContributionMatrix(['a', 'b', 'c', 'd'])
+    fixed = ContributionMatrix(['a', 'b', 'c', 'd'], fixed_point_digits=6)
+    for label, values in zip('abcd', partials):
+        decimal.add_partial(label, values)
+        fixed.add_partial(label, values)
+    assert [str(t) for _, t in fixed.totals()] == [str(t) for _, t in decimal.totals()]
+
+    fixed.remove_partial('d', partials[3])
+    decimal.remove_partial('d', partials[3])
+    fixed.remove_partial('c', partials[2])
+    decimal.remove_partial('c', partials[2])
+    assert [str(t) for _, t in fixed.totals()] == [str(t) for _, t in decimal.totals()]
+    assert fixed.total(D4) == Decimal('0.3')
+
+
+def test_rounded_decimal_total_clears_exact():
+    matrix = ContributionMatrix(['a', 'b'], fixed_point_digits=2)
+    matrix.add_partial('a', {B2: Decimal('1.25'), C3: Decimal('1E+30')})
+    assert matrix.exact
+    matrix.add_partial('b', {B2: Decimal('0.5'), C3: Decimal('0.001')})
+
+    assert not matrix.exact
+    assert matrix.total(B2) == Decimal('1.75')
+    assert matrix.total(C3) == Decimal('1E+30')
@@ -0,0 +1,59 @@
+"""
+Tests for the audit comment policy (src/engine/comment_policy.py)
+"""
+
+from decimal import Decimal
+
+from src.engine.accumulator import ContributionMatrix
+from src.engine.comment_policy import COMMENTS_FULL, COMMENTS_NONE, COMMENTS_TOP, CommentPolicy
+from src.engine.coords import pack
+
+B2 = pack(2, 2)
+
+
+def _matrix():
+    values = {'e': '1', 'b': '-9', 'A': '4', 'd': '0', 'c': '4'}
+    matrix = ContributionMatrix(values)
+    for label, value in values.items():
+        matrix.add_partial(label, {B2: Decimal(value)})
+    return matrix
+
+
+def test_full_lists_every_file_in_label_order():
+    items, omitted = CommentPolicy(COMMENTS_FULL).contributors(_matrix(), B2)
+    assert items == [('A', 4.0), ('b', -9.0), ('c', 4.0), ('d', 0.0), ('e', 1.0)]
+    assert omitted == 0
+
+
+def test_top_lists_largest_contributions_first():
+    matrix = _matrix()
+    policy = CommentPolicy(COMMENTS_TOP, top_n=3)
+
+    items, omitted = policy.contributors(matrix, B2)
+
+    assert items == [('b', -9.0), ('A', 4.0), ('c', 4.0)]
+    assert omitted == 2
+    assert policy.omitted_line(omitted) == "... and 2 more files (see the Contributions sheet)"
+    assert policy.omitted_line(1) == "... and 1 more file (see the Contributions sheet)"
+    assert CommentPolicy(COMMENTS_TOP, top_n=10).contributors(matrix, B2)[1] == 0
+    assert matrix.top_file_values(pack(9, 9), 3) == ([], 0)
+
+
+def test_none_and_unknown_strategies():
+    assert not CommentPolicy(COMMENTS_NONE).enabled
+    assert CommentPolicy(COMMENTS_NONE).contributors(_matrix(), B2) == ([], 0)
+    assert CommentPolicy('bogus').strategy == COMMENTS_FULL
+
+
+def test_byte_budget():
+    policy = CommentPolicy(max_bytes=10)
+    assert policy.admit('12345')
+    assert not policy.admit('€€')  # 6 bytes in UTF-8
+    assert policy.admit('abcde')
+    assert not policy.admit('x')
+    assert (policy.written, policy.written_bytes, policy.skipped) == (2, 10, 2)
+    assert policy.summary().endswith("2 left out over the 0 KB budget")
+
+    unlimited = CommentPolicy()
+    assert all(unlimited.admit('x' * 1000) for _ in range(100))
+    assert unlimited.skipped == 0
@@ -0,0 +1,119 @@
+"""
+Tests for the Contributions index sheets (src/engine/contributions_sheet.py)
+"""
+
+from decimal import Decimal
+
+import openpyxl
+
+from src.engine.accumulator import ContributionMatrix
+from src.engine.contributions_sheet import (EXCEL_MAX_COLUMNS, ContributionShards, wide_layout_fits,
+                                           write_contribution_rows, write_wide_contribution_rows)
+from src.engine.coords import pack
+from src.engine.sheet_stream import save_workbook
+
+LABELS = ['a', 'b', 'c']
+
+
+def _matrix(cells):
+    """Matrix where every file contributes to ``cells`` coordinate keys."""
+    matrix = ContributionMatrix(LABELS)
+    for i, label in enumerate(LABELS):
+        matrix.add_partial(label, {key: Decimal(n * 10 + i) for n, key in enumerate(cells)})
+    return matrix
+
+
+def _add_header(worksheet):
+    worksheet.append(['Cell', 'File Name', 'Contribution'])
+    return 2
+
+
+def _shards(workbook, max_rows, finished):
+    return ContributionShards(workbook, _add_header, lambda ws, last_row: finished.append((ws, last_row)),
+                              max_rows=max_rows)
+
+
+def _titles(finished):
+    return [(ws.title, last_row) for ws, last_row in finished]
+
+
+def _save_and_load(tmp_path, workbook, shards):
+    path = str(tmp_path / 'out.xlsx')
+    save_workbook(workbook, path, shards.streams)
+    return openpyxl.load_workbook(path)
+
+
+def test_rows_split_at_row_budget(tmp_path):
+    cells = [pack(row, 2) for row in range(1, 6)]  # B1..B5
+    workbook = openpyxl.Workbook()
+    finished = []
+    # Header + two groups of 3 rows with a spacer between them
+    shards = _shards(workbook, 8, finished)
+
+    links = write_contribution_rows(shards, _matrix(cells), LABELS, {})
+
+    titles = ['Contributions (1)', 'Contributions (2)', 'Contributions (3)']
+    assert [stream.worksheet.title for stream in shards.streams] == titles
+    assert _titles(finished) == [(titles[0], 8), (titles[1], 8), (titles[2], 5)]
+    assert links[cells[0]] == "#'Contributions (1)'!A2"
+    assert links[cells[1]] == "#'Contributions (1)'!A6"
+    assert links[cells[2]] == "#'Contributions (2)'!A2"
+    assert links[cells[4]] == "#'Contributions (3)'!A2"
+
+    out = _save_and_load(tmp_path, workbook, shards)
+    rows = []
+    for title in titles:
+        sheet = out[title]
+        assert sheet.max_row <= 8
+        assert [c.value for c in sheet[1]] == ['Cell', 'File Name', 'Contribution']
+        rows.extend(tuple(c.value for c in r) for r in sheet.iter_rows(min_row=2) if r[0].value is not None)
+    assert rows == [(f'B{n + 1}', label, n * 10 + i) for n in range(5) for i, label in enumerate(LABELS)]
+
+
+def test_single_sheet_keeps_plain_title():
+    workbook = openpyxl.Workbook()
+    finished = []
+    shards = _shards(workbook, 1000, finished)
+
+    links = write_contribution_rows(shards, _matrix([pack(2, 2), pack(1, 3)]), LABELS, {})
+
+    assert [stream.worksheet.title for stream in shards.streams] == ['Contributions']
+    assert _titles(finished) == [('Contributions', 9)]
+    assert links == {pack(2, 2): "#'Contributions'!A2", pack(1, 3): "#'Contributions'!A6"}
+
+
+def test_group_larger_than_budget_spans_sheets():
+    workbook = openpyxl.Workbook()
+    finished = []
+    shards = _shards(workbook, 3, finished)
+
+    write_contribution_rows(shards, _matrix([pack(1, 1)]), LABELS, {})
+
+    assert _titles(finished) == [('Contributions (1)', 3), ('Contributions (2)', 3)]
+
+
+def test_wide_layout_one_row_per_cell(tmp_path):
+    cells = [pack(3, 1), pack(1, 2), pack(2, 1)]
+    matrix = _matrix(cells)
+    matrix.add_partial('d', {pack(1, 2): Decimal('50')})
+    labels = LABELS + ['d']
+    workbook = openpyxl.Workbook()
+    finished = []
+    shards = _shards(workbook, 3, finished)
+    percent = {'is_percentage': True, 'number_format': '0.0%'}
+
+    links = write_wide_contribution_rows(shards, matrix, labels, {pack(1, 2): percent})
+
+    assert _titles(finished) == [('Contributions (1)', 3), ('Contributions (2)', 2)]
+    assert links == {pack(2, 1): "#'Contributions (1)'!A2", pack(3, 1): "#'Contributions (1)'!A3",
+                     pack(1, 2): "#'Contributions (2)'!A2"}
+    out = _save_and_load(tmp_path, workbook, shards)
+    assert [c.value for c in out['Contributions (1)'][2]] == ['A2', 20, 21, 22, 0]
+    assert [c.value for c in out['Contributions (1)'][3]] == ['A3', 0, 1, 2, 0]
+    assert [c.value for c in out['Contributions (2)'][2]] == ['B1', 0.1, 0.11, 0.12, 0.5]
+    assert out['Contributions (2)']['E2'].number_format == '0.0%'
+
+
+def test_wide_layout_fits():
+    assert wide_layout_fits(['x'] * (EXCEL_MAX_COLUMNS - 1))
+    assert not wide_layout_fits(['x'] * EXCEL_MAX_COLUMNS)
@@ -0,0 +1,56 @@
+"""
+Tests for packed cell coordinates (src/engine/coords.py)
+"""
+
+import pytest
+
+from src.engine.coords import CoordSet, build_row_targets, column_major, pack, pack_a1, to_a1, unpack
+
+
+@pytest.mark.parametrize('row, col', [(1, 1), (12, 3), (1048576, 16384), (7, 16384), (1048576, 1)])
+def test_pack_round_trip(row, col):
+    key = pack(row, col)
+    assert unpack(key) == (row, col)
+    assert pack_a1(to_a1(key)) == key
+
+
+def test_a1_references():
+    assert to_a1(pack(12, 3)) == 'C12'
+    assert to_a1(pack(1, 27)) == 'AA1'
+    assert pack_a1('XFD1048576') == pack(1048576, 16384)
+
+
+def test_key_order():
+    keys = [pack(2, 1), pack(1, 2), pack(1, 1), pack(2, 2)]
+    # Numeric order is row-major, column_major() gives Excel's A1, A2, B1, B2
+    assert sorted(keys) == [pack(1, 1), pack(1, 2), pack(2, 1), pack(2, 2)]
+    assert sorted(keys, key=column_major) == [pack(1, 1), pack(2, 1), pack(1, 2), pack(2, 2)]
+
+
+def test_build_row_targets():
+    targets = build_row_targets([pack(3, 2), pack(3, 4), pack(5, 1)])
+    assert {row: set(cols) for row, cols in targets.items()} == {3: {2, 4}, 5: {1}}
+
+
+def test_coord_set_round_trip():
+    keys = [pack(row, col) for row in range(1, 40) for col in range(2, 30)]
+    keys += [pack(50, 1), pack(50, 5), pack(50, 16384), pack(1048576, 7)]
+    coords = CoordSet(reversed(keys))
+
+    assert list(coords) == sorted(keys)
+    assert len(coords) == len(keys)
+    assert all(key in coords for key in keys)
+    assert pack(1, 1) not in coords
+    assert pack(50, 2) not in coords
+    assert coords.contains(50, 16384)
+    assert coords.bounding_box() == (1, 1, 1048576, 16384)
+    assert build_row_targets(coords) == coords.row_targets()
+    assert set(coords.row_targets()[10]) == set(range(2, 30))
+
+
+def test_coord_set_clip():
+    coords = CoordSet([pack(row, col) for row in range(1, 10) for col in range(1, 10)] + [pack(3, 40)])
+    clipped = coords.clip(4, 3)
+    assert list(clipped) == [pack(row, col) for row in range(1, 5) for col in range(1, 4)]
+    assert len(clipped) == 12
+    assert len(CoordSet()) == 0 and CoordSet().bounding_box() is None
@@ -0,0 +1,77 @@
+"""
+Tests for the on-disk partial result cache (src/engine/partial_cache.py)
+"""
+
+import os
+import time
+from decimal import Decimal
+
+from src.engine.coords import build_row_targets, pack
+from src.engine.partial_cache import PartialCache
+from src.engine.partials import SourcePlan, scan_source_file
+from src.engine.values import NUMBER, ValueParser
+
+
+def _plan(include_totals=True):
+    coords = [pack(row, col) for row in range(1, 4) for col in range(1, 4)]
+    return SourcePlan(targets=build_row_targets(coords), coord_kinds={pack(2, 2): (NUMBER, 'sum')},
+                      parser=ValueParser(), include_totals=include_totals)
+
+
+def test_store_and_load(tmp_path, make_workbook):
+    source = make_workbook('school.xlsx', {'A1': 'Total', 'B2': '1,234.50', 'C3': 0.1})
+    plan = _plan()
+    partial = scan_source_file(source, plan)
+    cache = PartialCache(str(tmp_path / 'cache'), plan)
+
+    assert cache.load(source) is None
+    cache.store(partial)
+    loaded = PartialCache(str(tmp_path / 'cache'), plan).load(source)
+
+    assert loaded is not None
+    assert loaded.path == source and loaded.label == 'school'
+    assert loaded.values == partial.values
+    assert loaded.values[pack(2, 2)] == Decimal('1234.50')
+    assert list(loaded.values) == list(partial.values)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_entries_are_invalidated_by_content_and_plan(tmp_path, make_workbook):
+    folder = str(tmp_path / 'cache')
+    source = make_workbook('school.xlsx', {'A1': 'Total', 'B2': 5})
+    plan = _plan()
+    PartialCache(folder, plan).store(scan_source_file(source, plan))
+
+    other_plan = _plan(include_totals=False)
+    assert other_plan.fingerprint() != plan.fingerprint()
+    assert PartialCache(folder, other_plan).load(source) is None
+    assert PartialCache(folder, _plan()).load(source) is not None
+
+    make_workbook('school.xlsx', {'A1': 'Total', 'B2': 6})
+    assert PartialCache(folder, plan).load(source) is None
+
+
+def test_prune_only_removes_old_entries(tmp_path, make_workbook):
+    folder = tmp_path / 'cache'
+    plan = _plan()
+    cache = PartialCache(str(folder), plan)
+    old = make_workbook('old.xlsx', {'B2': 1})
+    new = make_workbook('new.xlsx', {'B2': 2})
+    cache.store(scan_source_file(old, plan))
+    cache.store(scan_source_file(new, plan))
+
+    old_entry = cache._entry_path(cache._entry_key(old))
+    shard = os.path.dirname(old_entry)
+    leftover_tmp = f"{old_entry}.123.tmp"
+    unrelated = [os.path.join(shard, 'notes.json'), str(folder / 'report.xlsx')]
+    for path in [leftover_tmp] + unrelated:
+        with open(path, 'w') as f:
+            f.write('x')
+    stale = time.time() - 40 * 86400
+    for path in [old_entry, leftover_tmp] + unrelated:
+        os.utime(path, (stale, stale))
+
+    assert cache.prune(max_age_days=30) == 2
+    assert not os.path.exists(old_entry) and not os.path.exists(leftover_tmp)
+    assert all(os.path.exists(path) for path in unrelated)
+    assert cache.load(new) is not None
@@ -0,0 +1,29 @@
+"""
+Tests for per-file scanning and merging order (src/engine/partials.py)
+"""
+
+from src.engine.partials import SourcePlan, iter_source_partials
+from src.engine.values import ValueParser
+
+
+def _summary(partial):
+    error = None if partial.error is None else type(partial.error).__name__
+    return partial.label, list(partial.values.items()), error
+
+
+def test_pool_yields_partials_in_file_order(tmp_path, make_workbook):
+    paths = [make_workbook(f'school_{i:02d}.xlsx', {'B2': i, 'C3': f'{i * 1.5}', 'D4': 'Total'})
+             for i in range(7)]
+    broken = str(tmp_path / 'broken.xlsx')
+    with open(broken, 'wb') as f:
+        f.write(b'not a workbook')
+    paths.insert(3, broken)
+    plan = SourcePlan(targets=None, coord_kinds={}, parser=ValueParser(), include_totals=False)
+
+    serial = [_summary(partial) for partial in iter_source_partials(paths, plan, max_workers=1)]
+    pooled = [_summary(partial) for partial in iter_source_partials(paths, plan, max_workers=2)]
+
+    assert pooled == serial
+    assert [label for label, _values, _error in serial][:4] == ['school_00', 'school_01', 'school_02', 'broken']
+    assert serial[3][2] is not None
+    assert [len(values) for _label, values, _error in serial] == [2, 2, 2, 0, 2, 2, 2, 2]
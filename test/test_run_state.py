@@ -0,0 +1,85 @@
+"""
+Tests for incremental re-consolidation (src/engine/run_state.py)
+"""
+
+import os
+from decimal import Decimal
+
+import pytest
+
+from src.engine.coords import build_row_targets, pack
+from src.engine.partials import SourcePlan, iter_source_partials
+from src.engine.run_state import IncrementalRun
+from src.engine.values import NUMBER, ValueParser
+
+
+def _plan():
+    coords = [pack(row, col) for row in range(2, 5) for col in range(2, 5)]
+    return SourcePlan(targets=build_row_targets(coords), coord_kinds={pack(2, 2): (NUMBER, 'sum')},
+                      parser=ValueParser())
+
+
+def _run(state_path, paths, fixed_point_digits=None):
+    """Consolidate ``paths`` the way the consolidators do; returns (run, matrix)."""
+    plan = _plan()
+    run = IncrementalRun(state_path, plan, paths, fixed_point_digits=fixed_point_digits)
+    for partial in iter_source_partials(paths, plan, reuse=run.reused):
+        run.merge(partial)
+    matrix = run.finish()
+    run.save()
+    return run, matrix
+
+
+def _result(matrix):
+    return {key: (total, matrix.file_values(key)) for key, total in matrix.totals()}
+
+
+@pytest.mark.parametrize('fixed_point_digits', [None, 6])
+def test_incremental_run_matches_fresh_run(tmp_path, make_workbook, fixed_point_digits):
+    state_path = str(tmp_path / 'state' / 'run_state.npz')
+    a = make_workbook('a.xlsx', {'B2': '1,250.5', 'C2': 2, 'D4': 0.25})
+    b = make_workbook('b.xlsx', {'B2': 3, 'B3': 7.125})
+    c = make_workbook('c.xlsx', {'C2': 4, 'C3': 1})
+
+    first, _ = _run(state_path, [a, b, c], fixed_point_digits)
+    assert not first.incremental
+    assert os.path.exists(state_path)
+
+    # b removed, c changed, d added
+    os.remove(b)
+    c = make_workbook('c.xlsx', {'C2': 5.5, 'D4': -0.25})
+    d = make_workbook('d.xlsx', {'B3': 9, 'C3': 0})
+    paths = [a, c, d]
+    second, matrix = _run(state_path, paths, fixed_point_digits)
+
+    assert second.incremental
+    assert second.removed_count == 1
+    assert list(second.reused) == [a]
+    _, fresh = _run(None, paths, fixed_point_digits)
+    assert _result(matrix) == _result(fresh)
+    assert pack(3, 3) in matrix and matrix.total(pack(3, 3)) == 0
+    assert matrix.file_values(pack(3, 3)) == [('d', 0.0)]
+    assert matrix.labels == ['a', 'c', 'd']
+
+
+def test_state_of_another_plan_is_ignored(tmp_path, make_workbook):
+    state_path = str(tmp_path / 'run_state.npz')
+    a = make_workbook('a.xlsx', {'B2': 1})
+    _run(state_path, [a])
+
+    plan = SourcePlan(targets=None, coord_kinds={}, parser=ValueParser())
+    run = IncrementalRun(state_path, plan, [a])
+    assert not run.incremental and not run.reused
+
+
+def test_rounded_state_falls_back_to_a_full_run(tmp_path, make_workbook):
+    state_path = str(tmp_path / 'run_state.npz')
+    a = make_workbook('a.xlsx', {'B2': 1e30})
+    b = make_workbook('b.xlsx', {'B2': 0.001})
+    first, _ = _run(state_path, [a, b])
+    assert not first.contributions.exact
+
+    os.remove(b)
+    second, matrix = _run(state_path, [a])
+    assert not second.incremental
+    assert matrix.total(pack(2, 2)) == Decimal('1E+30')
@@ -0,0 +1,44 @@
+"""
+Tests for streamed worksheets (src/engine/sheet_stream.py)
+"""
+
+import openpyxl
+import pytest
+
+from src.engine.sheet_stream import FLUSH_ROWS, SheetStream, save_workbook
+
+
+def test_streamed_rows_round_trip(tmp_path):
+    wb = openpyxl.Workbook()
+    wb.active['A1'] = 'Template'
+    ws = wb.create_sheet('Contributions')
+    ws.append(['Cell', 'File Name', 'Contribution'])
+    ws.column_dimensions['B'].width = 30
+    stream = SheetStream(ws)
+    percent = stream.style_id('0.00%')
+    assert stream.style_id('0.00%') == percent and stream.style_id() == 0
+
+    expected = {}
+    row = 2
+    for i in range(FLUSH_ROWS + 5):
+        name = f' school <{i}> & co ' if i % 7 == 0 else f'school_{i}'
+        stream.append_row(row, ((1, 'B2', 0), (2, name, 0), (3, i / 8, percent), (4, None, 0)))
+        expected[row] = ('B2', name, i / 8)
+        row += 2  # spacer rows stay empty
+    with pytest.raises(ValueError):
+        stream.append_row(row - 2, ((1, 'late', 0),))
+    path = str(tmp_path / 'out.xlsx')
+    save_workbook(wb, path, [stream])
+    stream.close()
+
+    out = openpyxl.load_workbook(path)
+    assert out.sheetnames == ['Sheet', 'Contributions']
+    assert out['Sheet']['A1'].value == 'Template'
+    sheet = out['Contributions']
+    assert [c.value for c in sheet[1]] == ['Cell', 'File Name', 'Contribution']
+    assert sheet.column_dimensions['B'].width == 30
+    assert sheet.max_row == row - 2 and sheet.max_column == 3
+    rows = {r[0].row: tuple(c.value for c in r) for r in sheet.iter_rows(min_row=2) if r[0].value is not None}
+    assert rows == expected
+    assert sheet['C2'].number_format == '0.00%'
+    assert sheet['B2'].value == ' school <0> & co '
@@ -0,0 +1,151 @@
+"""
+Round-trip tests for the template package output engine
+(src/engine/template_package.py) on the sample template, against the
+openpyxl output engine.
+"""
+
+import glob
+import os
+import re
+import shutil
+import zipfile
+
+import openpyxl
+import pytest
+
+from src.engine.template_package import OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_XML
+from web_version.services.consolidator import ExcelConsolidator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE = os.path.join(ROOT, 'Q3-2025-Data-Requirements-SchoolID_SchoolName.xlsx')
+SOURCES = sorted(glob.glob(os.path.join(ROOT, 'DATA Requirements', '*.xlsx')))[:3]
+ORANGE = '00FF8C00'
+
+pytestmark = pytest.mark.skipif(not os.path.exists(TEMPLATE) or len(SOURCES) < 3,
+                                reason="sample template and source files not present")
+
+
+def _consolidate(folder, engine):
+    sources = os.path.join(folder, 'sources')
+    os.makedirs(sources)
+    for path in SOURCES:
+        shutil.copy(path, sources)
+    template = os.path.join(folder, 'template.xlsx')
+    shutil.copy(TEMPLATE, template)
+    return ExcelConsolidator(template, sources, settings={'output_engine': engine}).consolidate()
+
+
+@pytest.fixture(scope='module')
+def outputs(tmp_path_factory):
+    base = tmp_path_factory.mktemp('engines')
+    return {engine: _consolidate(str(base / engine), engine)
+            for engine in (OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_XML)}
+
+
+@pytest.fixture(scope='module')
+def workbooks(outputs):
+    """The outputs and the template, each loaded once (the sample template is large)."""
+    loaded = {engine: openpyxl.load_workbook(path) for engine, path in outputs.items()}
+    loaded['template'] = openpyxl.load_workbook(TEMPLATE)
+    return loaded
+
+
+def _dump(wb):
+    """Per sheet: {coordinate: (value, number format, comment, hyperlink, border color)}."""
+    sheets = {}
+    for ws in wb.worksheets:
+        cells = {}
+        for row in ws.iter_rows():
+            for c in row:
+                if c.value is None and c.comment is None and c.hyperlink is None:
+                    continue
+                link = None
+                if c.hyperlink is not None:
+                    # openpyxl writes internal links as '#Sheet!A1' targets, the package as locations
+                    link = (c.hyperlink.location or c.hyperlink.target).lstrip('#')
+                cells[c.coordinate] = (c.value, c.number_format, c.comment.text if c.comment else None, link,
+                                       c.border.left.color.rgb if c.border.left.color is not None else None)
+        sheets[ws.title] = (cells, sorted(str(m) for m in ws.merged_cells.ranges), ws.auto_filter.ref)
+    return wb.sheetnames, sheets
+
+
+def test_matches_openpyxl_engine(workbooks):
+    assert _dump(workbooks[OUTPUT_ENGINE_XML]) == _dump(workbooks[OUTPUT_ENGINE_OPENPYXL])
+
+
+def test_patched_values_formats_and_border(workbooks):
+    template = workbooks['template'].active
+    ws = workbooks[OUTPUT_ENGINE_XML].worksheets[0]
+    patched = [c for row in ws.iter_rows() for c in row if c.comment is not None]
+
+    assert patched
+    for cell in patched:
+        assert isinstance(cell.value, (int, float))
+        assert cell.border.left.color.rgb == ORANGE and cell.border.bottom.style == 'thin'
+        expected_format = template[cell.coordinate].number_format
+        if expected_format != 'General':
+            assert cell.number_format == expected_format
+        assert cell.hyperlink is not None
+    # Untouched template cells keep their values and formats
+    for row in template.iter_rows(max_row=6):
+        for c in row:
+            if isinstance(c.value, str):
+                assert ws[c.coordinate].value == c.value
+                assert ws[c.coordinate].number_format == c.number_format
+
+
+def test_comments_have_vml(outputs):
+    with zipfile.ZipFile(outputs[OUTPUT_ENGINE_XML]) as package:
+        names = package.namelist()
+        rels = package.read('xl/worksheets/_rels/sheet1.xml.rels').decode('utf-8')
+        sheet_xml = package.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        comments = [name for name in names if re.fullmatch(r'xl/comments/?\w*\d+\.xml', name)]
+        vml = [name for name in names if name.endswith('.vml')]
+        content_types = package.read('[Content_Types].xml').decode('utf-8')
+        assert len(comments) == 1 and len(vml) == 1
+        comment_count = package.read(comments[0]).decode('utf-8').count('<comment ')
+        shape_count = package.read(vml[0]).decode('utf-8').count('ObjectType="Note"')
+
+    assert '/comments' in rels and '/vmlDrawing' in rels
+    assert re.search(r'<legacyDrawing r:id="[^"]+"\s*/>', sheet_xml)
+    assert 'Extension="vml"' in content_types or vml[0] in content_types
+    assert comment_count == shape_count > 0
+
+
+def test_shared_formulas_and_calc_chain(outputs, workbooks):
+    template = workbooks['template'].active
+    ws = workbooks[OUTPUT_ENGINE_XML].worksheets[0]
+    formulas = {c.coordinate: c.value for row in template.iter_rows() for c in row if c.data_type == 'f'}
+    assert formulas
+    patched = {c.coordinate for row in ws.iter_rows() for c in row if c.comment is not None}
+    for coordinate, formula in formulas.items():
+        if coordinate not in patched:
+            assert ws[coordinate].value == formula
+
+    with zipfile.ZipFile(outputs[OUTPUT_ENGINE_XML]) as package:
+        names = package.namelist()
+        sheet_xml = package.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        workbook_xml = package.read('xl/workbook.xml').decode('utf-8')
+        workbook_rels = package.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+        content_types = package.read('[Content_Types].xml').decode('utf-8')
+        chain = package.read('xl/calcChain.xml').decode('utf-8') if 'xl/calcChain.xml' in names else None
+    if chain is None:
+        # Overwritten formulas drop the chain; Excel rebuilds it on load
+        assert 'calcChain' not in workbook_rels and 'calcChain' not in content_types
+        assert re.search(r'<calcPr\b[^>]*fullCalcOnLoad="1"', workbook_xml)
+    else:
+        with_formula = {re.search(r'\br="([^"]+)"', attrs).group(1)
+                        for attrs, inner in re.findall(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', sheet_xml, re.S)
+                        if '<f' in inner}
+        assert set(re.findall(r'<c r="([A-Z]+\d+)"', chain)) <= with_formula
+
+
+def test_plain_sheet_copy(workbooks):
+    wb = workbooks[OUTPUT_ENGINE_XML]
+    main, plain = wb.worksheets[0], wb['Consolidated (Plain)']
+    assert plain.max_row == main.max_row and plain.max_column == main.max_column
+    assert sorted(map(str, plain.merged_cells.ranges)) == sorted(map(str, main.merged_cells.ranges))
+    for main_row, plain_row in zip(main.iter_rows(), plain.iter_rows()):
+        for m, p in zip(main_row, plain_row):
+            assert (p.value, p.number_format) == (m.value, m.number_format)
+            assert p.comment is None and p.hyperlink is None
@@ -0,0 +1,75 @@
+"""
+Tests for template-format aware value parsing (src/engine/values.py)
+"""
+
+import pytest
+
+from src.engine.values import (ALL_CURRENCY_SYMBOLS, CURRENCY, DEFAULT, NUMBER, PERCENTAGE, ValueParser,
+                               compile_handlers)
+
+TEXTS = ['0', '1,234', ' 56.5 ', '50%', '0.25', '$1,200.50', '€ 3', '₱12', '-', '', 'n/a', '1 000', '12.5%']
+KINDS = [PERCENTAGE, CURRENCY, NUMBER, DEFAULT]
+
+
+def _outcome(parser, kind, value):
+    try:
+        return 'ok', parser.parse(kind, value)
+    except Exception:
+        return 'error', None
+
+
+@pytest.mark.parametrize('options', [{}, {'currency_symbols': ALL_CURRENCY_SYMBOLS, 'currency_strip_spaces': True,
+                                          'default_percentages': True}])
+def test_cached_parse_matches_uncached(options):
+    cached = ValueParser(**options)
+    uncached = ValueParser(cache_size=0, **options)
+    values = TEXTS + [3, 0.5, 1.5, True, None]
+
+    for _ in range(2):  # second pass is served from the cache
+        for kind in KINDS:
+            for value in values:
+                assert _outcome(cached, kind, value) == _outcome(uncached, kind, value), (kind, value)
+
+    hits, misses = cached.cache_stats()
+    assert misses == len(KINDS) * len(TEXTS)
+    assert hits == misses
+    assert uncached.cache_stats() == (0, 0)
+
+
+def test_cached_failure_raises_again():
+    parser = ValueParser()
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            parser.parse(NUMBER, 'n/a')
+    assert parser.cache_stats() == (2, 1)
+    assert parser.parse(DEFAULT, 'n/a') is None
+
+
+def test_cache_is_bounded():
+    parser = ValueParser(cache_size=2)
+    for text in ('1', '2', '3', '1'):
+        parser.parse(NUMBER, text)
+    assert parser.cache_stats() == (0, 4)
+    assert parser.parse(NUMBER, '3') == 3
+    assert parser.cache_stats() == (1, 4)
+
+
+def test_compiled_handlers_parse_like_the_parser():
+    coord_kinds = {1: (PERCENTAGE, 'average'), 2: (CURRENCY, 'sum'), 3: (NUMBER, 'sum'), 4: (NUMBER, 'sum')}
+    handlers, default = compile_handlers(coord_kinds, ValueParser())
+    reference = ValueParser(cache_size=0)
+
+    assert handlers[3] is handlers[4]
+    assert (default.kind, default.method) == (DEFAULT, 'sum')
+    assert (handlers[1].kind, handlers[1].method) == (PERCENTAGE, 'average')
+    for handler in list(handlers.values()) + [default]:
+        for value in TEXTS + [3, 0.5]:
+            try:
+                expected = 'ok', reference.parse(handler.kind, value)
+            except Exception:
+                expected = 'error', None
+            try:
+                actual = 'ok', handler.parse(value)
+            except Exception:
+                actual = 'error', None
+            assert actual == expected, (handler.kind, value)
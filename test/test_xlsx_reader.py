@@ -0,0 +1,58 @@
+"""
+Regression tests for the streaming source reader (src/engine/xlsx_reader.py)
+"""
+
+import os
+import re
+import zipfile
+
+import openpyxl
+
+from src.engine.coords import build_row_targets, pack
+from src.engine.partials import SourcePlan, scan_source_file
+from src.engine.values import ValueParser
+from src.engine.xlsx_reader import XlsxSourceReader
+
+
+def _write_source(path, drop_dimension=False):
+    """A 12 x 4 sheet with numbers in B2:D12; optionally without its <dimension> record."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in range(2, 13):
+        for col in range(2, 5):
+            ws.cell(row=row, column=col, value=row * col)
+    ws.cell(row=12, column=1).number_format = '0.00'  # styled, empty cell
+    wb.save(path)
+    if drop_dimension:
+        stripped = path + '.tmp'
+        with zipfile.ZipFile(path) as src, zipfile.ZipFile(stripped, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                data = src.read(item.filename)
+                if item.filename == 'xl/worksheets/sheet1.xml':
+                    data = re.sub(rb'<dimension [^>]*/>', b'', data)
+                    assert b'<dimension' not in data
+                dst.writestr(item, data)
+        os.replace(stripped, path)
+    return path
+
+
+def test_dimensions_without_dimension_record(tmp_path):
+    path = _write_source(str(tmp_path / 'source.xlsx'), drop_dimension=True)
+    expected = openpyxl.load_workbook(path).active
+    with XlsxSourceReader(path) as reader:
+        assert (reader.max_row, reader.max_column) == (expected.max_row, expected.max_column) == (12, 4)
+
+
+def test_structure_check_accepts_source_without_dimension_record(tmp_path):
+    template = _write_source(str(tmp_path / 'template.xlsx'))
+    source = _write_source(str(tmp_path / 'source.xlsx'), drop_dimension=True)
+    template_ws = openpyxl.load_workbook(template).active
+    coords = [pack(row, col) for row in range(2, 13) for col in range(2, 5)]
+    plan = SourcePlan(targets=build_row_targets(coords), coord_kinds={}, parser=ValueParser(),
+                      template_dims=(template_ws.max_row, template_ws.max_column))
+
+    partial = scan_source_file(source, plan)
+
+    assert partial.error is None
+    assert partial.structure_mismatch is None
+    assert len(partial.values) == len(coords)
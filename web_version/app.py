@@ -13,11 +13,13 @@ import time
 
 # Import the consolidation service (we'll create this from your existing code)
 from services.consolidator import ExcelConsolidator
+from src.engine.template_cache import TemplateCache
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max upload
 app.config['UPLOAD_FOLDER'] = 'temp_uploads'
 app.config['OUTPUT_FOLDER'] = 'temp_outputs'
+app.config['TEMPLATE_CACHE_FOLDER'] = os.path.join('temp_outputs', 'template_cache')
 
 # Create necessary folders
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -43,6 +45,7 @@ class ConsolidationJob:
         self.current_file = ''
         self.total_files = 0
         self.processed_files = 0
+        self.metrics = None  # RunMetrics of the consolidation
 
 
 def cleanup_old_jobs():
@@ -67,6 +70,9 @@ def cleanup_old_jobs():
                 # Remove from memory
                 del jobs[job_id]
                 print(f"Cleaned up old job: {job_id}")
+        
+        # Template analyses shared by all jobs: drop the ones no job used lately
+        TemplateCache(app.config['TEMPLATE_CACHE_FOLDER'], 'web').prune()
 
 
 # Start cleanup thread
@@ -107,8 +113,21 @@ def consolidate():
         'convert_text_to_numbers': request.form.get('convert_text_to_numbers', 'true') == 'true',
         'convert_percentages': request.form.get('convert_percentages', 'true') == 'true',
         'create_backup': request.form.get('create_backup', 'false') == 'true',
-        'skip_validation': request.form.get('skip_validation', 'true') == 'true'
+        'skip_validation': request.form.get('skip_validation', 'true') == 'true',
+        # Template analyses are shared by all jobs (keyed by template content)
+        'template_cache_dir': app.config['TEMPLATE_CACHE_FOLDER'],
+        # Run metrics are reported by /api/status instead of a sidecar file
+        'metrics_sidecar': False
     }
+    if request.form.get('contributions_max_rows'):
+        settings['contributions_max_rows'] = request.form.get('contributions_max_rows')
+    if request.form.get('contributions_layout'):
+        settings['contributions_layout'] = request.form.get('contributions_layout')
+    for field in ('comment_strategy', 'comment_top_n', 'comment_max_bytes', 'cell_log_sample'):
+        if request.form.get(field):
+            settings[field] = request.form.get(field)
+    if request.form.get('output_engine'):
+        settings['output_engine'] = request.form.get('output_engine')
     
     # Create unique job ID
     job_id = str(uuid.uuid4())
@@ -150,6 +169,7 @@ def consolidate():
                     job_id, current, total, filename
                 )
             )
+            job.metrics = consolidator.metrics
             
             # Run consolidation
             output_path = consolidator.consolidate()
@@ -208,7 +228,8 @@ def get_status(job_id):
         'processed_files': job.processed_files,
         'total_files': job.total_files,
         'error': job.error,
-        'has_output': job.output_file is not None
+        'has_output': job.output_file is not None,
+        'metrics': job.metrics.to_dict() if job.metrics is not None else None
     })
 
 
@@ -4,16 +4,38 @@ Full performance and accuracy functions - NO advanced settings UI
 All core processing logic from desktop ConsolidationWorker
 """
 import os
+import sys
 import glob
+import time
 import openpyxl
-from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.cell.cell import MergedCell
+from openpyxl.utils import get_column_letter
 from openpyxl.comments import Comment
 from openpyxl.styles import Border, Side, Font, PatternFill
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
 import logging
 
+# Shared engine modules live in the desktop package (src/engine)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.engine.cell_styles import ConsolidatedStyles
+from src.engine.comment_policy import COMMENTS_FULL, DEFAULT_TOP_CONTRIBUTORS, CommentPolicy
+from src.engine.contributions_sheet import (
+    CONTRIBUTION_LAYOUTS, EXCEL_MAX_ROWS, LAYOUT_LONG, LAYOUT_WIDE, ContributionShards,
+    wide_layout_fits, write_contribution_rows, write_wide_contribution_rows
+)
+from src.engine.coords import pack, unpack, to_a1, column_major, build_row_targets, clip_to_content
+from src.engine.formats import FORMAT_CLASSIFIER, intern_format
+from src.engine.partials import SourcePlan, scan_source_file
+from src.engine.run_logging import DEFAULT_CELL_LOG_SAMPLE, CellLog, format_counts
+from src.engine.run_metrics import RunMetrics
+from src.engine.run_state import IncrementalRun
+from src.engine.sheet_clone import clone_plain_sheet
+from src.engine.sheet_stream import save_workbook
+from src.engine.template_cache import TemplateAnalysis, TemplateCache
+from src.engine.template_package import OUTPUT_ENGINES, OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_XML, TemplatePackage, UnsupportedTemplate
+from src.engine.values import ValueParser, value_kind, ALL_CURRENCY_SYMBOLS
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,18 +45,29 @@ class ExcelConsolidator:
     Full accuracy and performance from desktop application
     """
     
-    def __init__(self, template_path, source_folder, settings=None, progress_callback=None):
+    def __init__(self, template_path, source_folder, settings=None, progress_callback=None,
+                 source_files=None, output_path=None):
         """
         Initialize consolidator
         
         Args:
             template_path: Path to Excel template file
             source_folder: Folder containing source Excel files
-            settings: Dict of processing settings
+            settings: Dict of processing settings ('run_state_path' enables
+                incremental re-consolidation from the previous run's state,
+                'fixed_point_digits' sums with scaled integers,
+                'template_cache_dir' reuses template analyses across jobs,
+                'contributions_max_rows' is the row budget per Contributions sheet,
+                'contributions_layout' is 'long' or 'wide',
+                'metrics_sidecar' False skips writing the run metrics next to the output)
             progress_callback: Function(current, total, filename) for progress updates
+            source_files: Source files to consolidate instead of the files of source_folder
+            output_path: Output file (default: dated file next to the template)
         """
         self.template_path = template_path
         self.source_folder = source_folder
+        self.source_files = source_files
+        self.output_path = output_path
         self.settings = settings or {}
         self.progress_callback = progress_callback
         
@@ -44,7 +77,30 @@ class ExcelConsolidator:
         self.skip_validation = self.settings.get('skip_validation', True)
         self.exclude_zero_percent = self.settings.get('exclude_zero_percent', False)
         
-        logger.info(f"Consolidator initialized: template={template_path}, sources={source_folder}")
+        # Streamed report sheets, merged into the output when it is saved
+        self.sheet_streams = []
+        
+        # Per-cell detail lines (DEBUG) for one cell out of cell_log_sample
+        try:
+            cell_log_sample = int(self.settings.get('cell_log_sample', DEFAULT_CELL_LOG_SAMPLE))
+        except (TypeError, ValueError):
+            cell_log_sample = DEFAULT_CELL_LOG_SAMPLE
+        self.cell_log = CellLog(logger, cell_log_sample)
+        
+        # Stage timings and cell counters of the run, written next to the
+        # output and reported by the job status
+        self.metrics = RunMetrics()
+        
+        # Shared value parsing rules (src/engine/values.py) with web options
+        self.value_parser = ValueParser(
+            currency_symbols=ALL_CURRENCY_SYMBOLS,
+            currency_strip_spaces=True,
+            default_percentages=self.convert_percentages,
+            default_text_numbers=self.convert_text_to_numbers
+        )
+        
+        sources = source_folder if source_files is None else f"{len(source_files)} files"
+        logger.info(f"Consolidator initialized: template={template_path}, sources={sources}")
     
     # ============================================================================
     # FORMAT DETECTION METHODS (from desktop app)
@@ -52,63 +108,19 @@ class ExcelConsolidator:
     
     def _is_percentage_format(self, format_str: str) -> bool:
         """Enhanced percentage format detection with comprehensive patterns."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str).lower()
-        percentage_patterns = [
-            '%', 'percent', '0.0%', '0.00%', '0%', '#,##0%', '#,##0.0%', '#,##0.00%',
-            '0.0%', '0.00%', '0%', '0.0%', '0.00%', '0%', '0.0%', '0.00%',
-            'general%', 'standard%', 'percentage', 'pct', 'pct%'
-        ]
-        
-        return any(pattern in format_str for pattern in percentage_patterns)
+        return FORMAT_CLASSIFIER.is_percentage(format_str)
     
     def _is_currency_format(self, format_str: str) -> bool:
         """Enhanced currency format detection."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str)
-        currency_symbols = ['$', '€', '£', '¥', '₽', '₹', '₩', '₪', '₦', '₡', '₨', '₫', '₱', '₲', '₴', '₵', '₸', '₼', '₾', '₿']
-        currency_patterns = ['currency', 'money', 'dollar', 'euro', 'pound', 'yen']
-        
-        return (any(symbol in format_str for symbol in currency_symbols) or 
-                any(pattern in format_str.lower() for pattern in currency_patterns))
+        return FORMAT_CLASSIFIER.is_currency(format_str)
     
     def _is_number_format(self, format_str: str) -> bool:
         """Enhanced number format detection."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str)
-        
-        # First check if it's already identified as percentage or currency
-        if self._is_percentage_format(format_str) or self._is_currency_format(format_str):
-            return False
-        
-        number_patterns = [
-            '0.00', '#,##0', '0.0', '0', '#,##0.00', '#,##0.0', '#,##0',
-            'general', 'standard', 'number', 'numeric', 'decimal',
-            '0.000', '0.0000', '#,##0.000', '#,##0.0000'
-        ]
-        
-        return any(pattern in format_str for pattern in number_patterns)
+        return FORMAT_CLASSIFIER.is_number(format_str)
     
     def _is_date_format(self, format_str: str) -> bool:
         """Enhanced date format detection."""
-        if not format_str:
-            return False
-        
-        format_str = str(format_str).lower()
-        date_patterns = [
-            'mm/dd/yyyy', 'dd/mm/yyyy', 'yyyy-mm-dd', 'mm-dd-yyyy', 'dd-mm-yyyy',
-            'mm/dd/yy', 'dd/mm/yy', 'yy-mm-dd', 'mm-dd-yy', 'dd-mm-yy',
-            'm/d/yyyy', 'd/m/yyyy', 'm/d/yy', 'd/m/yy',
-            'date', 'time', 'datetime', 'timestamp'
-        ]
-        
-        return any(pattern in format_str for pattern in date_patterns)
+        return FORMAT_CLASSIFIER.is_date(format_str)
     
     def _get_consolidation_method(self, format_info: dict) -> str:
         """Determine the appropriate consolidation method based on cell format."""
@@ -123,149 +135,10 @@ class ExcelConsolidator:
         else:
             return 'sum'
     
-    def _is_total_cell(self, cell) -> bool:
-        """Detect if a cell is likely a total row/column based on common patterns."""
-        if cell.value is None:
-            return False
-        
-        # Check for common total indicators in cell value
-        value_str = str(cell.value).lower().strip()
-        total_indicators = ['total', 'sum', 'subtotal', 'grand total', 'totaal', 'gesamt']
-        
-        # Check if cell value contains total indicators
-        if any(indicator in value_str for indicator in total_indicators):
-            return True
-        
-        return False
-    
     # ============================================================================
     # VALUE PROCESSING METHODS (from desktop app)
     # ============================================================================
     
-    def _process_cell_value_with_format_verification(self, value, format_info, coord, file_label, stop_on_error=False):
-        """
-        Process cell value with comprehensive format verification.
-        Ensures data is converted according to template format requirements.
-        
-        Args:
-            value: The cell value to process
-            format_info: Dictionary containing format information from template
-            coord: Cell coordinate (e.g., 'A1')
-            file_label: Name of the source file
-            stop_on_error: Whether to stop on format mismatches
-            
-        Returns:
-            Decimal value or None if processing failed
-        """
-        if value is None or value == "":
-            return None
-            
-        # Handle different format types based on template requirements
-        if format_info.get('is_percentage', False):
-            return self._process_percentage_value(value, coord, file_label, stop_on_error)
-        elif format_info.get('is_currency', False):
-            return self._process_currency_value(value, coord, file_label, stop_on_error)
-        elif format_info.get('is_number', False):
-            return self._process_number_value(value, coord, file_label, stop_on_error)
-        else:
-            # Default processing for unformatted cells
-            return self._process_default_value(value, coord, file_label, stop_on_error)
-    
-    def _process_percentage_value(self, value, coord, file_label, stop_on_error):
-        """Process percentage values with strict format verification."""
-        try:
-            # Handle different percentage input formats
-            if isinstance(value, (int, float)):
-                # Normalize numeric inputs to PERCENT POINTS for averaging
-                # Rules:
-                #  - Values > 1 are treated as percent points (e.g., 82.5 means 82.5%)
-                #  - Values between 0 and 1 are decimals; convert to percent points (0.825 → 82.5)
-                numeric_val = float(value)
-                if 0 <= numeric_val <= 1:
-                    normalized = numeric_val * 100.0
-                else:
-                    normalized = numeric_val
-                return Decimal(str(normalized))
-            elif isinstance(value, str):
-                text = str(value).strip().replace(",", "")
-                if text.endswith('%'):
-                    # Remove % and interpret as percent points directly
-                    val = Decimal(text[:-1])
-                    return val
-                else:
-                    # Parse as number; apply same normalization as numeric path
-                    numeric_val = float(text)
-                    if 0 <= numeric_val <= 1:
-                        normalized = numeric_val * 100.0
-                    else:
-                        normalized = numeric_val
-                    return Decimal(str(normalized))
-            else:
-                return None
-        except Exception as e:
-            logger.warning(f"Could not process percentage value at {coord}: {value}")
-            return None
-    
-    def _process_currency_value(self, value, coord, file_label, stop_on_error):
-        """Process currency values with format verification."""
-        try:
-            if isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, str):
-                # Remove currency symbols and parse
-                text = str(value).strip()
-                for symbol in ['$', '€', '£', '¥', '₽', '₹', '₩', '₪', '₦', '₡', '₨', '₫', '₱']:
-                    text = text.replace(symbol, '')
-                text = text.replace(',', '').replace(' ', '')
-                return Decimal(text)
-            else:
-                return None
-        except Exception as e:
-            logger.warning(f"Could not process currency value at {coord}: {value}")
-            return None
-    
-    def _process_number_value(self, value, coord, file_label, stop_on_error):
-        """Process number values with format verification."""
-        try:
-            if isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, str):
-                # Remove common formatting characters
-                text = str(value).strip().replace(",", "").replace(" ", "")
-                return Decimal(text)
-            else:
-                return None
-        except Exception as e:
-            logger.warning(f"Could not process number value at {coord}: {value}")
-            return None
-    
-    def _process_default_value(self, value, coord, file_label, stop_on_error):
-        """Process values with default (unformatted) handling."""
-        try:
-            if isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, str):
-                # Try to parse as number
-                text = str(value).strip().replace(",", "")
-                
-                # Handle percentages if enabled
-                if self.convert_percentages and text.endswith('%'):
-                    try:
-                        numeric = float(text[:-1])
-                        return Decimal(str(numeric))
-                    except:
-                        pass
-                
-                # Try to convert text to number
-                if self.convert_text_to_numbers:
-                    try:
-                        return Decimal(text)
-                    except:
-                        pass
-            return None
-        except Exception:
-            return None
-    
     def _convert_to_percentage_format(self, value, coord):
         """
         Convert any value to percentage format (decimal for Excel).
@@ -365,31 +238,79 @@ class ExcelConsolidator:
         
         logger.info(f"Found {len(files)} Excel files to consolidate")
         
-        # Load template with full analysis
+        # Load template with full analysis; with the 'xml' output engine the
+        # template package is patched instead and only loaded for the analysis
         logger.info("📋 Loading and analyzing template...")
-        template_wb = openpyxl.load_workbook(self.template_path, data_only=False, read_only=False)
-        output_ws = template_wb.active
+        metrics = self.metrics
+        with metrics.stage('template_load'):
+            output_package = None
+            if self._get_output_engine() == OUTPUT_ENGINE_XML:
+                output_package = self._open_template_package()
+            if output_package is not None:
+                template_wb = None
+                output_ws = output_package.worksheet
+            else:
+                template_wb = openpyxl.load_workbook(self.template_path, data_only=False, read_only=False)
+                output_ws = template_wb.active
         
         logger.info(f"Template worksheet loaded: {output_ws.title}")
         
-        # Storage for totals and contributions
-        totals = {}
-        contributions = {}
-        percent_counts = {}
-        
-        # Analyze template for format information (CRITICAL for accuracy)
-        logger.info("🔍 Analyzing template cell formats...")
-        coord_format_info, template_coords = self._analyze_template_formats_enhanced(output_ws)
+        # Analyze template for format information (CRITICAL for accuracy),
+        # reused from the template cache while the template file is unchanged
+        analysis_start = time.perf_counter()
+        template_cache = None
+        template_analysis = None
+        if self.settings.get('template_cache_dir'):
+            template_cache = TemplateCache(self.settings['template_cache_dir'], 'web')
+            template_analysis = template_cache.load(self.template_path)
+        if template_analysis is not None:
+            logger.info(f"♻️ Template analysis reused from cache ({len(template_analysis.coord_format_info)} formatted cells)")
+            coord_format_info = template_analysis.coord_format_info
+            template_coords = template_analysis.template_coords
+        else:
+            logger.info("🔍 Analyzing template cell formats...")
+            if template_wb is not None:
+                template_ws = output_ws
+            else:
+                template_ws = openpyxl.load_workbook(self.template_path, data_only=False, read_only=False).active
+            coord_format_info, template_coords = self._analyze_template_formats_enhanced(template_ws)
+            if template_cache is not None:
+                merged_ranges = [(r.min_row, r.min_col, r.max_row, r.max_col) for r in template_ws.merged_cells.ranges]
+                template_cache.store(self.template_path, TemplateAnalysis(
+                    coord_format_info, template_coords, (template_ws.max_row, template_ws.max_column),
+                    merged_ranges, template_ws.title))
+            template_ws = None
+        metrics.add_time('template_analysis', time.perf_counter() - analysis_start)
+        metrics.count('template_analysis_cached', int(template_analysis is not None))
         
         # Log percentage cells found for debugging
-        percent_cells = [coord for coord, info in coord_format_info.items() if info.get('is_percentage')]
+        percent_cells = [to_a1(key) for key, info in coord_format_info.items() if info.get('is_percentage')]
         if percent_cells:
             logger.info(f"📊 Percentage cells detected: {percent_cells[:5]}{'...' if len(percent_cells) > 5 else ''}")
         
         total_files_count = len(files)
         
+        # Group template coordinates by row once; the streaming reader skips
+        # every row (and cell) the template does not ask for
+        source_targets = build_row_targets(template_coords) if template_coords else None
+        source_plan = SourcePlan(
+            targets=source_targets,
+            coord_kinds={key: (value_kind(info), info.get('consolidation_method', 'sum'))
+                         for key, info in coord_format_info.items()},
+            parser=self.value_parser
+        )
+        
+        # Totals, percentage counts and per-file contributions (files × cells matrix),
+        # continued from the previous run's state when one is configured
+        run_state = IncrementalRun(self.settings.get('run_state_path'), source_plan, files,
+                                   total_files_count, self.exclude_zero_percent,
+                                   self.settings.get('fixed_point_digits'))
+        if run_state.incremental:
+            logger.info(f"♻️ Incremental run: {len(run_state.reused)} unchanged files kept, {run_state.removed_count} removed")
+        
         # Process each source file
         logger.info(f"📁 Processing {total_files_count} files...")
+        source_start = time.perf_counter()
         for idx, file in enumerate(files, 1):
             if self.progress_callback:
                 self.progress_callback(idx, len(files), os.path.basename(file))
@@ -399,25 +320,25 @@ class ExcelConsolidator:
             try:
                 self._process_file_enhanced(
                     file,
-                    totals,
-                    contributions,
-                    percent_counts,
+                    run_state,
                     coord_format_info,
-                    template_coords,
-                    total_files_count,
+                    source_plan,
                     idx
                 )
             except Exception as e:
                 logger.error(f"Error processing {file}: {str(e)}")
                 # Continue with next file
+        contributions = run_state.finish()
+        metrics.add_time('source_files', time.perf_counter() - source_start)
+        cache_hits, cache_misses = self.value_parser.cache_stats()
+        if cache_hits or cache_misses:
+            logger.info(f"🧮 Text parse cache: {cache_hits} hits, {cache_misses} misses")
         
         # Write consolidated values to template (with full desktop logic)
         logger.info("✍️ Writing consolidated values to template...")
         self._write_consolidated_values_enhanced(
             output_ws,
-            totals,
             contributions,
-            percent_counts,
             coord_format_info,
             total_files_count
         )
@@ -425,10 +346,9 @@ class ExcelConsolidator:
         # Add Contributions Sheet (matches desktop app)
         logger.info("📊 Creating Contributions sheet...")
         self._create_contributions_sheet(
-            template_wb, 
+            output_package if output_package is not None else template_wb,
             output_ws, 
             contributions, 
-            totals, 
             coord_format_info,
             files
         )
@@ -436,8 +356,25 @@ class ExcelConsolidator:
         # Save output file
         output_path = self._generate_output_path()
         logger.info(f"💾 Saving consolidated file: {output_path}")
-        template_wb.save(output_path)
-        template_wb.close()
+        try:
+            with metrics.stage('save'):
+                if output_package is not None:
+                    output_package.save(output_path, self.sheet_streams)
+                else:
+                    save_workbook(template_wb, output_path, self.sheet_streams)
+        finally:
+            for stream in self.sheet_streams:
+                stream.close()
+            self.sheet_streams = []
+        if template_wb is not None:
+            template_wb.close()
+        run_state.save()
+        metrics.finish()
+        if self.settings.get('metrics_sidecar', True):
+            try:
+                logger.info(f"⏱️ Run metrics: {metrics.write(output_path)}")
+            except Exception as e:
+                logger.warning(f"Could not write run metrics: {e}")
         
         logger.info(f"✅ Consolidation complete: {output_path}")
         logger.info("=" * 60)
@@ -445,7 +382,9 @@ class ExcelConsolidator:
         return output_path
     
     def _get_excel_files(self):
-        """Get list of Excel files from source folder"""
+        """Get list of Excel files from source folder (or the given source files)"""
+        if self.source_files is not None:
+            return sorted(f for f in self.source_files if not os.path.basename(f).startswith('~$'))
         files = []
         
         # Look for .xlsx files
@@ -463,10 +402,13 @@ class ExcelConsolidator:
         """
         Enhanced template format analysis with comprehensive cell format verification
         Exactly as in desktop app for maximum accuracy
-        CRITICAL: Also creates template_coords set for filtering source file cells
+        CRITICAL: Also creates template_coords (a compact CoordSet) for filtering
+        source file cells (clipped to the box of meaningful cells, so phantom
+        dimensions from formatting far below the data are never scanned)
         """
         format_info = {}
-        template_coords = set()  # CRITICAL: Track all template cell coordinates
+        template_coords = set()  # CRITICAL: Track all template cell coordinates (packed keys)
+        content_coords = set()  # Cells with a value or a numeric/percent/currency format
         cell_count = 0
         processed_cells = 0
         
@@ -474,8 +416,8 @@ class ExcelConsolidator:
         
         for row in worksheet.iter_rows():
             for cell in row:
-                coord = cell.coordinate
-                template_coords.add(coord)  # CRITICAL: Add EVERY coord to set (matches desktop app line 1892)
+                key = pack(cell.row, cell.column)
+                template_coords.add(key)  # CRITICAL: Add EVERY coord to set (matches desktop app line 1892)
                 cell_count += 1
                 
                 # Process cells for format info (but add ALL coords to set above)
@@ -486,23 +428,20 @@ class ExcelConsolidator:
                 processed_cells += 1
                 number_format = cell.number_format or ''
                 
-                # Comprehensive format detection
-                is_percentage = self._is_percentage_format(number_format)
-                is_currency = self._is_currency_format(number_format)
-                is_number = self._is_number_format(number_format)
-                is_date = self._is_date_format(number_format)
+                # Comprehensive format detection (rules evaluated once per distinct format)
+                is_percentage, is_currency, is_number, is_date = FORMAT_CLASSIFIER.classify(number_format)
                 
-                info = {
-                    'number_format': number_format,
-                    'is_percentage': is_percentage,
-                    'is_currency': is_currency,
-                    'is_number': is_number,
-                    'is_date': is_date,
-                    'consolidation_method': 'average' if is_percentage else 'sum'
-                }
+                # Shared, immutable record per distinct format
+                info = intern_format(
+                    number_format, is_percentage, is_currency, is_number, is_date,
+                    consolidation_method='average' if is_percentage else 'sum'
+                )
                 
-                format_info[coord] = info
+                format_info[key] = info
+                if cell.value is not None or is_percentage or is_currency or is_number:
+                    content_coords.add(key)
         
+        template_coords = clip_to_content(template_coords, content_coords)
         logger.info(f"Analyzed {processed_cells} cells out of {cell_count} total cells in template")
         logger.info(f"Template coordinates tracked: {len(template_coords)}")
         logger.info(f"Percentage cells: {len([c for c, i in format_info.items() if i.get('is_percentage')])}")
@@ -512,95 +451,48 @@ class ExcelConsolidator:
         # Return BOTH format_info AND template_coords (matches desktop app)
         return format_info, template_coords
     
-    def _process_file_enhanced(self, filepath, totals, contributions, percent_counts, 
-                              coord_format_info, template_coords, total_files, file_idx):
+    def _process_file_enhanced(self, filepath, run_state, coord_format_info, source_plan, file_idx):
         """
         Enhanced file processing with full desktop app logic
-        CRITICAL: Handle merged cells (EmptyCell objects) - they don't have .coordinate attribute
+        Streams only the template coordinates straight from the sheet XML
+        (shared engine scan, src/engine/partials.py) and merges them into the
+        contribution matrix; unchanged files come from the previous run state
         """
-        wb = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
-        ws = wb.active
-        
-        file_label = os.path.splitext(os.path.basename(filepath))[0]
-        
-        for row in ws.iter_rows():
-            for cell in row:
-                # CRITICAL FIX: Skip EmptyCell/MergedCell objects - they have no .coordinate
-                # This matches desktop app behavior which also skips merged cells
-                if isinstance(cell, MergedCell):
-                    continue
-                
-                # Additional safety check for cells without coordinate attribute
-                if not hasattr(cell, 'coordinate'):
-                    continue
-                
-                # Now safe to access coordinate
-                value = cell.value
-                coord = cell.coordinate
-                
-                # If template coords specified, skip cells not in template
-                if template_coords and coord not in template_coords:
-                    continue
-                
-                # Skip empty cells
-                if value is None or value == '':
-                    continue
-                
-                # CRITICAL: Skip formulas in SOURCE files to prevent double-counting
-                if hasattr(cell, 'data_type') and cell.data_type == 'f':
-                    logger.debug(f"⏩ Skipping formula cell {coord} in {file_label}")
-                    continue
-                
-                # Get format info
-                format_info = coord_format_info.get(coord, {})
-                
-                # Process cell value with format verification
-                val = self._process_cell_value_with_format_verification(
-                    value, format_info, coord, file_label, False
-                )
-                if val is None:
-                    continue
-                
-                # Determine consolidation method
-                consolidation_method = format_info.get('consolidation_method', 'sum')
-                
-                if consolidation_method == 'average':
-                    # Percentage cells: accumulate for average calculation
-                    current_total = totals.get(coord)
-                    totals[coord] = (current_total + val) if current_total is not None else val
-                    
-                    # Initialize count to total files on first encounter
-                    if coord not in percent_counts:
-                        if self.exclude_zero_percent:
-                            # When excluding zeros: only count files with non-zero values
-                            percent_counts[coord] = 0
-                        else:
-                            # Default: count all files (including files with 0% values)
-                            percent_counts[coord] = total_files
-                    
-                    # If excluding zeros, increment count only for non-zero values
-                    if self.exclude_zero_percent and val != 0:
-                        percent_counts[coord] += 1
-                    
-                    logger.debug(f"📊 Percentage cell {coord}: {val} (from {file_label})")
-                    
-                else:
-                    # Sum values
-                    current_total = totals.get(coord)
-                    totals[coord] = (current_total + val) if current_total is not None else val
-                    
-                    logger.debug(f"🔢 Sum cell {coord}: {val} (from {file_label})")
-                
-                # Track contributions
-                if coord not in contributions:
-                    contributions[coord] = {}
-                prev = contributions[coord].get(file_label)
-                contributions[coord][file_label] = (prev + val) if prev is not None else val
-        
-        wb.close()
+        partial = run_state.reused.get(filepath)
+        if partial is None:
+            partial = scan_source_file(filepath, source_plan)
+        file_label = partial.label
+        
+        # One warning per file; the unparsable values only for sampled cells
+        if partial.parse_errors:
+            logger.warning(f"{file_label}: {len(partial.parse_errors)} values could not be processed")
+        for kind, key, value in partial.parse_errors:
+            if self.cell_log.sample():
+                self.cell_log.log(f"Could not process {kind} value at {to_a1(key)}: {value}")
+        
+        merge_start = time.perf_counter()
+        run_state.merge(partial)
+        
+        # Per-file counts; per-cell detail only for sampled cells
+        handlers, default_handler = source_plan.handlers()
+        file_counts = {"percentage": 0, "sum": 0}
+        cell_log = self.cell_log
+        for key, val in partial.values.items():
+            if handlers.get(key, default_handler).method == 'average':
+                file_counts["percentage"] += 1
+                if cell_log.sample():
+                    cell_log.log(f"📊 Percentage cell {to_a1(key)}: {val} (from {file_label})")
+            else:
+                file_counts["sum"] += 1
+                if cell_log.sample():
+                    cell_log.log(f"🔢 Sum cell {to_a1(key)}: {val} (from {file_label})")
+        logger.info(f"📄 {file_label}: {len(partial.values)} cells ({format_counts(file_counts)})")
+        self.metrics.add_file(partial, time.perf_counter() - merge_start)
+        
+        if partial.error is not None:
+            raise partial.error
     
-    def _write_consolidated_values_enhanced(self, worksheet, totals, contributions, 
-                                           percent_counts, coord_format_info, total_files):
+    def _write_consolidated_values_enhanced(self, worksheet, contributions, coord_format_info, total_files):
         """
         Enhanced value writing with full desktop app logic and formatting
         """
@@ -612,19 +504,37 @@ class ExcelConsolidator:
             bottom=Side(style='thin', color='FF8C00')
         )
         
-        for coord, value in totals.items():
-            cell = worksheet[coord]
+        # Template style + number format + border of each consolidated cell, derived once
+        consolidated_styles = ConsolidatedStyles(thin_orange)
+        
+        # How much of each cell's contributor list its comment carries
+        comment_policy = self._get_comment_policy()
+        
+        # Per-cell detail only for sampled cells; the run log gets the counts
+        cell_log = self.cell_log
+        written_counts = {"averaged": 0, "currency": 0, "number": 0, "unformatted": 0}
+        metrics = self.metrics
+        values_start = time.perf_counter()
+        comment_seconds = 0.0
+        
+        for key, value in contributions.totals():
+            row, col = unpack(key)
+            cell = worksheet.cell(row=row, column=col)
             
             if isinstance(cell, MergedCell):
+                metrics.count('cells_skipped_merged')
                 continue
             
-            format_info = coord_format_info.get(coord, {})
+            detail = cell_log.sample()
+            coord = cell.coordinate
+            number_format = None
+            format_info = coord_format_info.get(key, {})
             consolidation_method = format_info.get('consolidation_method', 'sum')
             
             try:
                 if consolidation_method == 'average':
                     # Calculate average for percentage cells
-                    count = max(1, percent_counts.get(coord, 1))
+                    count = max(1, contributions.percent_count(key))
                     avg_value = float(value / Decimal(count))
                     
                     # Excel expects percentages as decimals (e.g., 0.825 for 82.5%)
@@ -632,9 +542,11 @@ class ExcelConsolidator:
                     
                     # Maintain percentage format
                     template_format = format_info.get('number_format', '0.00%')
-                    cell.number_format = template_format
+                    number_format = template_format
                     
-                    logger.info(f"✅ {coord}: Average = {avg_value:.2f}% (format: {template_format})")
+                    written_counts["averaged"] += 1
+                    if detail:
+                        cell_log.log(f"✅ {coord}: Average = {avg_value:.2f}% (format: {template_format})")
                     
                 else:
                     # Sum for other cells
@@ -643,46 +555,64 @@ class ExcelConsolidator:
                     # Apply formatting based on cell type
                     if format_info.get('is_currency', False):
                         template_format = format_info.get('number_format', '$#,##0.00')
-                        cell.number_format = template_format
-                        logger.debug(f"✅ {coord}: Currency sum = {float(value):,.2f}")
+                        number_format = template_format
+                        written_counts["currency"] += 1
+                        if detail:
+                            cell_log.log(f"✅ {coord}: Currency sum = {float(value):,.2f}")
                         
                     elif format_info.get('is_number', False):
                         template_format = format_info.get('number_format', '#,##0.00')
-                        cell.number_format = template_format
-                        logger.debug(f"✅ {coord}: Number sum = {float(value):,.2f}")
+                        number_format = template_format
+                        written_counts["number"] += 1
+                        if detail:
+                            cell_log.log(f"✅ {coord}: Number sum = {float(value):,.2f}")
+                    
+                    else:
+                        written_counts["unformatted"] += 1
                     
             except Exception as e:
                 logger.error(f"Error writing value to {coord}: {e}")
                 cell.value = float(value) if value is not None else 0
             
             # Add comment showing contributions
-            file_map = contributions.get(coord, {})
-            if file_map:
+            comment_start = time.perf_counter()
+            items, omitted = comment_policy.contributors(contributions, key)
+            if items:
                 comment_text = self._build_comment_text_enhanced(
-                    coord, value, file_map, format_info, percent_counts, total_files
+                    key, value, items, format_info, contributions, omitted
                 )
-                cell.comment = Comment(comment_text, "Excel Consolidator Web")
+                if comment_policy.admit(comment_text):
+                    cell.comment = Comment(comment_text, "Excel Consolidator Web")
+            comment_seconds += time.perf_counter() - comment_start
             
-            # Add orange border to indicate consolidated cell
-            cell.border = thin_orange
+            # Number format and orange border to indicate consolidated cell
+            consolidated_styles.apply(cell, number_format)
+        metrics.add_time('consolidated_values', time.perf_counter() - values_start - comment_seconds)
+        metrics.add_time('comments', comment_seconds)
+        metrics.count('cells_written', sum(written_counts.values()))
+        metrics.count('comments_written', comment_policy.written)
+        metrics.count('comments_skipped_budget', comment_policy.skipped)
+        logger.info(f"✍️ Consolidated {sum(written_counts.values())} cells ({format_counts(written_counts)})")
+        logger.info(f"💬 {comment_policy.summary()}")
     
-    def _build_comment_text_enhanced(self, coord, total_value, file_map, format_info, 
-                                    percent_counts, total_files):
-        """Build enhanced comment text showing file contributions"""
-        items = sorted(file_map.items(), key=lambda x: x[0].lower())
+    def _build_comment_text_enhanced(self, key, total_value, items, format_info, contributions, omitted=0):
+        """
+        Build enhanced comment text showing file contributions (items: sorted (file, value) pairs;
+        ``omitted``: contributing files not listed)
+        """
         max_name = max((len(n) for n, _ in items), default=4)
         
         lines = []
         lines.append("Consolidation Summary")
-        lines.append(f"Cell: {coord}")
+        lines.append(f"Cell: {to_a1(key)}")
         
         # Enhanced summary based on cell format
         is_percent = format_info.get('is_percentage', False)
         
         if is_percent:
-            count = max(1, int(percent_counts.get(coord, 1)))
+            count = max(1, contributions.percent_count(key))
             avg_val = (total_value / Decimal(count))
-            num_contributors = len([v for v in file_map.values() if v != 0])
+            num_contributors = contributions.nonzero_count(key)
             
             if self.exclude_zero_percent:
                 # Excluding zeros: count only includes files with non-zero values
@@ -715,11 +645,16 @@ class ExcelConsolidator:
                 lines.append(f"{name}{pad}  |  ${float(v):,.2f}")
             else:
                 lines.append(f"{name}{pad}  |  {float(v):,.2f}")
+        if omitted:
+            lines.append(CommentPolicy.omitted_line(omitted))
         
         return "\n".join(lines)
     
     def _generate_output_path(self):
         """Generate output file path with timestamp"""
+        if self.output_path:
+            return self.output_path
+        
         # Use same folder as template
         template_dir = os.path.dirname(self.template_path)
         template_ext = os.path.splitext(self.template_path)[1]
@@ -730,7 +665,81 @@ class ExcelConsolidator:
         
         return os.path.join(template_dir, filename)
     
-    def _create_contributions_sheet(self, workbook, main_ws, contributions, totals, coord_format_info, files):
+    def _get_contributions_max_rows(self):
+        """Row budget per Contributions sheet (Excel's row limit by default)."""
+        try:
+            return int(self.settings.get('contributions_max_rows', EXCEL_MAX_ROWS))
+        except (TypeError, ValueError):
+            return EXCEL_MAX_ROWS
+    
+    def _get_contributions_layout(self, file_labels):
+        """'long' (Cell | File Name | Contribution rows) or 'wide' (one row per cell, one column per file)."""
+        layout = self.settings.get('contributions_layout', LAYOUT_LONG)
+        if layout not in CONTRIBUTION_LAYOUTS:
+            return LAYOUT_LONG
+        if layout == LAYOUT_WIDE and not wide_layout_fits(file_labels):
+            logger.warning(f"{len(file_labels)} files do not fit in one row; using the long Contributions layout")
+            return LAYOUT_LONG
+        return layout
+    
+    def _get_comment_policy(self):
+        """Comment strategy ('full', 'top', 'none') and comment byte budget of the output."""
+        try:
+            return CommentPolicy(self.settings.get('comment_strategy', COMMENTS_FULL),
+                                 int(self.settings.get('comment_top_n', DEFAULT_TOP_CONTRIBUTORS)),
+                                 int(self.settings.get('comment_max_bytes', 0)))
+        except (TypeError, ValueError):
+            return CommentPolicy()
+    
+    def _get_output_engine(self):
+        """'openpyxl' (load and save the whole workbook) or 'xml' (patch the template package)."""
+        engine = self.settings.get('output_engine', OUTPUT_ENGINE_OPENPYXL)
+        return engine if engine in OUTPUT_ENGINES else OUTPUT_ENGINE_OPENPYXL
+    
+    def _open_template_package(self):
+        """TemplatePackage of the active template sheet, or None when the template cannot be patched."""
+        try:
+            return TemplatePackage(self.template_path)
+        except UnsupportedTemplate as e:
+            logger.warning(f"Template cannot be patched ({e}); rebuilding the workbook instead")
+            return None
+    
+    def _add_contributions_header(self, contrib_ws, file_labels=None):
+        """
+        Header rows of a Contributions sheet; returns the first data row.
+        With ``file_labels`` the header is the wide layout's (one column per file, frozen).
+        """
+        contrib_ws["A1"] = "Excel Consolidator - Detailed Contributions"
+        contrib_ws["A1"].font = Font(bold=True, size=14)
+        contrib_ws["A3"] = "This sheet shows exactly which files contributed to each consolidated cell."
+        contrib_ws["A5"] = "Cell"
+        if file_labels is None:
+            contrib_ws["B5"] = "File Name"
+            contrib_ws["C5"] = "Contribution"
+        else:
+            for col, label in enumerate(file_labels, start=2):
+                contrib_ws.cell(row=5, column=col, value=label)
+            contrib_ws.freeze_panes = "B6"
+        
+        # Make header bold
+        for cell in contrib_ws[5]:
+            cell.font = Font(bold=True)
+        return 6
+    
+    def _finish_contributions_sheet(self, contrib_ws, last_row, file_count=None):
+        """Autofilter and column widths of a completed Contributions sheet (``file_count``: wide layout)."""
+        last_col = 'C' if file_count is None else get_column_letter(file_count + 1)
+        if last_row >= 6:
+            contrib_ws.auto_filter.ref = f"A5:{last_col}{last_row}"
+        contrib_ws.column_dimensions['A'].width = 12
+        if file_count is None:
+            contrib_ws.column_dimensions['B'].width = 40
+            contrib_ws.column_dimensions['C'].width = 16
+        else:
+            for col in range(2, file_count + 2):
+                contrib_ws.column_dimensions[get_column_letter(col)].width = 16
+    
+    def _create_contributions_sheet(self, workbook, main_ws, contributions, coord_format_info, files):
         """
         Create Contributions sheet with detailed breakdown
         Matches desktop app (lines 2325-2462) with:
@@ -738,170 +747,69 @@ class ExcelConsolidator:
         - Auto-filter
         - Hyperlinks from main sheet to contributions
         - Consolidated (Plain) sheet without hyperlinks
+        ``workbook`` is the output workbook or TemplatePackage.
         """
+        package = workbook if isinstance(workbook, TemplatePackage) else None
+        style_map = package.style_map if package is not None else None
         try:
-            # Create Contributions worksheet
-            contrib_ws = workbook.create_sheet("Contributions")
-            
-            # Header
-            contrib_ws["A1"] = "Excel Consolidator - Detailed Contributions"
-            contrib_ws["A1"].font = Font(bold=True, size=14)
-            contrib_ws["A3"] = "This sheet shows exactly which files contributed to each consolidated cell."
-            contrib_ws["A5"] = "Cell"
-            contrib_ws["B5"] = "File Name"
-            contrib_ws["C5"] = "Contribution"
-            
-            # Make header bold
-            for cell in [contrib_ws["A5"], contrib_ws["B5"], contrib_ws["C5"]]:
-                cell.font = Font(bold=True)
-            
             # Get all file labels sorted
             all_file_labels = [os.path.splitext(os.path.basename(f))[0] for f in files]
             all_file_labels.sort(key=lambda n: n.lower())
             
-            r = 6
-            coord_to_first_row = {}  # Track first row for each coordinate (for hyperlinks)
-            
-            # Helper function to sort coordinates naturally (A1, A2, ..., B1, B2, ...)
-            def _col_to_num(col_letters):
-                result = 0
-                for ch in col_letters:
-                    if 'a' <= ch <= 'z':
-                        ch = chr(ord(ch) - 32)
-                    result = result * 26 + (ord(ch) - 64)
-                return result
-            
-            def _cell_sort_key(cell_ref):
-                col = ""
-                row_str = ""
-                for ch in cell_ref:
-                    if ch.isalpha():
-                        col += ch
-                    elif ch.isdigit():
-                        row_str += ch
-                return (_col_to_num(col), int(row_str) if row_str else 0)
-            
-            # Fill contribution data
-            for coord in sorted(contributions.keys(), key=_cell_sort_key):
-                file_map = contributions.get(coord, {})
-                
-                # Iterate through ALL files (show 0 for files that didn't contribute)
-                for fname in all_file_labels:
-                    v = file_map.get(fname, 0)
-                    contrib_ws[f"A{r}"] = coord
-                    contrib_ws[f"B{r}"] = fname
-                    
-                    try:
-                        format_info = coord_format_info.get(coord, {})
-                        v_out = v
-                        
-                        if format_info.get('is_percentage', False):
-                            # Percentage values: v_out is in percentage points (e.g., 84.36)
-                            # Excel needs decimal format (0.8436) with percentage format
-                            contrib_ws[f"C{r}"] = float(v_out) / 100
-                            template_format = format_info.get('number_format', '0.00%')
-                            contrib_ws[f"C{r}"].number_format = template_format
-                            
-                        elif format_info.get('is_currency', False):
-                            # Currency values
-                            contrib_ws[f"C{r}"] = float(v_out)
-                            template_format = format_info.get('number_format', '$#,##0.00')
-                            contrib_ws[f"C{r}"].number_format = template_format
-                            
-                        elif format_info.get('is_number', False):
-                            # Number values
-                            contrib_ws[f"C{r}"] = float(v_out)
-                            template_format = format_info.get('number_format', '#,##0.00')
-                            contrib_ws[f"C{r}"].number_format = template_format
-                            
-                        else:
-                            # Default - unformatted values
-                            contrib_ws[f"C{r}"] = float(v_out)
-                            
-                    except Exception:
-                        # Fallback: Use raw value if formatting fails
-                        contrib_ws[f"C{r}"] = v
-                    
-                    # Track first row for this coordinate (for hyperlinks)
-                    if coord not in coord_to_first_row:
-                        coord_to_first_row[coord] = r
-                    
-                    r += 1
-                
-                # Add visual break between cell groups
-                r += 1
-            
-            # Add auto-filter
-            if r > 6:
-                contrib_ws.auto_filter.ref = f"A5:C{r-1}"
-            
-            # Set column widths
-            contrib_ws.column_dimensions['A'].width = 12
-            contrib_ws.column_dimensions['B'].width = 40
-            contrib_ws.column_dimensions['C'].width = 16
+            # Fill contribution data: rows are streamed to temporary files and
+            # merged into the package when the workbook is saved; past the row
+            # budget they continue on "Contributions (2)", ...
+            if self._get_contributions_layout(all_file_labels) == LAYOUT_WIDE:
+                file_count = len(all_file_labels)
+                shards = ContributionShards(
+                    workbook,
+                    lambda ws: self._add_contributions_header(ws, all_file_labels),
+                    lambda ws, last_row: self._finish_contributions_sheet(ws, last_row, file_count),
+                    max_rows=self._get_contributions_max_rows(), style_map=style_map)
+                write_rows = write_wide_contribution_rows
+            else:
+                shards = ContributionShards(
+                    workbook, self._add_contributions_header, self._finish_contributions_sheet,
+                    max_rows=self._get_contributions_max_rows(), style_map=style_map)
+                write_rows = write_contribution_rows
+            self.sheet_streams = shards.streams
+            contributions_start = time.perf_counter()
+            contribution_links = write_rows(
+                shards, contributions, all_file_labels, coord_format_info)
+            if len(shards.streams) > 1:
+                logger.info(f"📑 Contributions split across {len(shards.streams)} sheets")
             
             # Add hyperlinks from main sheet to contributions sheet
             try:
-                for coord in totals.keys():
-                    first_row = coord_to_first_row.get(coord)
-                    if first_row:
-                        cell = main_ws[coord]
+                for key in contributions.keys:
+                    link = contribution_links.get(key)
+                    if link:
+                        row, col = unpack(key)
+                        cell = main_ws.cell(row=row, column=col)
                         if isinstance(cell, MergedCell):
                             continue
-                        # Create hyperlink to Contributions sheet
-                        link = f"#'Contributions'!A{first_row}"
+                        # Create hyperlink to the cell's Contributions rows
                         cell.hyperlink = link
             except Exception as e:
                 logger.warning(f"Could not create hyperlinks: {e}")
+            self.metrics.add_time('contributions_sheet', time.perf_counter() - contributions_start)
             
             # Create Consolidated (Plain) sheet - copy of main sheet WITHOUT hyperlinks/comments
             try:
-                from copy import copy
-                
-                plain_ws = workbook.create_sheet("Consolidated (Plain)")
-                
-                # Copy merged cells first
-                for merged_range in main_ws.merged_cells.ranges:
-                    plain_ws.merge_cells(str(merged_range))
-                
-                # Copy column widths
-                for col_letter, col_dim in main_ws.column_dimensions.items():
-                    plain_ws.column_dimensions[col_letter].width = col_dim.width
-                
-                # Copy row heights
-                for row_num, row_dim in main_ws.row_dimensions.items():
-                    plain_ws.row_dimensions[row_num].height = row_dim.height
-                
-                # Copy all cells with formatting and values
-                for row in main_ws.iter_rows():
-                    for cell in row:
-                        plain_cell = plain_ws[cell.coordinate]
-                        
-                        # Skip merged cells (already handled above)
-                        if isinstance(cell, MergedCell) or isinstance(plain_cell, MergedCell):
-                            continue
-                        
-                        # Copy value (not formula - use calculated value)
-                        plain_cell.value = cell.value
-                        
-                        # Copy all formatting
-                        if cell.has_style:
-                            plain_cell.font = copy(cell.font)
-                            plain_cell.border = copy(cell.border)
-                            plain_cell.fill = copy(cell.fill)
-                            plain_cell.number_format = copy(cell.number_format)
-                            plain_cell.protection = copy(cell.protection)
-                            plain_cell.alignment = copy(cell.alignment)
-                        
-                        # Explicitly do NOT copy hyperlinks or comments
-                        # (plain_cell.hyperlink and plain_cell.comment remain None)
+                # Cells share the main sheet's style ids (no per-cell style object copies)
+                with self.metrics.stage('plain_sheet'):
+                    if package is not None:
+                        package.clone_plain_sheet("Consolidated (Plain)")
+                    else:
+                        clone_plain_sheet(main_ws, "Consolidated (Plain)")
                 
                 logger.info("✅ Created 'Consolidated (Plain)' sheet")
                 
             except Exception as e:
                 logger.warning(f"Could not create plain sheet: {e}")
             
-            logger.info(f"✅ Created Contributions sheet with {r-6} rows")
+            logger.info(f"✅ Created Contributions sheet with "
+                        f"{sum(stream.row_count for stream in shards.streams)} rows")
             
         except Exception as e:
             logger.error(f"Error creating Contributions sheet: {e}")
@@ -16,7 +16,10 @@ const AppState = {
         convertText: true,
         convertPercent: true,
         createBackup: false,
-        skipValidation: true
+        skipValidation: true,
+        wideContributions: false,
+        patchTemplate: false,
+        shortComments: false
     }
 };
 
@@ -52,6 +55,9 @@ const DOM = {
     convertPercentCheck: document.getElementById('convertPercent'),
     createBackupCheck: document.getElementById('createBackup'),
     skipValidationCheck: document.getElementById('skipValidation'),
+    wideContributionsCheck: document.getElementById('wideContributions'),
+    patchTemplateCheck: document.getElementById('patchTemplate'),
+    shortCommentsCheck: document.getElementById('shortComments'),
     
     // Buttons
     startBtn: document.getElementById('startConsolidation'),
@@ -166,6 +172,18 @@ function initializeEventListeners() {
         AppState.settings.skipValidation = e.target.checked;
     });
     
+    DOM.wideContributionsCheck?.addEventListener('change', (e) => {
+        AppState.settings.wideContributions = e.target.checked;
+    });
+    
+    DOM.patchTemplateCheck?.addEventListener('change', (e) => {
+        AppState.settings.patchTemplate = e.target.checked;
+    });
+    
+    DOM.shortCommentsCheck?.addEventListener('change', (e) => {
+        AppState.settings.shortComments = e.target.checked;
+    });
+    
     // File removal
     DOM.removeTemplate?.addEventListener('click', (e) => {
         e.stopPropagation();
@@ -439,6 +457,9 @@ async function startConsolidation() {
     formData.append('convert_percentages', AppState.settings.convertPercent);
     formData.append('create_backup', AppState.settings.createBackup);
     formData.append('skip_validation', AppState.settings.skipValidation);
+    formData.append('contributions_layout', AppState.settings.wideContributions ? 'wide' : 'long');
+    formData.append('output_engine', AppState.settings.patchTemplate ? 'xml' : 'openpyxl');
+    formData.append('comment_strategy', AppState.settings.shortComments ? 'top' : 'full');
     
     // Show progress section
     showSection('progress');